@@ -11,16 +11,15 @@ import logging
 import math
 import os
 import sys
+import time
 import tkinter as tk
 import argparse
-from collections.abc import Sequence
+from collections import deque
+from collections.abc import Iterable, Sequence
 from datetime import datetime
-from operator import eq, ge, gt, le, lt, ne
 from pathlib import Path
-from shutil import copyfile
 from typing import TYPE_CHECKING, Literal, cast
 from simpleeval import simple_eval  # type: ignore[reportUnknownVariableType]
-from stat import S_IWRITE, S_IREAD
 
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
@@ -57,72 +56,54 @@ from lib.customFunctions import (
     set_theme,
     set_titlebar_style
 )
+from lib.customConfigParser import customConfigParser
+from lib.ini_cache import INICache
+from lib.ini_files import (
+    apply_ini_dict,
+    apply_preset,
+    get_ini_location,
+    get_target_ini,
+    prepare_to_save,
+    remove_excess_directory_files,
+    remove_ini_dict,
+    remove_invalid_settings,
+    save_ini_files,
+)
+from lib.plugin_cache import PluginCache
+from lib.preview_images import PreviewImages
 from lib.ModifyINI import ModifyINI
+from lib.observable_log import log_list_handler, observable_log
 from lib.scalar import Scalar
+from lib.startup_profiler import startup_profiler
 from lib.tooltips import Hovertip
 from lib.type_helpers import *
 
 if TYPE_CHECKING:
     from collections.abc import Callable
 
-# This dictionary maps the operator modules to specific text.
-operator_dictionary = {
-    "greater-than": gt,
-    "greater-or-equal-than": ge,
-    "less-than": lt,
-    "less-or-equal-than": le,
-    "not-equal": ne,
-    "equal": eq,
-}
+    from ttkbootstrap.tableview import TableRow
 
 types_without_label = ["Checkbutton", "preset", "radioPreset", "description"]
 types_packed_left = ["Dropdown", "Combobox", "Entry", "Spinbox", "Slider", "Color"]
+# Widgets whose value is only written to the INI files once the user stops changing it.
+debounced_widget_ids = {"TkEntry", "TkSlider", "TkSpinbox"}
 
 # Specify the name of the application.
 my_app_name = "Bethini Pie"
 my_app_short_name = "Bethini"
-
-
-class log_list_handler(logging.Handler):
-    def __init__(self, log_list):
-        super().__init__()
-        self.log_list = log_list
-
-    def emit(self, record):
-        msg = self.format(record)
-        self.log_list.append(msg)
-
-class observable_list(list):
-    def __init__(self, *args):
-        super().__init__(*args)
-        self.observers = []
-
-    def append(self, item):
-        super().append(item)
-        self.notify_observers()
-
-    def extend(self, iterable):
-        super().extend(iterable)
-        self.notify_observers()
-
-    def insert(self, index, item):
-        super().insert(index, item)
-        self.notify_observers()
-
-    def notify_observers(self):
-        for observer in self.observers:
-            observer()
-
-    def add_observer(self, observer):
-        self.observers.append(observer)
-
-    def remove_observer(self, observer):
-        self.observers.remove(observer)
+STATUS_INTERVAL_MS = 100
+"""The status bar and log tab are redrawn at most this often while messages keep coming."""
 
 
 class bethini_app(ttk.Window):
     """This is the main app, the glue that creates the GUI."""
 
+    commit_delay_ms = 300
+    """How long the value of a debounced widget must be stable before it is written. 0 writes every change."""
+
+    preview_images_in_memory = 10
+    """How many preview images are kept decoded in memory."""
+
     def __init__(self, themename: str) -> None:
         super().__init__(title=f"{my_app_name} {version}",
                          themename=themename,
@@ -131,23 +112,53 @@ class bethini_app(ttk.Window):
 
         parser = argparse.ArgumentParser()
         parser.add_argument('--noBackups', action='store_true')
+        parser.add_argument('--rebuild-plugin-cache', action='store_true')
         args, _ = parser.parse_known_args()
         self.makeBackups = not args.noBackups
+        if args.rebuild_plugin_cache and AppName.plugin_cache is not None:
+            AppName.plugin_cache.clear()
 
         CustomFunctions.screenwidth = self.winfo_screenwidth()
         CustomFunctions.screenheight = self.winfo_screenheight()
+        # Preview images are downscaled to fit in two thirds of the screen.
+        self.preview_images = PreviewImages(
+            self,
+            exedir / "cache" / "previews",
+            max_size=(CustomFunctions.screenwidth * 2 // 3, CustomFunctions.screenheight * 2 // 3),
+            capacity=self.preview_images_in_memory,
+        )
 
         set_titlebar_style(self)
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         # Variables
         self.tab_dictionary: dict[TabId, DisplayTab] = {}
+        self.linked_tab_ids: dict[TabId, list[TabId]] = {}
         self.setting_dictionary: dict[str, BethiniSetting] = {}
-        self.dependent_settings_dictionary: dict[str, dict[str, DependentSetting]] = {}
-        self.settings_that_settings_depend_on: dict[str, dict[str, DependentSetting]] = {}
+        # Dependent setting -> whether its widget was last enabled or disabled
+        self.dependent_states: dict[str, str] = {}
+        self.updating_dependents = False
+        # While True, the widgets are being set from the INI files, so their values are written immediately.
+        self.reading_values = False
+        # Debounced setting -> the id of the scheduled write of its value
+        self.pending_commits: dict[str, str] = {}
+        # (target INI, lowercase section) -> lowercase setting -> the settings whose widgets show it
+        self.settings_by_ini_key: dict[tuple[ININame, str], dict[str, list[str]]] = {}
+        # The settings whose widgets need reading again, unless all of them do.
+        self.changed_setting_names: dict[str, None] = {}
+        self.all_settings_changed = False
+        ModifyINI.listeners.append(self.on_ini_change)
         self.previous_tab = None
         self.app = None
-        self.ignore_log_sme_updates = False
+        self.status_message: str | None = None
+        self.status_shown_at = 0.0
+        self.status_after_id: str | None = None
+        self.log_text_after_id: str | None = None
+        self.log_text_shown = 0
+        # The number of lines of each message in the log tab
+        self.log_text_message_lines: deque[int] = deque()
+        # Lowercase file name -> the image shown in the preview window of a setting
+        self.setting_images: dict[str, Path] = {}
         self.preset_var = tk.StringVar(self, "Bethini")
         self.style_override = ttk.Style()
         self.theme_name = tk.StringVar(self, themename)
@@ -194,6 +205,8 @@ class bethini_app(ttk.Window):
 
         self.container = ttk.Frame(self.the_canvas)
         self.container.bind_all("<Control-s>", self.save_ini_files)
+        self.container.bind_all("<Control-z>", self.undo)
+        self.container.bind_all("<Control-y>", self.redo)
 
         self.container.bind("<Configure>", self.on_frame_configure)
         self.sub_container = ttk.Notebook(self.container)
@@ -249,13 +262,31 @@ class bethini_app(ttk.Window):
         self.p = ttk.Progressbar(self.hsbframeholder, orient=HORIZONTAL, mode=INDETERMINATE)
 
     def sme(self, message: str, *, exception: Exception | None = None) -> None:
-        if not self.ignore_log_sme_updates:
-            if exception is not None:
-                logger.exception(message)
-            else:
-                logger.info(message)
-            self.statusbar_text.set(message)
-            self.update()
+        """Logs the message and shows it in the status bar.
+
+        Messages that come faster than STATUS_INTERVAL_MS are coalesced, and only the latest one is shown.
+        """
+        if exception is not None:
+            logger.exception(message)
+        else:
+            logger.info(message)
+        self.status_message = message
+        if (time.monotonic() - self.status_shown_at) * 1000 >= STATUS_INTERVAL_MS:
+            self.show_status_message()
+        elif self.status_after_id is None:
+            self.status_after_id = self.after(STATUS_INTERVAL_MS, self.show_status_message)
+
+    def show_status_message(self) -> None:
+        if self.status_after_id is not None:
+            self.after_cancel(self.status_after_id)
+            self.status_after_id = None
+        if self.status_message is None:
+            return
+        self.statusbar_text.set(self.status_message)
+        self.status_message = None
+        self.status_shown_at = time.monotonic()
+        # Redraw without processing events, so that nothing else runs in the middle of the caller.
+        self.update_idletasks()
 
     @staticmethod
     def choose_color(button_to_modify: tk.Button, color_value_type: ColorType = "hex") -> ColorValue:
@@ -382,9 +413,29 @@ class bethini_app(ttk.Window):
         setting_id: SettingId,
         widget_id: WidgetId,
     ) -> None:
-        """Sets the tooltips."""
+        """Sets the tooltips.
+
+        The tooltip is only created the first time the mouse enters the widget, or the widget is right-clicked.
+        """
 
         setting: BethiniSetting = self.tab_dictionary[tab_id]["LabelFrames"][label_frame_id]["SettingFrames"][setting_frame_id][setting_id]
+        anchor_widget = setting[widget_id]
+        if anchor_widget is None:
+            return
+
+        def create_hovertip(event: "tk.Event[tk.Misc]") -> None:
+            # The Hovertip replaces these bindings with its own.
+            hovertip = self.create_hovertip(setting, anchor_widget)
+            if event.type == tk.EventType.Enter:
+                hovertip.enter(event)
+            else:
+                hovertip.show_preview(event)
+
+        anchor_widget.bind("<Enter>", create_hovertip)
+        anchor_widget.bind("<Button-3>", create_hovertip)
+
+    def create_hovertip(self, setting: BethiniSetting, anchor_widget: tk.Widget) -> Hovertip:
+        """Creates the tooltip of a widget of a setting."""
 
         # Fetches the tooltip description.
         tooltip_description = setting.get("tooltip", "No description available.")
@@ -428,14 +479,29 @@ class bethini_app(ttk.Window):
             tooltip_INI_targets = None
 
         setting_name = setting.get("Name")
-        photo_for_setting: Path | None = exedir / "apps" / GAME_NAME / "images" / f"{setting_name}.jpg"
-        if not (photo_for_setting and photo_for_setting.is_file()):
-            photo_for_setting = None
+        photo_for_setting = self.setting_images.get(f"{setting_name}.jpg".lower())
 
-        anchor_widget = setting[widget_id]
-        if anchor_widget is not None:
-            Hovertip(widget=anchor_widget, text=tooltip_text, description=tooltip_description, code=tooltip_INI_targets, preview_window=PREVIEW_WINDOW,
-                     preview_frame=PREVIEW_FRAME, photo_for_setting=photo_for_setting, wraplength=tooltip_wrap_length, bootstyle=INVERSE)
+        return Hovertip(widget=anchor_widget, text=tooltip_text, description=tooltip_description, code=tooltip_INI_targets, preview_window=PREVIEW_WINDOW,
+                        preview_frame=PREVIEW_FRAME, photo_for_setting=photo_for_setting, preview_images=self.preview_images,
+                        wraplength=tooltip_wrap_length, bootstyle=INVERSE)
+
+    @staticmethod
+    def index_setting_images(images_path: Path) -> dict[str, Path]:
+        """Returns the images of the settings in the images folder of a game, by lowercase file name."""
+
+        try:
+            with os.scandir(images_path) as entries:
+                return {entry.name.lower(): Path(entry.path) for entry in entries if entry.is_file()}
+        except OSError:
+            return {}
+
+    def finish_startup_profile(self, trace_path: Path) -> None:
+        """Writes the startup profile and the summary of it to the log, then closes without saving."""
+
+        self.update_idletasks()
+        startup_profiler.write(trace_path)
+        startup_profiler.log_summary()
+        self.quit()
 
     def choose_game(self, *, forced: bool = False) -> None:
         always_select_game = ModifyINI.app_config().get_value("General", "bAlwaysSelectGame")
@@ -447,8 +513,9 @@ class bethini_app(ttk.Window):
         try:
             if forced or always_select_game != "0" or not choose_game_var:
                 self.withdraw()
-                choose_game_window = ChooseGameWindow(self, version=version, exedir=exedir)
-                self.wait_window(choose_game_window)
+                with startup_profiler.span("ChooseGameWindow"):
+                    choose_game_window = ChooseGameWindow(self, version=version, exedir=exedir)
+                    self.wait_window(choose_game_window)
                 if choose_game_window.result:
                     choose_game_var = choose_game_window.result
             self.choose_game_done(choose_game_var)
@@ -480,10 +547,15 @@ class bethini_app(ttk.Window):
         # App globals
         # #############
 
-        self.app = AppName(appname=game, exedir=exedir)
+        if self.app:
+            self.commit_pending_values()
+            self.app.overlay.close()
+        with startup_profiler.span("AppName"):
+            self.app = AppName(appname=game, exedir=exedir)
         global GAME_NAME
         GAME_NAME = self.app.data["gameName"]
         logger.debug(f"Application/game is {GAME_NAME}")
+        self.setting_images = self.index_setting_images(exedir / "apps" / GAME_NAME / "images")
 
         # The self.tab_dictionary lists all the tabs, which
         # is variable, based upon the tabs listed in the associated Bethini.json
@@ -516,13 +588,14 @@ class bethini_app(ttk.Window):
             self.tab_dictionary[f"Page{tab_number}"] = {"Name": tab}
 
         self.setting_dictionary = {}
-        self.dependent_settings_dictionary = {}
-        self.settings_that_settings_depend_on = {}
+        self.dependent_states = {}
+        self.settings_by_ini_key = {}
 
         if not from_choose_game_window:
             self.deiconify()
         try:
-            self.createTabs(from_choose_game_window=from_choose_game_window)
+            with startup_profiler.span("createTabs"):
+                self.createTabs(from_choose_game_window=from_choose_game_window)
 
         except Exception as e:
             msg = f"An unhandled exception occurred. See log for details.\n{e}\nThis program will now close. No files will be modified."
@@ -580,28 +653,15 @@ class bethini_app(ttk.Window):
         
 
     def withdraw_setup(self) -> None:
+        self.commit_pending_values()
         SETUP_WINDOW.withdraw()
         self.deiconify()
-        self.updateValues()
-
-    def create_first_time_backup(self, ini_location: Path, ini_objects: list[ModifyINI]) -> None:
-        backups_path = ini_location / f"{my_app_name} backups"
-        first_time_backup_path = backups_path / "First-Time-Backup"
-        first_time_backup_path.mkdir(parents=True)
-        for ini_file in ini_objects:
-            try:
-                copyfile(ini_file.ini_path, first_time_backup_path / ini_file.ini_path.name)
-            except FileNotFoundError as e:
-                logger.debug(
-                    f"{ini_file.ini_path} does not exist, so it cannot be backed up. This is typically caused by a path not being set correctly.",
-                    exception=e,
-                )
-        copyfile(APP_LOG_FILE, first_time_backup_path / APP_LOG_FILE.name)
+        self.refresh_changed_values()
 
     def save_ini_files(self, _event: "tk.Event[tk.Misc] | None" = None) -> None:
-        self.remove_invalid_settings()
+        self.commit_pending_values()
         try:
-            self.apply_ini_dict(self.app.preset_values_fixedDefault, only_if_missing=True)
+            prepare_to_save(self.app)
         except NameError as e:
             logger.error(f"NameError: {e}")
             return
@@ -609,200 +669,89 @@ class bethini_app(ttk.Window):
             logger.error(f"AttributeError: {e}")
             return
 
-        files_to_remove = [*list(ModifyINI.open_inis)[1:], APP_LOG_FILE.name]
-        inis_by_location: dict[Path, list[ModifyINI]] = {}
-        inis_by_location_modified: dict[Path, list[ModifyINI]] = {}
-        locations_without_first_backup: set[Path] = set()
-
-        for each_ini in ModifyINI.open_inis:
-            if each_ini == ModifyINI.app_config_name:
-                continue
-
-            for ini_path, ini_object in ModifyINI.open_inis[each_ini].items():
-                inis_by_location.setdefault(ini_path, []).append(ini_object)
-                if ini_object.has_been_modified:
-                    inis_by_location_modified.setdefault(ini_path, []).append(ini_object)
-
-                backups_path = ini_path / f"{my_app_name} backups"
-                first_time_backup_path = backups_path / "First-Time-Backup"
-                if not first_time_backup_path.exists():
-                    locations_without_first_backup.add(ini_path)
-
-        if not inis_by_location_modified:
-            self.sme("No files were modified. Saving skipped.")
-            return
-
-        files_saved = False
-        for ini_location, inis in inis_by_location_modified.items():
-            backups_path = ini_location / f"{my_app_name} backups"
-            for ini_object in inis:
-                save_dialog = SaveChangesDialog(self, ini_object)
-                self.wait_window(save_dialog)
-
-                if save_dialog.result:
-                    remove_excess_directory_files(
-                        backups_path,
-                        int(cast("str", ModifyINI.app_config().get_value("General", "iMaxBackups", "5"))),
-                        files_to_remove,
-                    )
-                    if self.makeBackups:
-                        if ini_location in locations_without_first_backup and self.makeBackups:
-                            locations_without_first_backup.remove(ini_location)
-                            self.create_first_time_backup(ini_location, inis_by_location[ini_location])
-
-                        current_backup_path = backups_path / LOG_DIR_DATE
-                        current_backup_path.mkdir(parents=True, exist_ok=True)
-                        current_backup_file_path = current_backup_path / ini_object.ini_path.name
-                        if current_backup_file_path.exists():
-                            logger.warning(f"{current_backup_file_path} already exists, so it will not be overwritten.")
-                        else:
-                            try:
-                                copyfile(ini_object.ini_path, current_backup_file_path)
-                            except FileNotFoundError as e:
-                                logger.exception(
-                                    f"{ini_object.ini_path} does not exist, so it cannot be backed up. This is typically caused by a path not being set correctly."
-                                )
-                    try:
-                        ini_object.save_ini_file(sort=save_dialog.sort)
-                        file_saved = True
-                        files_saved = True
-                    except PermissionError as e:
-                        logger.exception(f"{ini_object.ini_path} was not able to be saved due to lacking permission to edit the file.")
-                        if not os.access(ini_object.ini_path, os.W_OK):
-                            logger.warning(f"{ini_object.ini_path} is read only.")
-                            change_read_only = AskQuestionWindow(
-                                self, title="Remove read-only flag?",
-                                question=f"{ini_object.ini_path} is set to read-only, so it cannot be saved. Would you like to temporarily clear the read-only flag to allow it to be saved?")
-                            self.wait_window(change_read_only)
-                            if change_read_only.result:
-                                try:
-                                    os.chmod(ini_object.ini_path, S_IWRITE)
-                                    ini_object.save_ini_file(sort=save_dialog.sort)
-                                    file_saved = True
-                                    files_saved = True
-                                    os.chmod(ini_object.ini_path, S_IREAD)
-                                except PermissionError as e:
-                                    logger.exception(f"{ini_object.ini_path} was still not able to be saved after clearing read-only flag.")
-                            else:
-                                logger.debug(f"User decided not to clear the read-only flag on {ini_object.ini_path}")
-                                file_saved = False
-                        else:
-                            logger.info(f"{ini_object.ini_path} is not read only.")
-                            file_saved = False
-                    if file_saved:
-                        self.sme(f"{ini_object.ini_path} saved.")
-                        if self.makeBackups:
-                            copyfile(APP_LOG_FILE, current_backup_path / APP_LOG_FILE.name)
-
+        def choose(ini_object: ModifyINI) -> bool | None:
+            save_dialog = SaveChangesDialog(self, ini_object)
+            self.wait_window(save_dialog)
+            return save_dialog.sort if save_dialog.result else None
+
+        def clear_read_only(ini_object: ModifyINI) -> bool:
+            change_read_only = AskQuestionWindow(
+                self, title="Remove read-only flag?",
+                question=f"{ini_object.ini_path} is set to read-only, so it cannot be saved. Would you like to temporarily clear the read-only flag to allow it to be saved?")
+            self.wait_window(change_read_only)
+            if not change_read_only.result:
+                logger.debug(f"User decided not to clear the read-only flag on {ini_object.ini_path}")
+            return bool(change_read_only.result)
+
+        saved, failed = save_ini_files(
+            f"{my_app_name} backups",
+            LOG_DIR_DATE,
+            make_backups=self.makeBackups,
+            log_file=APP_LOG_FILE,
+            choose=choose,
+            clear_read_only=clear_read_only,
+        )
+        for ini_object in saved:
+            self.sme(f"{ini_object.ini_path} saved.")
+        for ini_object in failed:
+            self.sme(f"{ini_object.ini_path} was not able to be saved. See the log for details.")
 
-        if not files_saved:
+        if not saved and not failed:
             self.sme("No files were modified. Saving skipped.")
 
     def set_preset(self, preset_id: str) -> None:
+        self.commit_pending_values()
         self.start_progress()
-        if preset_id == "Default":
-            self.apply_ini_dict(self.app.preset_values_default)
-            self.remove_ini_dict(self.app.can_remove_dict)
-            self.apply_ini_dict(self.app.preset_values_fixedDefault)
-            preset_var = ""
-        elif preset_id == "recommended":
-            preset_dict = self.app.preset_values_recommended
-            self.apply_ini_dict(preset_dict)
-            preset_var = ""
-        else:
-            preset_var = self.preset_var.get()
-            preset_dict = self.app.preset_values(f"{preset_var} {preset_id}")
-            self.apply_ini_dict(preset_dict)
-        self.stop_progress()
-        self.updateValues()
+        # The whole preset, including any changes made by the widgets updating, is a single undo step.
+        with ModifyINI.journal.group():
+            if preset_id in ("Default", "recommended"):
+                preset_var = ""
+                apply_preset(self.app, preset_id)
+            else:
+                preset_var = self.preset_var.get()
+                apply_preset(self.app, f"{preset_var} {preset_id}")
+            self.stop_progress()
+            self.refresh_changed_values()
         self.sme(f"Preset {preset_var} {preset_id} applied.")
 
-    def remove_invalid_settings(self) -> None:
-        remove_unknown_settings: str = ModifyINI.app_config().get_value("RemoveUnknown",
-                                                                        f"b{GAME_NAME}RemoveUnknownSettings",
-                                                                        self.app.bethini.get("Remove Unknown Settings Default"))
-        for each_ini in ModifyINI.open_inis:
-            if each_ini == ModifyINI.app_config_name or not self.app.get_ini_setting_name(each_ini):
-                continue
-
-            for ini_object in ModifyINI.open_inis[each_ini].values():
-                sections = ini_object.get_sections()
+    def undo(self, _event: "tk.Event[tk.Misc] | None" = None) -> None:
+        """Reverts the last change to the game INI files."""
 
-                for section in sections:
-                    settings = ini_object.get_settings(section)
-                    if not settings:
-                        ini_object.remove_section(section)
-                        logger.debug(f"{section} was removed because it was empty.")
-                        continue
-
-                    for setting_name in settings:
-                        if ";" in setting_name or "#" in setting_name:
-                            logger.debug(f"{setting_name}:{section} will be preserved, as it is a comment.")
-
-                        elif not self.app.does_setting_exist(each_ini, section, setting_name):
-                            if remove_unknown_settings == "1":
-                                ini_object.remove_setting(section, setting_name)
-
-                            logger.debug(f"{setting_name}:{section} {each_ini} appears to be invalid.")
-                            if not ini_object.get_settings(section):
-                                ini_object.remove_section(section)
-                                logger.debug(f"{section} was removed because it was empty.")
-
-    def apply_ini_dict(self, ini_dict: dict[str, GameSetting], *, only_if_missing: bool = False) -> None:
-        for setting_and_section in ini_dict:
-            # Settings are in the format `setting:section`
-            # e.g. sAntiAliasing:Display
+        self.commit_pending_values()
+        step = ModifyINI.journal.undo()
+        if step is None:
+            self.sme("Nothing to undo.")
+            return
+        self.refresh_after_journal()
+        self.sme(f"Undid {len(step)} change(s).")
 
-            target_setting = setting_and_section.split(":")[0]
-            if not only_if_missing and target_setting in self.app.bethini["presetsIgnoreTheseSettings"]:
-                continue
+    def redo(self, _event: "tk.Event[tk.Misc] | None" = None) -> None:
+        """Applies the last undone change to the game INI files again."""
 
-            target_ini = ini_dict[setting_and_section]["ini"]
-            target_section = ini_dict[setting_and_section]["section"]
-            this_value = str(ini_dict[setting_and_section]["value"])
+        self.commit_pending_values()
+        step = ModifyINI.journal.redo()
+        if step is None:
+            self.sme("Nothing to redo.")
+            return
+        self.refresh_after_journal()
+        self.sme(f"Redid {len(step)} change(s).")
 
-            if target_ini is None:
-                msg = f"{setting_and_section} has no INI set."
-                raise TypeError(msg)
+    def refresh_after_journal(self) -> None:
+        """Updates the widgets after an undo or redo, without recording what they change as new steps."""
 
-            target_ini_object = self.get_target_ini(
-                target_ini, target_section, target_setting)
+        with ModifyINI.journal.paused():
+            self.refresh_changed_values()
+            if self.previous_tab == "Advanced":
+                self.refresh_advanced_table()
 
-            # Check if we are only supposed to add the value if the value is missing
-            if only_if_missing and (target_ini_object.get_value(target_section, target_setting) is not None):
-                continue
+    def remove_invalid_settings(self) -> None:
+        remove_invalid_settings(self.app)
 
-            target_ini_object.assign_setting_value(target_section, target_setting, this_value)
-            logger.debug(f"{target_ini} [{target_section}] {target_setting}={this_value}")
+    def apply_ini_dict(self, ini_dict: dict[str, GameSetting], *, only_if_missing: bool = False) -> None:
+        apply_ini_dict(self.app, ini_dict, only_if_missing=only_if_missing)
 
     def remove_ini_dict(self, ini_dict: dict[str, GameSetting]) -> None:
-        for setting_and_section in ini_dict:
-            target_setting = setting_and_section.split(":")[0]
-            target_ini = ini_dict[setting_and_section]["ini"]
-            target_section = ini_dict[setting_and_section]["section"]
-            this_value = str(ini_dict[setting_and_section]["value"])
-
-            if target_ini is None:
-                msg = f"{setting_and_section} has no INI set."
-                raise TypeError(msg)
-
-            winning_ini = self.app.get_winning_ini_for_setting(
-                target_ini, target_section, target_setting)
-            target_ini_object = self.get_target_ini(target_ini, target_section, target_setting)
-
-            if winning_ini not in self.app.valid_inis:
-               continue
-
-            current_value = cast("str", target_ini_object.get_value(target_section, target_setting, this_value))
-
-            if current_value == this_value:
-                section_exists = target_ini_object.remove_setting(target_section, target_setting)
-                if section_exists:
-                   logger.debug(
-                       f"{winning_ini} [{target_section}] {target_setting}={this_value}, which is the default value, and since it is not set to alwaysPrint, it will be removed")
-                else:
-                   logger.debug(
-                       f"No section {target_section} exists for {target_setting} in {target_ini_object}.")
+        remove_ini_dict(self.app, ini_dict)
 
     def create_tab_image(self, tab_id: TabId) -> None:
         icon_path = exedir / "icons" / f"{self.tab_dictionary[tab_id]['Name']}.png"
@@ -935,7 +884,8 @@ class bethini_app(ttk.Window):
         func = self.widget_type_function.get(setting_type) if setting_type else None
 
         if func is not None:
-            func(tab_id, label_frame_name, label_frame_id, setting_frame_id, setting_name, setting_id)
+            with startup_profiler.span(setting_type, "widget"):
+                func(tab_id, label_frame_name, label_frame_id, setting_frame_id, setting_name, setting_id)
 
     def widget_type_switcher(self, setting_name: str) -> ValueList | str | None:
         setting: BethiniSetting = self.setting_dictionary[setting_name]
@@ -971,9 +921,10 @@ class bethini_app(ttk.Window):
             "targetSections": setting.get("targetSections", []),
         }
 
-        dependent_settings = setting.get("dependentSettings")
-        if dependent_settings:
-            self.dependent_settings_dictionary[setting_name] = dependent_settings
+        for ini_name, section, ini_setting in zip(
+            setting.get("targetINIs", []), setting.get("targetSections", []), setting.get("settings", []),
+        ):
+            self.settings_by_ini_key.setdefault((ini_name, section.lower()), {}).setdefault(ini_setting.lower(), []).append(setting_name)
 
     def checkbox(
         self,
@@ -1647,38 +1598,56 @@ class bethini_app(ttk.Window):
         return None
 
     def check_dependents(self, setting_name: str) -> None:
-        for dependent_setting_name in self.settings_that_settings_depend_on[setting_name]:
-            var = self.settings_that_settings_depend_on[setting_name][dependent_setting_name].get("var")
-
-            operator_func = self.settings_that_settings_depend_on[setting_name][dependent_setting_name].get("operator_func")
-            value = self.settings_that_settings_depend_on[setting_name][dependent_setting_name].get("value")
-            current_value = self.widget_type_switcher(setting_name)
-            second_tk_widget = self.setting_dictionary[dependent_setting_name].get("second_tk_widget")
-            if var == "float":
-                value = float(cast("str", value))
-                current_value = float(current_value)  # type: ignore[assignment]
-            if inspect.isroutine(operator_func) and operator_func(current_value, value):
-                self.setting_dictionary[dependent_setting_name]["tk_widget"].configure(state=tk.NORMAL)
-                if second_tk_widget:
-                    second_tk_widget.configure(state=tk.NORMAL)
-            else:
-                set_to_off = self.settings_that_settings_depend_on[setting_name][dependent_setting_name].get("setToOff")
-                if set_to_off:
-                    off_value = self.setting_dictionary[dependent_setting_name].get("Offvalue")
+        """Enables or disables every setting that depends on the given one, directly or not."""
+        self.update_dependents(self.app.dependency_graph.downstream([setting_name]))
 
-                    self.setting_dictionary[dependent_setting_name]["tk_var"].set(off_value)  # type: ignore[reportArgumentType]
-                self.setting_dictionary[dependent_setting_name]["tk_widget"].configure(state=tk.DISABLED)
+    def update_dependents(self, dependent_names: list[str]) -> None:
+        """Enables or disables the given dependent settings, which must be in topological order."""
+        graph = self.app.dependency_graph
+        master_values: dict[str, ValueList | str | None] = {}
+
+        def read_master(master_setting_name: str) -> ValueList | str | None:
+            if master_setting_name not in master_values:
+                master_values[master_setting_name] = self.widget_type_switcher(master_setting_name)
+            return master_values[master_setting_name]
+
+        self.updating_dependents = True
+        try:
+            for setting_name in dependent_names:
+                setting = self.setting_dictionary.get(setting_name)
+                if setting is None or any(rule.master not in self.setting_dictionary for rule in graph.rules[setting_name]):
+                    continue
+                failed_rule = graph.evaluate(setting_name, read_master)
+                if failed_rule is None:
+                    state = tk.NORMAL
+                else:
+                    state = tk.DISABLED
+                    if failed_rule.set_to_off:
+                        off_value = failed_rule.off_value if failed_rule.off_value is not None else setting.get("Offvalue")
+                        setting["tk_var"].set(off_value)  # type: ignore[reportArgumentType]
+                        # Its own dependents need to see the new value.
+                        master_values.pop(setting_name, None)
+                if self.dependent_states.get(setting_name) == state:
+                    continue
+                self.dependent_states[setting_name] = state
+                setting["tk_widget"].configure(state=state)
+                second_tk_widget = setting.get("second_tk_widget")
                 if second_tk_widget:
-                    second_tk_widget.configure(state=tk.DISABLED)
+                    second_tk_widget.configure(state=state)
+        finally:
+            self.updating_dependents = False
 
     def assign_value(self, setting_name: str) -> None:
-        widget_id = self.setting_dictionary[setting_name]["widget_id"]
-        func = self.widget_type_assign_value.get(widget_id)
-        if func is not None:
-            func(setting_name)
+        # Everything a single widget changes, including its dependents, is a single undo step.
+        with ModifyINI.journal.group():
+            widget_id = self.setting_dictionary[setting_name]["widget_id"]
+            func = self.widget_type_assign_value.get(widget_id)
+            if func is not None:
+                func(setting_name)
 
-        if setting_name in list(self.settings_that_settings_depend_on.keys()):
-            self.check_dependents(setting_name)
+            # While the dependents are being updated, the update already covers the dependents of this one.
+            if not self.updating_dependents and setting_name in self.app.dependency_graph.dependents_of:
+                self.check_dependents(setting_name)
 
     def checkbox_assign_value(self, setting_name: str) -> None:
         setting = self.setting_dictionary[setting_name]
@@ -2007,12 +1976,21 @@ class bethini_app(ttk.Window):
                     image=self.tab_dictionary[tab_id]["TkPhotoImageForTab"],
                     compound=tk.LEFT,
                 )
-
-            self.label_frames_for_tab(tab_id)
-            if self.tab_dictionary[tab_id]["Name"] == "Setup":
-                for setting_name in self.setting_dictionary:
-                    if setting_name == "Remove Unknown Settings":
-                        self.widget_type_switcher(setting_name)
+            self.tab_dictionary[tab_id]["Realized"] = False
+
+        # Only the tabs needed right away get their widgets now. The others get them when first selected.
+        linked_tabs = self.app.linked_tabs()
+        tab_ids_by_name = {tab["Name"]: tab_id for tab_id, tab in self.tab_dictionary.items()}
+        self.linked_tab_ids = {
+            tab_id: [tab_ids_by_name[tab_name] for tab_name in linked_tabs[tab["Name"]]]
+            for tab_id, tab in self.tab_dictionary.items()
+        }
+        first_tab_id = next((tab_id for tab_id, tab in self.tab_dictionary.items() if tab["Name"] != "Setup"), None)
+        for tab_id in self.tab_dictionary:
+            if tab_id == first_tab_id or self.is_tab_needed_at_startup(tab_id):
+                self.realize_tab(tab_id)
+        if "Remove Unknown Settings" in self.setting_dictionary:
+            self.widget_type_switcher("Remove Unknown Settings")
 
         self.advanced_tab = ttk.Frame(self.sub_container)
         icon_path = exedir / "icons" / "Advanced.png"
@@ -2039,8 +2017,13 @@ class bethini_app(ttk.Window):
             searchable=True,
             autoalign=False,
             yscrollbar=True,
+            virtual=True,
         )
         self.advanced_table.pack(fill=tk.BOTH, expand=YES)
+        # `setting:section` -> its row, kept between visits so that only the rows that changed are updated.
+        self.advanced_rows: dict[str, TableRow] = {}
+        # Tag -> the rows that have it
+        self.advanced_rows_by_tag: dict[str, set[TableRow]] = {"changed": set(), "edited": set()}
         self.advanced_table._rightclickmenu_cell.add_separator()
         self.advanced_table._rightclickmenu_cell.add_command(label="Edit", command=self.edit_advanced_table)
         # Create a submenu for filtering
@@ -2082,13 +2065,23 @@ class bethini_app(ttk.Window):
         )
         self.log_text = ScrolledText(self.log_tab, padding=5)
         self.log_text.pack(fill=tk.BOTH, expand=YES)
+        self.log_text_shown = 0
+        self.log_text_message_lines = deque()
         log_list.add_observer(self.update_log_text)
 
         self.stop_progress()
         if not from_choose_game_window:
-            self.updateValues()
+            with startup_profiler.span("updateValues"):
+                self.updateValues()
         self.start_progress()
-        self.bindTkVars()
+        with startup_profiler.span("bindTkVars"):
+            self.bindTkVars()
+        # Changes made while loading are not something the user can undo.
+        ModifyINI.journal.clear()
+        # From now on, only the widgets of settings that change are read again,
+        # unless the Setup window is open and they have not been read at all yet.
+        self.changed_setting_names = {}
+        self.all_settings_changed = from_choose_game_window
 
         self.sub_container.pack(fill=tk.BOTH, expand=True)
         self.stop_progress()
@@ -2097,15 +2090,56 @@ class bethini_app(ttk.Window):
         # Bind the <<NotebookTabChanged>> event to refresh the advanced table
         self.sub_container.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
+    def is_tab_needed_at_startup(self, tab_id: TabId) -> bool:
+        """The Setup tab, and tabs with settings that are forcibly selected, get their widgets at startup."""
+
+        tab_name = self.tab_dictionary[tab_id]["Name"]
+        if tab_name == "Setup":
+            return True
+        label_frames = cast("dict[str, SettingsLabelFrame]", self.app.bethini["displayTabs"][tab_name])
+        return any(
+            setting.get("forceSelect")
+            for label_frame in label_frames.values()
+            for setting in label_frame.get("Settings", {}).values()
+        )
+
+    def realize_tab(self, tab_id: TabId) -> list[str]:
+        """Creates the widgets of the tab, and of the tabs linked to it, if not already done.
+
+        Returns the names of the settings that were added to the setting dictionary.
+        """
+
+        known_setting_names = set(self.setting_dictionary)
+        for linked_tab_id in self.linked_tab_ids[tab_id]:
+            tab = self.tab_dictionary[linked_tab_id]
+            if not tab.get("Realized"):
+                tab["Realized"] = True
+                with startup_profiler.span(tab["Name"], "tab"):
+                    self.label_frames_for_tab(linked_tab_id)
+                logger.debug(f"Created the widgets of the {tab['Name']} tab")
+        return [setting_name for setting_name in self.setting_dictionary if setting_name not in known_setting_names]
+
     def on_tab_changed(self, event: tk.Event) -> None:
         selected_tab = event.widget.select()
         selected_tab_text = event.widget.tab(selected_tab, "text")
-        
+        self.commit_pending_values()
+
+        new_setting_names: list[str] = []
+        for tab_id, tab in self.tab_dictionary.items():
+            if str(tab.get("TkFrameForTab")) == str(selected_tab):
+                new_setting_names = self.realize_tab(tab_id)
+                break
+
+        if new_setting_names:
+            self.updateValues(new_setting_names)
+            self.bindTkVars(new_setting_names)
         if self.previous_tab == "Advanced" and selected_tab_text != "Advanced":
-            self.updateValues()
-        
+            self.refresh_changed_values()
+
         if selected_tab_text == "Advanced":
             self.refresh_advanced_table()
+        elif selected_tab_text == "Log":
+            self.show_log_text()
         
         self.previous_tab = selected_tab_text  # Update the previously selected tab
 
@@ -2142,24 +2176,55 @@ class bethini_app(ttk.Window):
                 section=row_data[1],
                 setting=row_data[2],
                 value=result)
-            new_row = list(row_data)
+            row = self.advanced_table.iidmap[item_id]
+            new_row = list(row.values)
             new_row[4] = result  # Update the current value column.
-            # Update the row with new values and apply the "success" tag.
-            self.advanced_table._rightclickmenu_cell.view.item(item_id, values=new_row, tags=("edited",))
+            # Update the row with new values and apply the "edited" tag.
+            row.values = new_row
+            self.set_advanced_row_tag(row, "edited")
 
     def refresh_advanced_table(self) -> None:
-        """Refresh the advanced tableview with INI files and their sections/settings."""
-        rowdata, tag = self.populate_advanced_table()
-        self.advanced_table.build_table_data(coldata=self.advanced_coldata, rowdata=rowdata)
-        for i, row_id in enumerate(self.advanced_table.view.get_children()):
-            # Apply tag if tagdata exists and is non-empty
-            if i < len(tag) and tag[i]:
-                self.advanced_table.view.item(row_id, tags=(tag[i],))
-
-    def populate_advanced_table(self) -> tuple[list[tuple[str, str, str, str, str]], list[str]]:
-        """Populate the advanced tableview with INI files and their sections/settings."""
-        rowdata = []
-        tagdata = []
+        """Refresh the advanced tableview with INI files and their sections/settings.
+
+        The table is only rebuilt if the settings it lists changed. Otherwise, only the rows whose values changed are updated.
+        """
+        rows = self.populate_advanced_table()
+        if rows.keys() != self.advanced_rows.keys():
+            self.advanced_table.build_table_data(coldata=self.advanced_coldata, rowdata=[values for values, _tag in rows.values()])
+            self.advanced_rows = dict(zip(rows, self.advanced_table.tablerows))
+            for tagged_rows in self.advanced_rows_by_tag.values():
+                tagged_rows.clear()
+            for setting_and_section, (_values, tag) in rows.items():
+                if tag:
+                    self.set_advanced_row_tag(self.advanced_rows[setting_and_section], tag)
+            return
+
+        for setting_and_section, (values, tag) in rows.items():
+            row = self.advanced_rows[setting_and_section]
+            # A row keeps its "edited" tag until its value is changed by something else.
+            if row.values != list(values):
+                row.values = list(values)
+                self.set_advanced_row_tag(row, tag)
+
+    def set_advanced_row_tag(self, row: "TableRow", tag: str) -> None:
+        """Tags a row of the advanced tableview, or removes its tag if tag is empty."""
+        for tag_name, tagged_rows in self.advanced_rows_by_tag.items():
+            if tag_name == tag:
+                tagged_rows.add(row)
+            else:
+                tagged_rows.discard(row)
+        row.configure(tags=(tag,) if tag else ())
+
+    def populate_advanced_table(self) -> dict[str, tuple[tuple[str, str, str, str, str], str]]:
+        """Return the row of each setting in the advanced tableview, and its tag, by `setting:section`.
+
+        Settings in the INI files that have no default value, including those not in settings.json,
+        are listed after the others by `setting:section:INI`.
+        """
+        rows: dict[str, tuple[tuple[str, str, str, str, str], str]] = {}
+        # (INI, lowercase section, lowercase setting) of every setting listed so far
+        listed: set[tuple[str, str, str]] = set()
+        pecking_order = self.app.bethini["INI_pecking_order"]
 
         ini_section_setting_dict = self.app.preset_values_default
         fixed_default_dict = self.app.preset_values_fixedDefault
@@ -2189,104 +2254,181 @@ class bethini_app(ttk.Window):
 
             # If current_value differs from default_value, set tag "changed"
             tag = "changed" if str(current_value) != str(default_value) else ""
-            tagdata.append(tag)
-            rowdata.append((winning_ini, target_section, target_setting, default_value, current_value))
+            rows[setting_and_section] = ((winning_ini, target_section, target_setting, default_value, current_value), tag)
+            for ini_name in pecking_order.get(target_ini, (target_ini,)):
+                listed.add((ini_name, target_section.lower(), target_setting.lower()))
 
-        return rowdata, tagdata
+        for ini_name in self.app.bethini["INIs"]:
+            ini_location = self.getINILocation(ini_name) if ini_name != ModifyINI.app_config_name else ""
+            if not ini_location:
+                continue
+            allow_sorting: bool = ini_name in self.app.bethini.get("Allow Sorted INIs", [])
+            ini_object = ModifyINI.open(name=ini_name, location=Path(ini_location), sortable=allow_sorting)
+            for section in ini_object.get_sections():
+                for setting in ini_object.get_settings(section, original_case=True):
+                    if (ini_name, section.lower(), setting.lower()) in listed:
+                        continue
+                    # Settings that only differ by case are separate rows, each with its own value.
+                    current_value = cast("str", ini_object.config.get(section, setting, fallback=""))
+                    rows[f"{setting}:{section}:{ini_name}"] = ((ini_name, section, setting, "", current_value), "")
+
+        return rows
 
     def get_target_ini(self, ini_name: str, section: str, setting: str) -> ModifyINI:
         """Return the target INI object for the given ini name, section, and setting."""
-        winning_ini = self.app.get_winning_ini_for_setting(ini_name, section, setting)
-        ini_location = self.getINILocation(winning_ini)
-
-        allow_sorting: bool = ini_name in self.app.bethini.get("Allow Sorted INIs", [])
-        if ModifyINI.app_config_name == ini_name:
-            allow_sorting = True
-
-        return ModifyINI.open(name=winning_ini, location=Path(ini_location), sortable=allow_sorting)
+        return get_target_ini(self.app, ini_name, section, setting)
 
     def filter_advanced_table_by_tag(self, tag: str) -> None:
         """Filter table view to show only rows with the specified tag."""
-        for item in self.advanced_table.view.get_children():
-            item_tags = self.advanced_table.view.item(item, "tags")
-            if tag in item_tags:
-                self.advanced_table.view.reattach(item, '', 'end')
-            else:
-                self.advanced_table.view.detach(item)
+        self.advanced_table.filter_rows(self.advanced_rows_by_tag[tag])
 
-    def bindTkVars(self) -> None:
-        for setting_name in self.setting_dictionary:
-            tk_var = self.setting_dictionary[setting_name].get("tk_var")
+    def bindTkVars(self, setting_names: Iterable[str] | None = None) -> None:
+        for setting_name in self.setting_dictionary if setting_names is None else setting_names:
+            setting = self.setting_dictionary[setting_name]
+            tk_var = setting.get("tk_var")
             if tk_var:
-                tk_var.trace_add(
-                    "write",
-                    lambda _var, _index, _mode, setting_name=setting_name: self.assign_value(setting_name),
-                )
-            if self.setting_dictionary[setting_name].get("forceSelect"):
+                if setting["widget_id"] in debounced_widget_ids:
+                    tk_var.trace_add(
+                        "write",
+                        lambda _var, _index, _mode, setting_name=setting_name: self.schedule_commit(setting_name),
+                    )
+                    # Leaving the widget, pressing Enter or letting go of the slider writes the value right away.
+                    for tk_widget in (setting["tk_widget"], setting.get("second_tk_widget")):
+                        if tk_widget is None:
+                            continue
+                        for sequence in ("<FocusOut>", "<Return>", "<KP_Enter>", "<ButtonRelease-1>"):
+                            tk_widget.bind(
+                                sequence,
+                                lambda _event, setting_name=setting_name: self.commit_value(setting_name),
+                                add="+",
+                            )
+                else:
+                    tk_var.trace_add(
+                        "write",
+                        lambda _var, _index, _mode, setting_name=setting_name: self.assign_value(setting_name),
+                    )
+            if setting.get("forceSelect"):
                 self.assign_value(setting_name)
 
+    def schedule_commit(self, setting_name: str) -> None:
+        """Writes the value of a debounced widget once it has been stable for commit_delay_ms.
+
+        Values set by the app itself, rather than by the user, are written right away.
+        """
+        after_id = self.pending_commits.pop(setting_name, None)
+        if after_id is not None:
+            self.after_cancel(after_id)
+
+        if self.commit_delay_ms <= 0 or self.reading_values or self.updating_dependents:
+            self.assign_value(setting_name)
+            return
+        self.pending_commits[setting_name] = self.after(self.commit_delay_ms, self.commit_value, setting_name)
+
+    def commit_value(self, setting_name: str) -> None:
+        """Writes the value of a debounced widget now, if it is waiting to be written."""
+        after_id = self.pending_commits.pop(setting_name, None)
+        if after_id is None:
+            return
+        self.after_cancel(after_id)
+        self.assign_value(setting_name)
+
+    def commit_pending_values(self) -> None:
+        """Writes the value of every debounced widget that is waiting to be written."""
+        for setting_name in list(self.pending_commits):
+            self.commit_value(setting_name)
+
     def update_log_text(self) -> None:
+        """Redraws the log tab once the current burst of log messages is over."""
+        if self.log_text_after_id is None:
+            self.log_text_after_id = self.after(STATUS_INTERVAL_MS, self.show_log_text)
+
+    def show_log_text(self) -> None:
+        """Appends the new log messages to the log tab while it is visible, dropping the oldest."""
+        self.log_text_after_id = None
         try:
-            self.log_text.delete(1.0, tk.END)
-            self.log_text.insert(tk.END, "\n".join(log_list) + '\n')
+            if self.sub_container.select() != str(self.log_tab):
+                return
+            new_messages, some_dropped = log_list.since(self.log_text_shown)
+            self.log_text_shown = log_list.total
+            if some_dropped:
+                self.log_text.delete(1.0, tk.END)
+                self.log_text_message_lines.clear()
+            if new_messages:
+                self.log_text.insert(tk.END, "\n".join(new_messages) + "\n")
+                self.log_text_message_lines.extend(message.count("\n") + 1 for message in new_messages)
+            excess_lines = 0
+            while len(self.log_text_message_lines) > log_list.capacity:
+                excess_lines += self.log_text_message_lines.popleft()
+            if excess_lines:
+                self.log_text.delete(1.0, f"{excess_lines + 1}.0")
             self.log_text.see(tk.END)
         except tk.TclError:
             logger.debug("Log tab currently unavailable.")
 
-    def updateValues(self) -> None:
+    def on_ini_change(self, ini_object: ModifyINI, section: str, setting: str | None) -> None:
+        """Remembers the settings whose widgets show a setting of an INI that changed."""
+
+        if self.app is None or self.all_settings_changed:
+            return
+        ini_name = ini_object.ini_path.name
+        if (
+            (ini_name == ModifyINI.app_config_name and section.lower() == "directories")
+            or section == ini_object.case_insensitive_config.default_section
+        ):
+            # This can change the value of any setting.
+            self.all_settings_changed = True
+            return
+        # The INI can provide the value of the settings of every INI whose pecking order it is in.
+        target_inis = [ini_name]
+        for main_ini, pecking_order in self.app.bethini["INI_pecking_order"].items():
+            if ini_name in pecking_order and main_ini != ini_name:
+                target_inis.append(main_ini)
+        for target_ini in target_inis:
+            settings = self.settings_by_ini_key.get((target_ini, section.lower()))
+            if not settings:
+                continue
+            if setting is not None:
+                self.changed_setting_names.update(dict.fromkeys(settings.get(setting.lower(), ())))
+            else:
+                for setting_names in settings.values():
+                    self.changed_setting_names.update(dict.fromkeys(setting_names))
+
+    def refresh_changed_values(self) -> None:
+        """Reads the INI values into the widgets of the settings that changed, and of their dependents."""
+
+        if self.all_settings_changed:
+            self.updateValues()
+        else:
+            changed_setting_names = self.changed_setting_names
+            changed_setting_names.update(dict.fromkeys(self.app.dependency_graph.downstream(changed_setting_names)))
+            setting_names = [setting_name for setting_name in changed_setting_names if setting_name in self.setting_dictionary]
+            if setting_names:
+                self.updateValues(setting_names)
+        # Reading the values into the widgets writes them back, which is not a change to read again.
+        self.changed_setting_names = {}
+        self.all_settings_changed = False
+
+    def updateValues(self, setting_names: Iterable[str] | None = None) -> None:
+        """Reads the INI values into the widgets of the given settings, or of every setting."""
+        if setting_names is not None:
+            setting_names = list(setting_names)
         self.start_progress()
         self.sme("Updating INI values.")
-        self.ignore_log_sme_updates = True
-        for setting_name in self.setting_dictionary:
-            self.widget_type_switcher(setting_name)
-        self.ignore_log_sme_updates = False
+        self.reading_values = True
+        try:
+            for setting_name in self.setting_dictionary if setting_names is None else setting_names:
+                self.widget_type_switcher(setting_name)
+        finally:
+            self.reading_values = False
         self.sme("Checking for dependent settings.")
-        self.ignore_log_sme_updates = True
-        self.dependents()
-        self.ignore_log_sme_updates = False
+        self.dependents(setting_names)
         self.sme("Update values complete.")
         self.stop_progress()
 
-    def dependents(self) -> None:
-        for setting_name in self.dependent_settings_dictionary:
-            for master_setting_name in self.dependent_settings_dictionary[setting_name]:
-                dependent_setting = self.dependent_settings_dictionary[setting_name][master_setting_name]
-                operator_name = dependent_setting["operator"]
-                operator_func = operator_dictionary[operator_name]
-                set_to_off = dependent_setting.get("setToOff", False)
-                if operator_name in {"equal", "not-equal"}:
-                    value = dependent_setting.get("value")
-                    current_value = self.widget_type_switcher(master_setting_name)
-                    var: Literal["string", "float"] = "string"
-                else:
-                    value = float(dependent_setting["value"])  # type: ignore[reportArgumentType]
-                    current_value = float(self.widget_type_switcher(master_setting_name))  # type: ignore[assignment]
-                    var = "float"
-                setting = self.setting_dictionary[setting_name]
-                second_tk_widget = setting.get("second_tk_widget")
-
-                if operator_func(current_value, value):  # type: ignore[reportArgumentType]
-                    setting["tk_widget"].configure(state=tk.NORMAL)
-                    if second_tk_widget:
-                        second_tk_widget.configure(state=tk.NORMAL)
-                else:
-                    if set_to_off:
-                        off_value = dependent_setting.get("Offvalue")
-                        setting["tk_var"].set(off_value)  # type: ignore[reportArgumentType]
-                    setting["tk_widget"].configure(state=tk.DISABLED)
-                    if second_tk_widget:
-                        second_tk_widget.configure(state=tk.DISABLED)
-
-                if master_setting_name not in self.settings_that_settings_depend_on:
-                    self.settings_that_settings_depend_on[master_setting_name] = {}
-
-                self.settings_that_settings_depend_on[master_setting_name][setting_name] = {
-                    "operator": dependent_setting["operator"],
-                    "operator_func": cast("Callable[[Any], Any]", operator_func),
-                    "value": value or "",
-                    "var": var,
-                    "setToOff": set_to_off,
-                }
+    def dependents(self, setting_names: Iterable[str] | None = None) -> None:
+        """Enables or disables the dependent settings among the given settings, or all of them."""
+        graph = self.app.dependency_graph
+        self.update_dependents(graph.order if setting_names is None else graph.in_order(setting_names))
 
     def validate(self, new_value: str, _old_value: str, validate: Literal["integer", "whole", "counting", "float"]) -> bool:
         try:
@@ -2311,13 +2453,7 @@ class bethini_app(ttk.Window):
         return False
 
     def getINILocation(self, ini_name: ININame) -> str | Literal[""]:
-        if ini_name == ModifyINI.app_config_name:
-            return str(exedir)
-        ini_setting_name = self.app.get_ini_setting_name(ini_name)
-        if not ini_setting_name:
-            msg = f"Unknown INI: {ini_name}"
-            raise NotImplementedError(msg)
-        return ModifyINI.app_config().get_value("Directories", ini_setting_name) or ""
+        return get_ini_location(self.app, ini_name)
 
     def get_setting_values(
         self,
@@ -2383,6 +2519,7 @@ class bethini_app(ttk.Window):
 
         This is bound to the main app window closing.
         """
+        self.commit_pending_values()
         quit_query = AskQuestionWindow(self, title="Quit", question="Do you want to quit?")
         self.wait_window(quit_query)
         if quit_query.result:
@@ -2391,55 +2528,12 @@ class bethini_app(ttk.Window):
             self.save_ini_files()
             self.quit()
 
-def remove_excess_directory_files(directory: Path, max_to_keep: int, files_to_remove: list[str]) -> None:
-    """Remove excess logs or backups.
-
-    directory: The directory to remove files from.
-    max_to_keep: The maximum amount of directories that will be excluded from removal.
-    files_to_remove: List of files that will be removed.
-    """
-
-    if max_to_keep <= -1:
-        return
-
-    try:
-        subdirectories = [d for d in directory.iterdir() if d.is_dir()]
-    except FileNotFoundError:
-        return
-
-    if subdirectories:
-        subdirectories = [d for d in subdirectories if d.name != "First-Time-Backup"]
-    if len(subdirectories) <= max_to_keep:
-        return
-
-    subdirectories.sort(key=os.path.getctime, reverse=True)
-    for index, dir_path in enumerate(subdirectories):
-        if index < max_to_keep:
-            logger.debug(f"{dir_path} will be kept.")
-            continue
-
-        file_delete_failed = False
-        for file in files_to_remove:
-            file_path = dir_path / file
-            try:
-                file_path.unlink(missing_ok=True)
-            except OSError:
-                logger.exception("Failed to delete file old.")
-                file_delete_failed = True
-
-        if file_delete_failed:
-            logger.error(f"Old folder cannot be deleted: {dir_path}")
-            continue
-
-        try:
-            dir_path.rmdir()
-        except OSError:
-            logger.exception(f"Failed to delete old folder: {dir_path}")
-        else:
-            logger.debug(f"Old folder was deleted: {dir_path}")
-
-
 if __name__ == "__main__":
+    startup_arg_parser = argparse.ArgumentParser(add_help=False)
+    startup_arg_parser.add_argument("--profile-startup", action="store_true")
+    if startup_arg_parser.parse_known_args()[0].profile_startup:
+        startup_profiler.enable()
+
     if getattr(sys, 'frozen', False):
         exedir = Path(sys.executable).parent
     else:
@@ -2454,7 +2548,8 @@ if __name__ == "__main__":
     fmt = "%(asctime)s  [%(levelname)s]  %(filename)s  %(funcName)s:%(lineno)s:  %(message)s"
     datefmt = "%Y-%m-%d %H:%M:%S"
 
-    log_level = ModifyINI.app_config().get_value("General", "sLogLevel", "Info")
+    with startup_profiler.span("ModifyINI.app_config"):
+        log_level = ModifyINI.app_config().get_value("General", "sLogLevel", "Info")
 
     log_level_dict = {
         "Critical": logging.CRITICAL,
@@ -2464,17 +2559,18 @@ if __name__ == "__main__":
         "Debug": logging.DEBUG
     }
 
-    logging.basicConfig(filename=APP_LOG_FILE, filemode="w", format=fmt, datefmt=datefmt, encoding="utf-8", level=log_level_dict.get(log_level))
-    logger = logging.getLogger()
-    _log_stdout = logging.StreamHandler(sys.stdout)  # to console
-    _log_stdout.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
-    logger.addHandler(_log_stdout)
-    logger.info(f"Logging to '{APP_LOG_FILE}'")
+    with startup_profiler.span("Logging setup"):
+        logging.basicConfig(filename=APP_LOG_FILE, filemode="w", format=fmt, datefmt=datefmt, encoding="utf-8", level=log_level_dict.get(log_level))
+        logger = logging.getLogger()
+        _log_stdout = logging.StreamHandler(sys.stdout)  # to console
+        _log_stdout.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+        logger.addHandler(_log_stdout)
+        logger.info(f"Logging to '{APP_LOG_FILE}'")
 
-    log_list = observable_list()
-    app_log_list_handler = log_list_handler(log_list)
-    app_log_list_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    logger.addHandler(app_log_list_handler)
+        log_list = observable_log()
+        app_log_list_handler = log_list_handler(log_list)
+        app_log_list_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(app_log_list_handler)
 
     iMaxLogs = cast("str", ModifyINI.app_config().get_value("General", "iMaxLogs", "5"))
     ModifyINI.app_config().assign_setting_value("General", "iMaxLogs", iMaxLogs)
@@ -2483,6 +2579,37 @@ if __name__ == "__main__":
         "iMaxBackups",
         cast("str", ModifyINI.app_config().get_value("General", "iMaxBackups", "5")),
     )
+    # The number of log messages kept for the Log tab.
+    iMaxLogMessages = cast("str", ModifyINI.app_config().get_value("General", "iMaxLogMessages", "2000"))
+    ModifyINI.app_config().assign_setting_value("General", "iMaxLogMessages", iMaxLogMessages)
+    log_list.set_capacity(max(1, int(iMaxLogMessages)))
+
+    # The number of milliseconds the value of a slider, spinbox or entry must be stable before it is written.
+    iCommitDelayMs = cast("str", ModifyINI.app_config().get_value("General", "iCommitDelayMs", str(bethini_app.commit_delay_ms)))
+    ModifyINI.app_config().assign_setting_value("General", "iCommitDelayMs", iCommitDelayMs)
+    bethini_app.commit_delay_ms = max(0, int(iCommitDelayMs))
+
+    # The number of preview images kept decoded in memory.
+    iPreviewImagesInMemory = cast("str", ModifyINI.app_config().get_value("General", "iPreviewImagesInMemory", str(bethini_app.preview_images_in_memory)))
+    ModifyINI.app_config().assign_setting_value("General", "iPreviewImagesInMemory", iPreviewImagesInMemory)
+    bethini_app.preview_images_in_memory = max(1, int(iPreviewImagesInMemory))
+
+    # Set bFastINIParser=0 to parse the game INI files with the legacy parser.
+    bFastINIParser = cast("str", ModifyINI.app_config().get_value("General", "bFastINIParser", "1"))
+    ModifyINI.app_config().assign_setting_value("General", "bFastINIParser", bFastINIParser)
+    customConfigParser.use_fast_parser = bFastINIParser != "0"
+
+    # Set bINICache=0 to parse the game INI files from scratch every time.
+    bINICache = cast("str", ModifyINI.app_config().get_value("General", "bINICache", "1"))
+    ModifyINI.app_config().assign_setting_value("General", "bINICache", bINICache)
+    if bINICache != "0":
+        ModifyINI.ini_cache = INICache(exedir / "cache")
+
+    # Set bPluginCache=0 to parse the Bethini.json and settings.json of the game from scratch every time.
+    bPluginCache = cast("str", ModifyINI.app_config().get_value("General", "bPluginCache", "1"))
+    ModifyINI.app_config().assign_setting_value("General", "bPluginCache", bPluginCache)
+    if bPluginCache != "0":
+        AppName.plugin_cache = PluginCache(exedir / "cache" / "plugins")
 
     # Theme
     theme = ModifyINI.app_config().get_value("General", "sTheme", "superhero")
@@ -2491,7 +2618,8 @@ if __name__ == "__main__":
     ModifyINI.app_config().assign_setting_value("General", "sTheme", theme)
 
     # Remove excess log files.
-    remove_excess_directory_files(exedir / "logs", int(iMaxLogs), [APP_LOG_FILE.name])
+    with startup_profiler.span("remove_excess_directory_files"):
+        remove_excess_directory_files(exedir / "logs", int(iMaxLogs), [APP_LOG_FILE.name])
 
     # Get version
     try:
@@ -2500,8 +2628,13 @@ if __name__ == "__main__":
     except FileNotFoundError:
         version = ""
 
-    window = bethini_app(themename=theme)
-    window.pack_stuff()
-    window.choose_game()
-    
+    with startup_profiler.span("bethini_app"):
+        window = bethini_app(themename=theme)
+    with startup_profiler.span("pack_stuff"):
+        window.pack_stuff()
+    with startup_profiler.span("choose_game"):
+        window.choose_game()
+    if startup_profiler.enabled:
+        window.after_idle(window.finish_startup_profile, APP_LOG_DIR / "startup-profile.json")
+
     window.mainloop()
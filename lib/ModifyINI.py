@@ -7,14 +7,20 @@
 
 import configparser
 import logging
+import os
 import sys
 from pathlib import Path
-from typing import ClassVar
+from typing import TYPE_CHECKING, ClassVar, cast
 
 if __name__ == "__main__":
     sys.exit(1)
 
-from lib.customConfigParser import customConfigParser
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+from lib.change_journal import Change, ChangeJournal
+from lib.customConfigParser import IniDocument, customConfigParser
+from lib.ini_cache import INICache
 from lib.type_helpers import *
 
 logger = logging.getLogger(__name__)
@@ -31,6 +37,14 @@ class ModifyINI:
     app_config_name: ClassVar[ININame] = "Bethini.ini"
     open_inis: ClassVar[dict[ININame, dict[Path, "ModifyINI"]]] = {}
     _open_app_config: ClassVar["ModifyINI | None"] = None
+    app_config_directory: ClassVar[Path | None] = None
+    """The directory of Bethini.ini. The working directory if None."""
+    ini_cache: ClassVar[INICache | None] = None
+    """If set, parsed INI files are cached here. Bethini.ini itself is never cached."""
+    journal: ClassVar[ChangeJournal] = ChangeJournal()
+    """The undo history of every INI file except Bethini.ini, which has its own."""
+    listeners: ClassVar[list["Callable[[ModifyINI, str, str | None], None]"]] = []
+    """Called with the INI, section and setting after a setting changes, or with a setting of None after a section is added or removed."""
 
     @staticmethod
     def app_config() -> "ModifyINI":
@@ -38,7 +52,7 @@ class ModifyINI:
 
         if not ModifyINI._open_app_config:
             ModifyINI._open_app_config = ModifyINI.open(
-                name=ModifyINI.app_config_name, location=Path.cwd(), sortable=True)
+                name=ModifyINI.app_config_name, location=ModifyINI.app_config_directory or Path.cwd(), sortable=True)
         return ModifyINI._open_app_config
 
     @staticmethod
@@ -64,34 +78,119 @@ class ModifyINI:
         self.preserve_case = preserve_case
         self.sortable = sortable
 
+        # The file is only read and parsed once. The case insensitive and read-only
+        # views are derived from that parse and share its strings.
         self.config = customConfigParser()
         if preserve_case:
             self.config.optionxform = lambda optionstr: optionstr
-        logger.info(f"Successfully read {self.config.read(self.ini_path, encoding='utf-8')}")
+        stat = None
+        try:
+            # newline="" keeps the original line endings for the document.
+            with self.ini_path.open(encoding="utf-8", newline="") as ini_file:
+                stat = os.fstat(ini_file.fileno())
+                text = ini_file.read()
+            read_ok = [str(self.ini_path)]
+        except OSError:
+            text = ""
+            read_ok = []
+
+        ini_cache = ModifyINI.ini_cache if name != ModifyINI.app_config_name else None
+        cached = None
+        if ini_cache and stat:
+            cached = ini_cache.load(self.ini_path, stat, text, preserve_case=preserve_case)
+        if cached:
+            self.document = self.config.restore_document(
+                cached["sections"], cached["defaults"], cached["records"], cached["newline"])
+        else:
+            self.document = self.config.read_document(text, str(self.ini_path))
+            if ini_cache and stat:
+                ini_cache.store(
+                    self.ini_path,
+                    stat,
+                    text,
+                    preserve_case=preserve_case,
+                    sections=self.config._sections,  # noqa: SLF001
+                    defaults=self.config._defaults,  # noqa: SLF001
+                    records=self.document.to_records(),
+                    newline=self.document.newline,
+                )
+        logger.info(f"Successfully read {read_ok}")
 
         self.case_insensitive_config = customConfigParser()
-        logger.info(f"Successfully read {self.case_insensitive_config.read(self.ini_path, encoding='utf-8')} (case insensitive)")
+        self.case_insensitive_config.copy_from(self.config)
 
         self.original_config = customConfigParser()
-        logger.info(f"Successfully read {self.original_config.read(self.ini_path, encoding='utf-8')} (read-only)")
+        self.original_config.copy_from(self.case_insensitive_config)
+
+        # Lowercase name -> existing name, so case lookups don't scan the file.
+        self._section_index: dict[str, str] = {}
+        self._setting_index: dict[str, dict[str, str]] = {}
+        self._build_case_index()
+
+        self._journal = ChangeJournal() if name == ModifyINI.app_config_name else ModifyINI.journal
+        # Every section and setting changed since the file was read, in the order they were changed.
+        # modifications is built from this rather than the journal, which forgets steps when it is
+        # cleared and does not record the changes made while it is paused.
+        self._touched: dict[str, dict[str, None]] = {}
+        # The state of every section and setting changed since the file was last saved, before it changed.
+        self._unsaved: dict[tuple[str, str | None], tuple[bool, str | None]] = {}
+
+    def _build_case_index(self) -> None:
+        """Builds the lowercase indexes of the existing sections and settings."""
+
+        self._section_index = {}
+        self._setting_index = {}
+        for section, options in self.config._sections.items():  # noqa: SLF001
+            self._section_index.setdefault(section.lower(), section)
+            setting_index: dict[str, str] = {}
+            for setting in options:
+                setting_index.setdefault(setting.lower(), setting)
+            self._setting_index[section] = setting_index
+
+    def _index_setting(self, section: str, setting: str) -> None:
+        """Adds a section and setting to the lowercase indexes."""
+
+        self._section_index.setdefault(section.lower(), section)
+        self._setting_index.setdefault(section, {}).setdefault(setting.lower(), setting)
+
+    def _unindex_setting(self, section: str, setting: str) -> None:
+        """Removes a setting from the lowercase index of its section.
+
+        If another setting of the same name in a different case remains, it takes its place.
+        """
+
+        setting_index = self._setting_index.get(section)
+        lowercase_setting = setting.lower()
+        if not setting_index or setting_index.get(lowercase_setting) != setting:
+            return
+        del setting_index[lowercase_setting]
+        for existing_setting in self.config._sections.get(section, ()):  # noqa: SLF001
+            if existing_setting.lower() == lowercase_setting:
+                setting_index[lowercase_setting] = existing_setting
+                break
 
-        self.has_been_modified = False
-        self.modifications: dict[str, dict[str, str]] = {}
+    def _unindex_section(self, section: str) -> None:
+        """Removes a section from the lowercase indexes.
+
+        If another section of the same name in a different case remains, it takes its place.
+        """
+
+        self._setting_index.pop(section, None)
+        lowercase_section = section.lower()
+        if self._section_index.get(lowercase_section) != section:
+            return
+        del self._section_index[lowercase_section]
+        for existing_section in self.config._sections:  # noqa: SLF001
+            if existing_section.lower() == lowercase_section:
+                self._section_index[lowercase_section] = existing_section
+                break
 
     def get_existing_section(self, section: str) -> str:
         """Searches for and returns an existing case version of the given section."""
 
         if self.config.has_section(section):
             return section
-
-        lowercase_section = section.lower()
-
-        for existing_section in self.get_sections():
-            lowercase_existing_section = existing_section.lower()
-            if lowercase_existing_section == lowercase_section:
-                section = existing_section
-                break
-        return section
+        return self._section_index.get(section.lower(), section)
 
     def get_original_value(self, section: str, setting: str) -> str | None:
         """Retrieves the original value of a given setting, if it exists."""
@@ -105,15 +204,10 @@ class ModifyINI:
         """Searches for and returns an existing case version of the given setting."""
 
         section = self.get_existing_section(section)
-
-        lowercase_setting = setting.lower()
-
-        for existing_setting in self.get_settings(section, original_case=True):
-            lowercase_existing_setting = existing_setting.lower()
-            if lowercase_existing_setting == lowercase_setting:
-                setting = existing_setting
-                break
-        return setting
+        setting_index = self._setting_index.get(section)
+        if setting_index is None:
+            return setting
+        return setting_index.get(setting.lower(), setting)
 
     def get_value(self, section: str, setting: str, default: str | None = None) -> str | None:
         """Retrieves the value of a given setting, if it exists."""
@@ -139,6 +233,151 @@ class ModifyINI:
             settings = []
         return settings
 
+    @property
+    def has_been_modified(self) -> bool:
+        """True if anything has changed since the file was last saved."""
+
+        return any(self._state(*key) != state for key, state in self._unsaved.items())
+
+    @property
+    def modifications(self) -> dict[str, dict[str, str]]:
+        """The changes since the file was read, by section and setting."""
+
+        modifications: dict[str, dict[str, str]] = {}
+        for section, settings in self._touched.items():
+            if not self.config.has_section(section):
+                if self.original_config.has_section(section):
+                    modifications[section] = {section: "Removed section"}
+                continue
+            for setting in settings:
+                original_value = self.get_original_value(section, setting)
+                if self.case_insensitive_config.has_option(section, setting):
+                    value = self.get_value(section, setting)
+                    if value != original_value:
+                        modifications.setdefault(section, {})[setting] = f"Changed from {original_value} to {value}"
+                elif self.original_config.has_option(section, setting):
+                    modifications.setdefault(section, {})[setting] = "Removed setting"
+        return modifications
+
+    def _state(self, section: str, setting: str | None) -> tuple[bool, str | None]:
+        """Returns whether a setting, or a section if setting is None, exists and its value."""
+
+        if setting is None:
+            return (self.config.has_section(section), None)
+        options = self.case_insensitive_config.get_options(section)
+        option = self.case_insensitive_config.optionxform(setting)
+        if options is None or option not in options:
+            return (False, None)
+        return (True, options[option])
+
+    def _mark(self, section: str, setting: str | None) -> None:
+        """Remembers that a setting, or a section if setting is None, is about to change."""
+
+        # Settings are compared case insensitively, so they are remembered by their lowercase name.
+        key = (section, setting if setting is None else setting.lower())
+        self._unsaved.setdefault(key, self._state(section, setting))
+        settings = self._touched.setdefault(section, {})
+        if setting is not None:
+            settings.setdefault(setting, None)
+
+    def _restore_case_insensitive(self, section: str, setting: str, state: tuple[bool, str | None]) -> None:
+        """Puts a setting of the case insensitive config back to a state returned by _state."""
+
+        exists, value = state
+        if exists:
+            self.case_insensitive_config[section][setting] = value
+        else:
+            self.case_insensitive_config.remove_option(section, setting)
+
+    def _set(
+        self,
+        section: str,
+        setting: str,
+        value: str | None,
+        *,
+        first_wins: bool = False,
+        case_insensitive_state: tuple[bool, str | None] | None = None,
+    ) -> None:
+        self._mark(section, setting)
+        self.config[section][setting] = value
+        if case_insensitive_state is not None:
+            self._restore_case_insensitive(section, setting, case_insensitive_state)
+        # When first_wins is set, an existing setting of a different case keeps its
+        # value in the case insensitive config, just like when the file is read.
+        elif not (first_wins and self.case_insensitive_config.has_option(section, setting)):
+            self.case_insensitive_config[section][setting] = value
+        self._index_setting(section, setting)
+        self.document.touch(section, self.config.optionxform(setting))
+        self._notify(section, setting)
+
+    def _remove(self, section: str, setting: str, *, case_insensitive_state: tuple[bool, str | None] | None = None) -> None:
+        self._mark(section, setting)
+        self.config.remove_option(section, setting)
+        if case_insensitive_state is not None:
+            self._restore_case_insensitive(section, setting, case_insensitive_state)
+        else:
+            self.case_insensitive_config.remove_option(section, setting)
+        self._unindex_setting(section, setting)
+        self.document.touch(section, self.config.optionxform(setting))
+        self._notify(section, setting)
+
+    def _add_section(self, section: str) -> None:
+        self._mark(section, None)
+        self.config.add_section(section)
+        self.case_insensitive_config.add_section(section)
+        self._section_index.setdefault(section.lower(), section)
+        self.document.touch_section(section)
+        self._notify(section, None)
+
+    def _remove_section(self, section: str) -> dict[str, str | None]:
+        options = dict(self.config.get_options(section) or {})
+        for setting in options:
+            self._mark(section, setting)
+        self._mark(section, None)
+        self.config.remove_section(section)
+        self.case_insensitive_config.remove_section(section)
+        self._unindex_section(section)
+        self.document.touch_section(section)
+        self._notify(section, None)
+        return options
+
+    def _notify(self, section: str, setting: str | None) -> None:
+        for listener in ModifyINI.listeners:
+            listener(self, section, setting)
+
+    def apply_change(self, change: Change, *, undo: bool) -> None:
+        """Applies a change from the journal again, or reverts it if undo is True."""
+
+        section, setting = change.section, change.setting
+        removes = change.op in ("remove", "remove_section")
+        if undo and change.op != "set":
+            # Reverting an addition removes it, and reverting a removal adds it back.
+            removes = not removes
+        if change.op in ("add_section", "remove_section"):
+            if removes:
+                self._remove_section(section)
+                return
+            self._add_section(section)
+            if change.op == "remove_section":
+                for option, value in cast("dict[str, str | None]", change.old).items():
+                    self._set(section, option, value, first_wins=True)
+                if change.case_insensitive_old is not None:
+                    case_insensitive_options = cast("dict[str, str | None]", self.case_insensitive_config.get_options(section))
+                    case_insensitive_options.clear()
+                    case_insensitive_options.update(cast("dict[str, str | None]", change.case_insensitive_old))
+        elif setting is None:
+            msg = f"{change.op} change without a setting."
+            raise ValueError(msg)
+        else:
+            # Undo puts the case insensitive config back as it was, which may differ from
+            # the setting itself when another setting only differs by case.
+            case_insensitive_state = cast("tuple[bool, str | None] | None", change.case_insensitive_old) if undo else None
+            if removes:
+                self._remove(section, setting, case_insensitive_state=case_insensitive_state)
+            else:
+                self._set(section, setting, cast("str | None", change.old if undo else change.new),
+                          case_insensitive_state=case_insensitive_state)
+
     def assign_setting_value(self, section: str, setting: str, value: str) -> bool:
         """Assigns the specified value to the specified setting only if
         different. Returns true if the value was changed.
@@ -147,33 +386,106 @@ class ModifyINI:
         # Preserves existing case for section
         section = self.get_existing_section(section)
 
-        # If section not in self.config, make the section.
-        if not self.config.has_section(section):
-            self.config.add_section(section)
-            self.case_insensitive_config.add_section(section)
+        with self._journal.group():
+            # If section not in self.config, make the section.
+            if not self.config.has_section(section):
+                self._add_section(section)
+                self._journal.record(Change("add_section", self, section, None, None, None))
 
-        # Preserves existing case for setting
-        setting = self.get_existing_setting(section, setting)
+            # Preserves existing case for setting
+            setting = self.get_existing_setting(section, setting)
 
-        current_value = self.get_value(section, setting)
-        if current_value != value:
-            self.config[section][setting] = value
-            self.case_insensitive_config[section][setting] = value
-            original_value = self.get_original_value(section, setting)
-            if original_value != value:
-                self.has_been_modified = True
-                if section not in self.modifications:
-                    self.modifications[section] = {}
-                self.modifications[section][setting] = f"Changed from {original_value} to {value}"
+            current_value = self.get_value(section, setting)
+            if current_value == value:
+                return False
+
+            options = cast("dict[str, str | None]", self.config.get_options(section))
+            option = self.config.optionxform(setting)
+            case_insensitive_old = self._state(section, setting)
+            if option in options:
+                change = Change("set", self, section, setting, options[option], value, case_insensitive_old)
             else:
-                if self.modifications.get(section):
-                    self.modifications[section].pop(setting, None)
-                if not self.modifications.get(section):
-                    self.modifications.pop(section, None)
-                if self.modifications == {}:
-                    self.has_been_modified = False
-            return True
-        return False
+                change = Change("add", self, section, setting, None, value, case_insensitive_old)
+            self._set(section, setting, value)
+            self._journal.record(change)
+        return True
+
+    def assign_many(self, values: "Iterable[tuple[str, str, str]]", *, only_if_missing: bool = False) -> int:
+        """Assigns many (section, setting, value) triples at once, as a single undo step.
+
+        This gives the same result as calling assign_setting_value for each of them,
+        but the case of each section is only looked up once. If only_if_missing is
+        True, settings that already have a value are skipped.
+        Returns the number of settings that were changed.
+        """
+
+        changed = 0
+        sections: dict[str, tuple[str, dict[str, str | None], dict[str, str | None]]] = {}
+        defaults = self.case_insensitive_config.get_options(self.case_insensitive_config.default_section) or {}
+        with self._journal.group():
+            for section, setting, value in values:
+                resolved = sections.get(section)
+                new_section = False
+                if resolved is None:
+                    existing_section = self.get_existing_section(section)
+                    if not self.config.has_section(existing_section):
+                        new_section = True
+                        self._add_section(existing_section)
+                        self._journal.record(Change("add_section", self, existing_section, None, None, None))
+                    resolved = (
+                        existing_section,
+                        cast("dict[str, str | None]", self.config.get_options(existing_section)),
+                        cast("dict[str, str | None]", self.case_insensitive_config.get_options(existing_section)),
+                    )
+                    sections[section] = resolved
+                existing_section, options, case_insensitive_options = resolved
+
+                setting = self.get_existing_setting(existing_section, setting)
+                lowercase_setting = setting.lower()
+                # The same lookup as get_value, without going through the configparser.
+                if lowercase_setting in case_insensitive_options:
+                    current_value = case_insensitive_options[lowercase_setting]
+                else:
+                    current_value = defaults.get(lowercase_setting)
+                if only_if_missing and current_value is not None and not new_section:
+                    continue
+                if current_value == value:
+                    continue
+
+                option = self.config.optionxform(setting)
+                case_insensitive_old = (lowercase_setting in case_insensitive_options, case_insensitive_options.get(lowercase_setting))
+                if option in options:
+                    change = Change("set", self, existing_section, setting, options[option], value, case_insensitive_old)
+                else:
+                    change = Change("add", self, existing_section, setting, None, value, case_insensitive_old)
+                self._set(existing_section, setting, value)
+                self._journal.record(change)
+                changed += 1
+        return changed
+
+    def remove_many(self, settings: "Iterable[tuple[str, str]]") -> int:
+        """Removes many (section, setting) pairs at once, as a single undo step.
+
+        Returns the number of settings that were removed.
+        """
+
+        removed = 0
+        with self._journal.group():
+            for section, setting in settings:
+                existing_section = self.get_existing_section(section)
+                options = self.config.get_options(existing_section)
+                if options is None:
+                    continue
+                existing_setting = self.get_existing_setting(existing_section, setting)
+                option = self.config.optionxform(existing_setting)
+                if option in options:
+                    old_value = options[option]
+                    case_insensitive_old = self._state(existing_section, existing_setting)
+                    self._remove(existing_section, existing_setting)
+                    self._journal.record(
+                        Change("remove", self, existing_section, existing_setting, old_value, None, case_insensitive_old))
+                    removed += 1
+        return removed
 
     def remove_setting(self, section: str, setting: str) -> bool:
         """Remove the specified setting.
@@ -183,39 +495,27 @@ class ModifyINI:
 
         existing_section = self.get_existing_section(section)
         existing_setting = self.get_existing_setting(existing_section, setting)
-        try:
-            self.config.remove_option(existing_section, existing_setting)
-            self.case_insensitive_config.remove_option(existing_section, existing_setting)
-            if self.original_config.has_option(existing_section, existing_setting):
-                self.has_been_modified = True
-                if existing_section not in self.modifications:
-                    self.modifications[existing_section] = {}
-                self.modifications[existing_section][existing_setting] = f"Removed setting"
-            else:
-                if self.modifications.get(existing_section):
-                    existing_setting_value = self.modifications[existing_section].get(setting)
-                    if existing_setting_value and "Changed from None to " in existing_setting_value:
-                        self.modifications[existing_section].pop(
-                            existing_setting, None)
-                if not self.modifications.get(existing_section):
-                    self.modifications.pop(existing_section, None)
-                if self.modifications == {}:
-                    self.has_been_modified = False
-        except configparser.NoSectionError:
+        options = self.config.get_options(existing_section)
+        if options is None:
             return False
+        option = self.config.optionxform(existing_setting)
+        if option in options:
+            old_value = options[option]
+            case_insensitive_old = self._state(existing_section, existing_setting)
+            self._remove(existing_section, existing_setting)
+            self._journal.record(
+                Change("remove", self, existing_section, existing_setting, old_value, None, case_insensitive_old))
         return True
 
     def remove_section(self, section: str) -> None:
         """Removes the specified section."""
 
         existing_section = self.get_existing_section(section)
-        self.config.remove_section(existing_section)
-        self.case_insensitive_config.remove_section(existing_section)
-        if self.original_config.has_section(existing_section):
-            self.has_been_modified = True
-            if existing_section not in self.modifications:
-                self.modifications[existing_section] = {}
-            self.modifications[existing_section][existing_section] = f"Removed section"
+        if not self.config.has_section(existing_section):
+            return
+        case_insensitive_options = dict(self.case_insensitive_config.get_options(existing_section) or {})
+        options = self._remove_section(existing_section)
+        self._journal.record(Change("remove_section", self, existing_section, None, options, None, case_insensitive_options))
 
     def sort(self) -> None:
         """Sorts all sections and settings."""
@@ -223,14 +523,31 @@ class ModifyINI:
         for section in self.config._sections:  # noqa: SLF001
             self.config._sections[section] = dict(sorted(self.config._sections[section].items()))  # noqa: SLF001
         self.config._sections = dict(sorted(self.config._sections.items()))  # noqa: SLF001
-        self.has_been_modified = True
+        self._build_case_index()
         logger.debug(f"Sorted {self.ini_path.name}")
 
-    def save_ini_file(self, *, sort: bool = False) -> None:
-        """Writes the file."""
+    def render_ini_file(self, *, sort: bool = False) -> str:
+        """Returns the text of the file, as save_ini_file writes it.
+
+        Unless sorted, only the lines of changed settings are rewritten, and
+        everything else is kept exactly as it was read.
+        """
 
         if sort:
             self.sort()
-        with self.ini_path.open("w", encoding="utf-8") as config_file:
-            self.config.write(config_file, space_around_delimiters=False)
-        self.has_been_modified = False
+            # Sorting moves every line, so the whole file is laid out again.
+            self.document = IniDocument.from_parser(self.config, self.document.newline)
+        return self.document.render(self.config)
+
+    def mark_saved(self) -> None:
+        """Records that the file was written, so it no longer has unsaved changes."""
+
+        self._unsaved = {}
+
+    def save_ini_file(self, *, sort: bool = False) -> None:
+        """Writes the file."""
+
+        text = self.render_ini_file(sort=sort)
+        with self.ini_path.open("w", encoding="utf-8", newline="") as config_file:
+            config_file.write(text)
+        self.mark_saved()
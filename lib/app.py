@@ -10,12 +10,15 @@ import json
 import sys
 import tkinter as tk
 from pathlib import Path
-from typing import cast
+from typing import Any, ClassVar, cast
 
 if __name__ == "__main__":
     sys.exit(1)
 
+from lib.dependency_graph import DependencyGraph
+from lib.ini_overlay import PeckingOrderOverlay
 from lib.ModifyINI import ModifyINI
+from lib.plugin_cache import PluginCache, SourceFingerprint
 from lib.type_helpers import *
 
 logger = logging.getLogger(__name__)
@@ -24,24 +27,83 @@ logger = logging.getLogger(__name__)
 class AppName:
     """This class handles the different apps/games supported, which are placed in the apps folder."""
 
+    plugin_cache: ClassVar[PluginCache | None] = None
+    """If set, the parsed and indexed plugins are cached here."""
+
+    _INDEX_ATTRIBUTES = (
+        "settings_index",
+        "_settings_by_key",
+        "_setting_values",
+        "_ini_section_setting_dict",
+        "_setting_type_dict",
+        "_setting_notes_dict",
+        "_can_remove",
+        "valid_settings",
+    )
+    """The attributes set by index_settings that are stored in the plugin cache.
+
+    The preset values are left out, as they are quicker to rebuild from the index when first used.
+    """
+
     def __init__(self, appname: str, exedir: Path) -> None:
-        with (exedir / "apps" / appname / "settings.json").open(encoding="utf-8") as app_json:
-            self.data: AppSettingsJSON = json.load(app_json)
-        with (exedir / "apps" / appname / "Bethini.json").open(encoding="utf-8") as bethini:
-            self.bethini: AppBethiniJSON = json.load(bethini)
+        plugin_directory = exedir / "apps" / appname
+        settings_path = plugin_directory / "settings.json"
+        bethini_path = plugin_directory / "Bethini.json"
+        settings_content = settings_path.read_bytes()
+        bethini_content = bethini_path.read_bytes()
 
         self.appname = appname
         self.exedir = exedir
-        self.default_ini: ININame = list(self.bethini["INIs"])[1]
+        cached = None
+        sources: list[SourceFingerprint] = []
+        if self.plugin_cache is not None:
+            sources = [
+                self.plugin_cache.fingerprint(settings_path, settings_content),
+                self.plugin_cache.fingerprint(bethini_path, bethini_content),
+            ]
+            cached = self.plugin_cache.load(plugin_directory, sources)
+
+        if cached is not None:
+            self.data: AppSettingsJSON = cached["data"]
+            self.bethini: AppBethiniJSON = cached["bethini"]
+            self.default_ini: ININame = list(self.bethini["INIs"])[1]
+            for name, value in cached["index"].items():
+                setattr(self, name, value)
+            self.invalidate_presets()
+        else:
+            self.data = json.loads(settings_content.decode("utf-8"))
+            self.bethini = json.loads(bethini_content.decode("utf-8"))
+            self.default_ini = list(self.bethini["INIs"])[1]
+            self.index_settings()
+            if self.plugin_cache is not None:
+                self.plugin_cache.store(
+                    plugin_directory,
+                    sources,
+                    data=self.data,
+                    bethini=self.bethini,
+                    index=self._index_state(),
+                )
         self.setting_values = self.get_setting_values()
         self.ini_section_setting_dict = self.get_ini_section_setting_dict()
         self.setting_type_dict = self.get_setting_type_dict()
         self.setting_notes_dict = self.get_setting_notes_dict()
         self.can_remove_dict = self.can_remove()
-        self.preset_values_default = self.preset_values("default")
-        self.preset_values_fixedDefault = self.preset_values("fixedDefault")
-        self.preset_values_recommended = self.preset_values("recommended")
         self.valid_inis = cast("list[str]", self.bethini["INI_pecking_order"].keys())
+        self.dependency_graph = DependencyGraph.from_display_tabs(
+            cast("dict[str, dict[str, SettingsLabelFrame]]", self.bethini["displayTabs"]))
+        self.overlay = PeckingOrderOverlay(self)
+
+    @property
+    def preset_values_default(self) -> dict[str, GameSetting]:
+        return self.preset_values("default")
+
+    @property
+    def preset_values_fixedDefault(self) -> dict[str, GameSetting]:
+        return self.preset_values("fixedDefault")
+
+    @property
+    def preset_values_recommended(self) -> dict[str, GameSetting]:
+        return self.preset_values("recommended")
 
     def what_ini_files_are_used(self) -> list[ININame]:
         """Returns a list of INI files used, with Bethini.ini removed from the list."""
@@ -52,8 +114,17 @@ class AppName:
         """An application sometimes has the ability to read multiple ini files in a particular
         order of priority in which a setting can be overridden. We call this the INI_pecking_order.
         Defining the ini for the setting in settings.json, we place a dictionary in Bethini.json,
-        from which we define the INI_pecking_order for that setting. This function iterates over
-        those ini files and returns the current ini that is providing the value for the setting.
+        from which we define the INI_pecking_order for that setting. This function returns the
+        current ini that is providing the value for the setting.
+        """
+
+        return self.overlay.winning_ini(ini, section, setting)
+
+    def find_winning_ini_for_setting(self, ini: str, section:str, setting: str) -> str:
+        """Iterates over the INI_pecking_order of the ini and returns the current ini that is
+        providing the value for the setting.
+
+        This is what the overlay of get_winning_ini_for_setting is built from.
         """
         # If Bethini.ini
         if ini == ModifyINI.app_config_name:
@@ -100,33 +171,92 @@ class AppName:
 
         return self.bethini["INIs"].get(ini) or ""
 
+    def index_settings(self) -> None:
+        """Indexes every setting in settings.json in a single pass.
+
+        The dictionaries returned by get_setting_values, get_ini_section_setting_dict,
+        get_setting_type_dict, get_setting_notes_dict and can_remove are all built here.
+        The preset_values of each preset are only built from this index when first used.
+        """
+
+        value_types = self.bethini["valueTypes"]
+        self.settings_index: list[IndexedSetting] = []
+        self._settings_by_key: dict[str, IndexedSetting] = {}
+        self._setting_values: dict[str, dict[str, int | float | str]] = {}
+        self._ini_section_setting_dict: dict[ININame, dict[str, list[str]]] = {}
+        self._setting_type_dict: dict[str, str] = {}
+        self._setting_notes_dict: dict[str, str] = {}
+        self._can_remove: dict[str, GameSetting] = {}
+        self.invalidate_presets()
+        for ini_setting in self.data["iniValues"]:
+            name = ini_setting["name"]
+            section = ini_setting["section"]
+            values = ini_setting["value"]
+            ini = ini_setting.get("ini", self.default_ini)
+            if ini is None:
+                raise TypeError
+
+            lowercase_name = name.lower()
+            lowercase_section = section.lower()
+            key = sys.intern(f"{lowercase_name}:{lowercase_section}")
+            entry: IndexedSetting = {
+                "key": key,
+                "name": name,
+                "section": section,
+                "ini": ini,
+                "type": ini_setting.get("type", "string"),
+                "notes": ini_setting.get("notes", ""),
+                "alwaysPrint": bool(ini_setting.get("alwaysPrint")),
+                "values": values,
+                "info": ini_setting,
+            }
+            self.settings_index.append(entry)
+
+            # The first setting with a given name and section wins...
+            if key not in self._settings_by_key:
+                self._settings_by_key[key] = entry
+                self._setting_type_dict[key] = entry["type"]
+                self._setting_notes_dict[key] = entry["notes"]
+            self._ini_section_setting_dict.setdefault(ini, {}).setdefault(lowercase_section, []).append(lowercase_name)
+
+            # ...except in these, where the last one does.
+            self._setting_values[name] = {
+                value_type: values[value_type] for value_type in value_types if value_type in values}
+            preset_key = f"{name}:{section}"
+            if not entry["alwaysPrint"]:
+                self._can_remove[preset_key] = {
+                    "ini": ini,
+                    "section": section,
+                    "value": str(values.get("default", "")),
+                }
+
+        # A setting of an INI in settings.json is valid in every INI of its pecking order.
+        valid_settings: set[tuple[str, str, str]] = set()
+        for main_ini, pecking_order in self.bethini["INI_pecking_order"].items():
+            section_setting_dict = self._ini_section_setting_dict.get(main_ini)
+            if not section_setting_dict:
+                continue
+            for section, settings in section_setting_dict.items():
+                for setting in settings:
+                    valid_settings.update((ini, section, setting) for ini in pecking_order)
+        self.valid_settings = frozenset(valid_settings)
+        logger.debug(f"Indexed {len(self.settings_index)} settings of {self.appname}")
+
+    def _index_state(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self._INDEX_ATTRIBUTES}
+
     def get_setting_values(self) -> dict[str, dict[str, int | float | str]]:
         """Returns a dictionary listing all the different value types for every setting."""
 
-        setting_values: dict[str, dict[str, int | float | str]] = {}
-        for ini_setting in self.data["iniValues"]:
-            setting_values[ini_setting["name"]] = {}
-            for value_type in self.bethini["valueTypes"]:
-                try:
-                    the_value_for_this_type = ini_setting["value"][value_type]
-                    setting_values[ini_setting["name"]][value_type] = the_value_for_this_type
-                except KeyError:
-                    continue
-        return setting_values
+        return self._setting_values
 
     def get_setting_type(self, setting: str, section: str) -> str:
         """Returns the setting type for the given setting."""
         return self.setting_type_dict.get(f"{setting.lower()}:{section.lower()}", "string")
-            
+
     def get_setting_type_dict(self) -> dict[str, str]:
         """Returns a dictionary listing all the settings and their types as specified in settings.json."""
-        setting_type_dict: dict[str, str] = {}
-        for ini_setting in self.data["iniValues"]:
-            section = ini_setting["section"].lower()
-            setting = ini_setting["name"].lower()
-            setting_type_dict.setdefault(
-                f"{setting}:{section}", ini_setting.get("type", "string"))
-        return setting_type_dict
+        return self._setting_type_dict
 
     def get_setting_notes(self, setting: str, section: str) -> str:
         """Returns the setting notes for the given setting."""
@@ -134,27 +264,22 @@ class AppName:
 
     def get_setting_notes_dict(self) -> dict[str, str]:
         """Returns a dictionary listing all the settings and their notes as specified in settings.json."""
-        setting_notes_dict: dict[str, str] = {}
-        for ini_setting in self.data["iniValues"]:
-            section = ini_setting["section"].lower()
-            setting = ini_setting["name"].lower()
-            setting_notes_dict.setdefault(
-                f"{setting}:{section}", ini_setting.get("notes", ""))
-        return setting_notes_dict
+        return self._setting_notes_dict
 
     def update_setting_notes(self, setting: str, section: str, notes: str) -> bool:
         """Updates the setting notes for the given setting."""
-        success = False
-        self.setting_notes_dict[f"{setting.lower()}:{section.lower()}"] = notes
-        for ini_setting in self.data["iniValues"]:
-            if ini_setting["name"].lower() == setting.lower() and ini_setting["section"].lower() == section.lower():
-                ini_setting["notes"] = notes
-                success = True
-                break
-        return success
+        key = f"{setting.lower()}:{section.lower()}"
+        self.setting_notes_dict[key] = notes
+        entry = self._settings_by_key.get(key)
+        if entry is None:
+            return False
+        entry["notes"] = notes
+        entry["info"]["notes"] = notes
+        return True
 
     def save_data(self) -> None:
         """Saves the settings.json file."""
+        self.invalidate_presets()
         with open(self.exedir / "apps" / self.appname / "settings.json", "w", encoding="utf-8") as app_json:
             json.dump(self.data, app_json, indent=4, ensure_ascii=False)
 
@@ -163,60 +288,110 @@ class AppName:
         sections and settings as specified in settings.json
         """
 
-        ini_section_setting_dict: dict[ININame, dict[str, list[str]]] = {}
-        for ini_setting in self.data["iniValues"]:
-            ini = ini_setting.get("ini", self.default_ini)
-            if ini is None:
-                raise TypeError
-
-            section = ini_setting["section"].lower()
-            setting = ini_setting["name"].lower()
-            ini_section_setting_dict.setdefault(ini, {}).setdefault(section, []).append(setting)
-        return ini_section_setting_dict
+        return self._ini_section_setting_dict
 
     def does_setting_exist(self, ini: ININame, section: str, setting: str) -> bool:
         """Checks if the given setting for the given section and ini file exists in settings.json."""
-        setting_exists_list: list[bool] = []
-        for valid_ini in self.valid_inis:
-            if ini in self.bethini["INI_pecking_order"].get(valid_ini):
-                setting_exists_list.append(
-                    setting.lower() in self.ini_section_setting_dict[valid_ini].get(section.lower(), ()))
+        return (ini, section.lower(), setting.lower()) in self.valid_settings
 
-        return True in setting_exists_list
+    def unknown_settings(self, ini: ININame, section: str, settings: list[str]) -> list[str]:
+        """Returns the settings of the given section and ini file that do not exist in settings.json."""
+        section = section.lower()
+        unknown = {(ini, section, setting.lower()) for setting in settings} - self.valid_settings
+        if not unknown:
+            return []
+        return [setting for setting in settings if (ini, section, setting.lower()) in unknown]
 
     def preset_values(self, preset: PresetName) -> dict[str, GameSetting]:
         """Returns a dictionary listing all the settings and values
         for a given preset specified in settings.json.
         """
 
-        preset_dict: dict[str, GameSetting] = {}
-        for ini_setting in self.data["iniValues"]:
-            preset_value = ini_setting["value"].get(preset)
-            if preset_value is not None:
-                ini = ini_setting.get("ini", self.default_ini)
-                if ini is None:
-                    raise TypeError
-                preset_dict[f"{ini_setting['name']}:{ini_setting['section']}"] = {
-                    "ini": ini,
-                    "section": ini_setting["section"],
-                    "value": str(preset_value),
-                }
+        preset_dict = self._preset_values.get(preset)
+        if preset_dict is None:
+            preset_dict = {}
+            for entry in self.settings_index:
+                preset_value = entry["values"].get(preset)
+                if preset_value is not None:
+                    preset_dict[f"{entry['name']}:{entry['section']}"] = {
+                        "ini": entry["ini"],
+                        "section": entry["section"],
+                        "value": str(preset_value),
+                    }
+            self._preset_values[preset] = preset_dict
         return preset_dict
 
+    def preset_diff(self, preset: PresetName) -> dict[str, GameSetting]:
+        """Returns the settings and values of the preset that differ from the default preset."""
+
+        diff = self._preset_diffs.get(preset)
+        if diff is None:
+            default_dict = self.preset_values("default")
+            diff = {
+                key: game_setting
+                for key, game_setting in self.preset_values(preset).items()
+                if key not in default_dict or default_dict[key]["value"] != game_setting["value"]
+            }
+            self._preset_diffs[preset] = diff
+        return diff
+
+    def invalidate_presets(self) -> None:
+        """Forgets the cached preset_values and preset_diff, which are rebuilt from settings.json on their next use."""
+
+        self._preset_values: dict[str, dict[str, GameSetting]] = {}
+        self._preset_diffs: dict[str, dict[str, GameSetting]] = {}
+
     def can_remove(self) -> dict[str, GameSetting]:
         """Returns a dictionary listing all the settings and default values
         NOT containing the alwaysPrint attribute as specified in settings.json.
         """
 
-        can_remove: dict[str, GameSetting] = {}
-        for ini_setting in self.data["iniValues"]:
-            if not ini_setting.get("alwaysPrint"):
-                can_remove[f"{ini_setting['name']}:{ini_setting['section']}"] = {
-                    "ini": ini_setting.get("ini", self.default_ini),
-                    "section": ini_setting["section"],
-                    "value": str(ini_setting["value"].get("default", "")),
-                }
-        return can_remove
+        return self._can_remove
+
+    def linked_tabs(self) -> dict[str, list[str]]:
+        """Returns, for every tab in displayTabs, the tabs whose settings refer to each other's.
+
+        A setting refers to another through dependentSettings, partial, or an Onvalue or
+        Offvalue naming it. The tabs are listed in the order of displayTabs, including the tab itself.
+        """
+
+        display_tabs = cast("dict[str, dict[str, SettingsLabelFrame]]", self.bethini["displayTabs"])
+        setting_tabs: dict[str, str] = {}
+        for tab_name, label_frames in display_tabs.items():
+            for label_frame in label_frames.values():
+                for setting_name in label_frame.get("Settings", {}):
+                    setting_tabs.setdefault(setting_name, tab_name)
+
+        links: dict[str, set[str]] = {tab_name: {tab_name} for tab_name in display_tabs}
+        for tab_name, label_frames in display_tabs.items():
+            for label_frame in label_frames.values():
+                for setting in label_frame.get("Settings", {}).values():
+                    referenced = list(setting.get("dependentSettings") or ())
+                    referenced.extend(setting.get("partial") or ())
+                    for value in (*setting.get("Onvalue", ()), *setting.get("Offvalue", ())):
+                        if isinstance(value, list) and value and isinstance(value[0], str):
+                            referenced.append(value[0])
+                    for setting_name in referenced:
+                        other_tab_name = setting_tabs.get(setting_name)
+                        if other_tab_name is not None and other_tab_name != tab_name:
+                            links[tab_name].add(other_tab_name)
+                            links[other_tab_name].add(tab_name)
+
+        linked: dict[str, list[str]] = {}
+        for tab_name in display_tabs:
+            if tab_name in linked:
+                continue
+            group = {tab_name}
+            pending = [tab_name]
+            while pending:
+                for other_tab_name in links[pending.pop()]:
+                    if other_tab_name not in group:
+                        group.add(other_tab_name)
+                        pending.append(other_tab_name)
+            ordered_group = [name for name in display_tabs if name in group]
+            for name in ordered_group:
+                linked[name] = ordered_group
+        return linked
 
     def pack_settings(self, tab_name: str, label_frame_name: str) -> PackSettings:
         """Returns the pack settings for the label frame."""
@@ -0,0 +1,138 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import logging
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Literal, NamedTuple, TypeAlias
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+if TYPE_CHECKING:
+    from lib.ModifyINI import ModifyINI
+
+logger = logging.getLogger(__name__)
+
+ChangeOp: TypeAlias = Literal["add", "set", "remove", "add_section", "remove_section"]
+
+
+class Change(NamedTuple):
+    """A single change to an INI file.
+
+    For "add", "set" and "remove", old and new are the values of the setting before
+    and after the change. For "remove_section", old holds the options of the removed section.
+
+    case_insensitive_old is what the case insensitive view of the INI had before the change:
+    (exists, value) for a setting, or the options of the section for "remove_section".
+    Settings that only differ by case share one entry there, so undo restores it as it was.
+    """
+
+    op: ChangeOp
+    ini: "ModifyINI"
+    section: str
+    setting: str | None
+    old: "str | dict[str, str | None] | None"
+    new: str | None
+    case_insensitive_old: "tuple[bool, str | None] | dict[str, str | None] | None" = None
+
+
+class ChangeJournal:
+    """A list of steps of changes, with a cursor for undo and redo.
+
+    Each step is the list of changes made by a single action, so undoing or redoing
+    a step only costs as much as the changes in it.
+    """
+
+    def __init__(self) -> None:
+        self._steps: list[list[Change]] = []
+        self._cursor = 0
+        self._group: list[Change] | None = None
+        self._paused = 0
+
+    def record(self, change: Change) -> None:
+        """Adds a change as its own step, or to the current group."""
+
+        if self._paused:
+            return
+        if self._group is not None:
+            self._group.append(change)
+        else:
+            self._push([change])
+
+    def _push(self, step: list[Change]) -> None:
+        # A new step replaces everything that could have been redone.
+        del self._steps[self._cursor :]
+        self._steps.append(step)
+        self._cursor = len(self._steps)
+
+    @contextmanager
+    def group(self) -> Iterator[None]:
+        """Records every change made inside the block as a single step.
+
+        Nested groups are part of the outermost group.
+        """
+
+        if self._group is not None:
+            yield
+            return
+        self._group = []
+        try:
+            yield
+        finally:
+            step, self._group = self._group, None
+            if step:
+                self._push(step)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Changes made inside the block are not recorded."""
+
+        self._paused += 1
+        try:
+            yield
+        finally:
+            self._paused -= 1
+
+    def can_undo(self) -> bool:
+        return self._cursor > 0 and self._group is None
+
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._steps) and self._group is None
+
+    def undo(self) -> list[Change] | None:
+        """Reverts the last step and returns it, or None if there is nothing to undo."""
+
+        if not self.can_undo():
+            return None
+        self._cursor -= 1
+        step = self._steps[self._cursor]
+        with self.paused():
+            for change in reversed(step):
+                change.ini.apply_change(change, undo=True)
+        logger.debug(f"Undid {len(step)} change(s)")
+        return step
+
+    def redo(self) -> list[Change] | None:
+        """Applies the next step again and returns it, or None if there is nothing to redo."""
+
+        if not self.can_redo():
+            return None
+        step = self._steps[self._cursor]
+        self._cursor += 1
+        with self.paused():
+            for change in step:
+                change.ini.apply_change(change, undo=False)
+        logger.debug(f"Redid {len(step)} change(s)")
+        return step
+
+    def clear(self) -> None:
+        """Forgets every step."""
+
+        self._steps = []
+        self._cursor = 0
@@ -0,0 +1,333 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+"""Applies presets to the game INI files without opening the window.
+
+Usage, from the Bethini Pie folder:
+    python -m lib.cli apply --game "Skyrim Special Edition" --preset "Bethini High" --ini-dir "C:/Users/Me/Documents/My Games/Skyrim Special Edition"
+    python -m lib.cli batch --game "Skyrim Special Edition" --preset "Bethini High" "D:/MO2/profiles/*"
+
+Presets are saved the same way as the Save button does: invalid settings are removed,
+missing fixedDefault settings are added, and the files are backed up first.
+The files of each directory are saved all together, or none of them. Read-only files are
+left as they are, and their directory is not saved, unless --clear-read-only is given.
+This never imports ttkbootstrap or PIL, so it starts quickly.
+"""
+
+import argparse
+import glob
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from pathlib import Path
+from typing import NamedTuple, cast
+
+from lib.app import AppName
+from lib.customConfigParser import customConfigParser
+from lib.ini_cache import INICache
+from lib.ini_files import (
+    apply_preset,
+    open_ini_files,
+    prepare_to_save,
+    remove_excess_directory_files,
+    save_ini_files,
+)
+from lib.ModifyINI import ModifyINI
+from lib.plugin_cache import PluginCache
+
+logger = logging.getLogger(__name__)
+
+BACKUPS_DIRECTORY_NAME = "Bethini Pie backups"
+
+
+def configure_from_app_config(exedir: Path) -> None:
+    """Applies the parser and cache switches of Bethini.ini, as the window does when it starts."""
+
+    app_config = ModifyINI.app_config()
+    customConfigParser.use_fast_parser = app_config.get_value("General", "bFastINIParser", "1") != "0"
+    if app_config.get_value("General", "bINICache", "1") != "0":
+        ModifyINI.ini_cache = INICache(exedir / "cache")
+    if app_config.get_value("General", "bPluginCache", "1") != "0":
+        AppName.plugin_cache = PluginCache(exedir / "cache" / "plugins")
+
+
+def set_ini_directory(app: AppName, ini_directory: Path) -> None:
+    """Points every INI file of the game at the directory, for this run only. Bethini.ini itself is not saved."""
+
+    for ini_name in app.what_ini_files_are_used():
+        ini_setting_name = app.get_ini_setting_name(ini_name)
+        if ini_setting_name:
+            ModifyINI.app_config().assign_setting_value("Directories", ini_setting_name, str(ini_directory))
+    app.overlay.invalidate()
+
+
+def load_app(game: str | None, exedir: Path) -> AppName | None:
+    """Returns the game, or the last game chosen in the window if None."""
+
+    game = game or ModifyINI.app_config().get_value("General", "sAppName")
+    if not game:
+        logger.error("No game given, and none is set in Bethini.ini. Use --game.")
+        return None
+    try:
+        return AppName(appname=game, exedir=exedir)
+    except FileNotFoundError:
+        logger.exception(f"{game} is not in the apps folder.")
+        return None
+
+
+def is_preset(app: AppName, preset: str) -> bool:
+    if preset in ("Default", "recommended") or preset in app.bethini["valueTypes"]:
+        return True
+    presets = ", ".join(["Default", *(value_type for value_type in app.bethini["valueTypes"] if value_type not in ("default", "fixedDefault"))])
+    logger.error(f"{preset} is not a preset of {app.appname}. The presets are: {presets}")
+    return False
+
+
+def changed_keys() -> dict[str, list[str]]:
+    """Returns the settings changed in every modified game INI file, by file name."""
+
+    changed: dict[str, list[str]] = {}
+    for ini_objects in ModifyINI.open_inis.values():
+        for ini_object in ini_objects.values():
+            if ini_object.ini_path.name != ModifyINI.app_config_name and ini_object.has_been_modified:
+                changed[ini_object.ini_path.name] = [
+                    f"[{section}] {setting}"
+                    for section, settings in ini_object.modifications.items()
+                    for setting in settings
+                ]
+    return changed
+
+
+def save_game_ini_files(
+    backup_name: str,
+    *,
+    make_backups: bool,
+    clear_read_only: bool,
+    sort: bool,
+    log_file: Path | None = None,
+) -> tuple[list[ModifyINI], list[ModifyINI]]:
+    """Saves the modified game INI files like the Save button, answering its questions from the command line options.
+
+    Files are only sorted with --sort, and only those that allow it.
+    """
+
+    return save_ini_files(
+        BACKUPS_DIRECTORY_NAME,
+        backup_name,
+        make_backups=make_backups,
+        log_file=log_file,
+        choose=lambda ini_object: sort and ini_object.sortable,
+        clear_read_only=lambda _ini_object: clear_read_only,
+    )
+
+
+def apply_command(args: argparse.Namespace, exedir: Path, backup_name: str, log_file: Path | None) -> int:
+    app = load_app(args.game, exedir)
+    if app is None:
+        return 2
+    preset: str = args.preset
+    if not is_preset(app, preset):
+        return 2
+
+    if args.ini_dir is not None:
+        set_ini_directory(app, args.ini_dir)
+
+    open_ini_files(app)
+    apply_preset(app, preset)
+    prepare_to_save(app)
+    for ini_name, keys in changed_keys().items():
+        logger.info(f"{ini_name}: {len(keys)} change(s)")
+
+    saved, failed = save_game_ini_files(backup_name, make_backups=not args.noBackups, clear_read_only=args.clear_read_only, sort=args.sort, log_file=log_file)
+    if not saved and not failed:
+        logger.info("No files were modified. Saving skipped.")
+    else:
+        logger.info(f"Preset {preset} applied to {app.appname}. {len(saved)} file(s) saved, {len(failed)} failed.")
+    return 1 if failed else 0
+
+
+class DirectoryResult(NamedTuple):
+    """What applying a preset to a directory of INI files did."""
+
+    directory: Path
+    saved: bool
+    """False if the files of the directory were left as they were."""
+    changed_keys: dict[str, list[str]]
+    """The settings changed, by INI file name."""
+    seconds: float
+    error: str = ""
+
+
+_batch_app: AppName | None = None
+"""The game, in a batch worker process."""
+
+
+def _init_batch_worker(exedir: Path, game: str, log_level: int) -> None:
+    # A spawned worker does not inherit the class attributes set by main.
+    ModifyINI.app_config_directory = exedir
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(logging.Formatter("%(levelname)s: %(processName)s: %(message)s"))
+    root_logger.addHandler(console)
+    root_logger.setLevel(log_level)
+
+    configure_from_app_config(exedir)
+    global _batch_app
+    _batch_app = AppName(appname=game, exedir=exedir)
+
+
+def apply_to_directory(
+    ini_directory: Path,
+    preset: str,
+    backup_name: str,
+    make_backups: bool,
+    clear_read_only: bool,
+    sort: bool,
+) -> DirectoryResult:
+    """Applies the preset to the INI files of the directory and saves them. Runs in a batch worker process."""
+
+    app = cast("AppName", _batch_app)
+    start = time.perf_counter()
+    changed: dict[str, list[str]] = {}
+    try:
+        # The worker is reused for other directories, so forget the INI files of the last one.
+        ModifyINI.open_inis = {
+            ini_name: ini_objects for ini_name, ini_objects in ModifyINI.open_inis.items() if ini_name == ModifyINI.app_config_name
+        }
+        ModifyINI.journal.clear()
+        set_ini_directory(app, ini_directory)
+
+        open_ini_files(app)
+        apply_preset(app, preset)
+        prepare_to_save(app)
+        changed = changed_keys()
+        _saved, failed = save_game_ini_files(backup_name, make_backups=make_backups, clear_read_only=clear_read_only, sort=sort)
+    except Exception as e:  # noqa: BLE001
+        logger.exception(f"Failed to apply {preset} to {ini_directory}")
+        return DirectoryResult(ini_directory, False, changed, time.perf_counter() - start, str(e) or type(e).__name__)
+    if failed:
+        return DirectoryResult(ini_directory, False, changed, time.perf_counter() - start, "not saved, see the log")
+    return DirectoryResult(ini_directory, True, changed, time.perf_counter() - start)
+
+
+def expand_directories(patterns: list[str]) -> list[Path]:
+    """Returns the directories given, with the glob patterns among them expanded."""
+
+    directories: dict[Path, None] = {}
+    for pattern in patterns:
+        paths = [Path(path) for path in sorted(glob.glob(pattern))] if glob.has_magic(pattern) else [Path(pattern)]
+        for path in paths:
+            if path.is_dir():
+                directories[path] = None
+            else:
+                logger.warning(f"{path} is not a directory, so it is skipped.")
+    return list(directories)
+
+
+def batch_command(args: argparse.Namespace, exedir: Path, backup_name: str) -> int:
+    directories = expand_directories(args.directories)
+    if not directories:
+        logger.error("No INI directories were found.")
+        return 2
+
+    # Checked once here, which also caches the plugin for the workers.
+    app = load_app(args.game, exedir)
+    if app is None:
+        return 2
+    app.overlay.close()
+    preset: str = args.preset
+    if not is_preset(app, preset):
+        return 2
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_batch_worker,
+        initargs=(exedir, app.appname, logging.getLogger().getEffectiveLevel()),
+    ) as executor:
+        results = list(executor.map(
+            apply_to_directory,
+            directories,
+            repeat(preset),
+            repeat(backup_name),
+            repeat(not args.noBackups),
+            repeat(args.clear_read_only),
+            repeat(args.sort),
+        ))
+    seconds = time.perf_counter() - start
+
+    directory_width = max(len(str(result.directory)) for result in results)
+    lines = [f"{'Directory':<{directory_width}}  {'Changed':>7}  {'Time ms':>9}  Result"]
+    for result in results:
+        changes = sum(len(keys) for keys in result.changed_keys.values())
+        if result.error:
+            outcome = f"failed: {result.error}"
+        else:
+            outcome = "saved" if changes else "unchanged"
+        lines.append(f"{str(result.directory):<{directory_width}}  {changes:>7}  {result.seconds * 1000:>9.1f}  {outcome}")
+        for ini_name, keys in result.changed_keys.items():
+            logger.debug(f"{result.directory / ini_name}: {', '.join(keys)}")
+    failed = sum(1 for result in results if not result.saved)
+    lines.append(f"Preset {preset} applied to {len(results) - failed} of {len(results)} directories in {seconds:.2f} s.")
+    logger.info("Batch summary:\n" + "\n".join(lines))
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m lib.cli", description="Applies Bethini Pie presets without opening the window.")
+    parser.add_argument("--verbose", action="store_true", help="log debug messages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    apply_parser = subparsers.add_parser("apply", help="apply a preset and save the INI files")
+    apply_parser.add_argument("--game", help="the folder of the game in the apps folder; defaults to the last game chosen")
+    apply_parser.add_argument("--preset", required=True, help='"Default", "recommended", or a preset such as "Bethini High"')
+    apply_parser.add_argument("--ini-dir", type=Path, help="the directory of the game INI files; defaults to the directories set in Bethini.ini")
+    apply_parser.add_argument("--noBackups", action="store_true", help="does not create any backup files or directories")
+    apply_parser.add_argument("--clear-read-only", action="store_true", help="saves read-only INI files, setting them read-only again afterwards")
+    apply_parser.add_argument("--sort", action="store_true", help="sorts the sections and settings of the INI files that allow it")
+
+    batch_parser = subparsers.add_parser("batch", help="apply a preset to many directories of INI files in parallel")
+    batch_parser.add_argument("directories", nargs="+", help="the directories of the INI files, or glob patterns matching them")
+    batch_parser.add_argument("--game", help="the folder of the game in the apps folder; defaults to the last game chosen")
+    batch_parser.add_argument("--preset", required=True, help='"Default", "recommended", or a preset such as "Bethini High"')
+    batch_parser.add_argument("--workers", type=int, help="the number of worker processes; defaults to the number of processors")
+    batch_parser.add_argument("--noBackups", action="store_true", help="does not create any backup files or directories")
+    batch_parser.add_argument("--clear-read-only", action="store_true", help="saves read-only INI files, setting them read-only again afterwards")
+    batch_parser.add_argument("--sort", action="store_true", help="sorts the sections and settings of the INI files that allow it")
+    args = parser.parse_args(argv)
+
+    exedir = Path(__file__).resolve().parent.parent
+    ModifyINI.app_config_directory = exedir
+
+    backup_name = datetime.now().strftime("%Y %m-%b %d %a - %H.%M.%S")
+    log_directory = exedir / "logs" / backup_name
+    log_directory.mkdir(parents=True, exist_ok=True)
+    log_file = log_directory / "log.log"
+
+    fmt = "%(asctime)s  [%(levelname)s]  %(filename)s  %(funcName)s:%(lineno)s:  %(message)s"
+    datefmt = "%Y-%m-%d %H:%M:%S"
+    logging.basicConfig(filename=log_file, filemode="w", format=fmt, datefmt=datefmt, encoding="utf-8", level=logging.DEBUG if args.verbose else logging.INFO)
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    logging.getLogger().addHandler(console)
+
+    max_logs = int(cast("str", ModifyINI.app_config().get_value("General", "iMaxLogs", "5")))
+    remove_excess_directory_files(exedir / "logs", max_logs, [log_file.name])
+
+    configure_from_app_config(exedir)
+    if args.command == "batch":
+        return batch_command(args, exedir, backup_name)
+    return apply_command(args, exedir, backup_name, log_file)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,199 @@
 """Custom configparser."""
 
 import configparser
+import os
+import re
 import sys
-from io import TextIOWrapper
-from typing import cast
+from io import StringIO, TextIOWrapper
+from typing import ClassVar, Literal, TypeAlias, cast
 
 if __name__ == "__main__":
     sys.exit(1)
 
 
+# Splits a whole INI file into lines in one pass. Each match is a single line,
+# already separated into its indentation and either a section header or an
+# option with its optional value. The classes are greedy and never backtrack
+# across the line; surrounding whitespace is trimmed by the caller.
+LINE_TOKENS = re.compile(
+    r"""
+    ^(?P<indent>[^\S\n]*)          # leading whitespace
+    (?:
+        \[(?P<header>[^\n]+)\]      # section header, up to the last ]
+        [^\n]*
+        |
+        (?P<option>[^=\n]*)         # option name, up to the first =
+        (?:=(?P<value>[^\n]*))?     # optional value
+    )
+    \n?
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+
 class customConfigParser(configparser.RawConfigParser):
     """Our custom configparser will not remove comments when the file is written.
     Also, it does not raise errors if duplicate options are detected.
     """
 
+    use_fast_parser: ClassVar[bool] = True
+    """Parse files with _read_fast. Set to False to fall back to _read_legacy."""
+
     def __init__(self) -> None:
         super().__init__(allow_no_value=True, delimiters=("=",), comment_prefixes=(), strict=False)
         # comment_prefixes=() is necessary to preserve comments.
 
+        # When not None, _read records every line it parses here for the IniDocument.
+        self._line_records: list[IniLine] | None = None
+
+    def read_document(self, text: str, source: str = "<string>") -> "IniDocument":
+        """Parse the given text and return a document that remembers its original lines.
+
+        The text should be read with newline="" so that the original line endings are kept.
+        """
+
+        self._line_records = []
+        try:
+            self.read_file(StringIO(text), source)
+            lines = self._line_records
+        finally:
+            self._line_records = None
+        return IniDocument(lines, self, newline=detect_newline(text))
+
+    def restore_document(
+        self,
+        sections: dict[str, dict[str, str | None]],
+        defaults: dict[str, str | None],
+        records: "list[IniRecord]",
+        newline: str,
+    ) -> "IniDocument":
+        """Populate this parser with a previous result of read_document instead of parsing the text again."""
+
+        self._defaults.update(defaults)
+        for section, options in sections.items():
+            self._sections[section] = options
+            self._proxies[section] = configparser.SectionProxy(self, section)
+        return IniDocument.from_records(records, newline)
+
+    def get_options(self, section: str) -> dict[str, str | None] | None:
+        """Returns the dictionary holding the options of the given section, if it exists."""
+
+        if section == self.default_section:
+            return self._defaults
+        return self._sections.get(section)
+
+    def copy_from(self, source: "customConfigParser") -> None:
+        """Populate this parser from one that has already read the file.
+
+        Option names are passed through this parser's optionxform and the first
+        duplicate wins, just like _read. The key and value strings of the source
+        are shared rather than copied, so no file is read or parsed again.
+        """
+
+        optionxform = self.optionxform
+        for option, value in source._defaults.items():  # noqa: SLF001
+            self._defaults.setdefault(optionxform(option), value)
+        for section, options in source._sections.items():  # noqa: SLF001
+            copied_options = self._dict()
+            for option, value in options.items():
+                copied_options.setdefault(optionxform(option), value)
+            self._sections[section] = copied_options
+            self._proxies[section] = configparser.SectionProxy(self, section)
+
     def _read(self, fp: TextIOWrapper, fpname: str) -> None:
+        """Parse a configuration file with the fast parser if possible, otherwise with the legacy parser."""
+
+        # The fast parser only implements the options this class is created with.
+        if (
+            self.use_fast_parser
+            and not self._comment_prefixes
+            and not self._inline_comment_prefixes
+            and not self._strict
+            and self._empty_lines_in_values
+        ):
+            self._read_fast(fp.read(), fpname)
+        else:
+            self._read_legacy(fp, fpname)
+
+    def _read_fast(self, text: str, fpname: str) -> None:
+        """Parse a whole configuration file at once.
+
+        This gives the same result as _read_legacy, but the file is split into
+        lines, sections and options by a single pass of LINE_TOKENS, instead of
+        stripping comments and running several regular expressions for every line.
+        """
+
+        cursect: dict[str, list[str | int] | None] | None = None
+        sectname: str | None = None
+        optname = None
+        indent_level = 0
+        e: configparser.Error | None = None
+        records = self._line_records
+        option_record: IniLine | None = None
+        lineno = 0
+        for mo in LINE_TOKENS.finditer(text):
+            line = mo.group()
+            if not line:
+                # The empty match at the end of the text.
+                break
+            lineno += 1
+            indent, header, option, optval = mo.groups()
+            if header is None:
+                option = option.rstrip()
+                if not option and optval is None:
+                    # Empty line. Add it to the value; trailing empty lines are removed when joined.
+                    if cursect is not None and optname and cursect[optname] is not None:
+                        cast("list[str | int]", cursect[optname]).append("")
+                    if records is not None:
+                        records.append(IniLine(line, sectname))
+                    continue
+            # Continuation line?
+            cur_indent_level = len(indent)
+            if cursect is not None and optname and cur_indent_level > indent_level:
+                cast("list[str | int]", cursect[optname]).append(line.strip())
+                if records is not None and option_record is not None:
+                    option_record.add_continuation(line, records)
+                continue
+            indent_level = cur_indent_level
+            if header is not None:
+                sectname = header
+                if sectname in self._sections:
+                    cursect = self._sections[sectname]
+                elif sectname == self.default_section:
+                    cursect = self._defaults
+                else:
+                    cursect = self._dict()
+                    self._sections[sectname] = cursect
+                    self._proxies[sectname] = configparser.SectionProxy(self, sectname)
+                optname = None
+                if records is not None:
+                    records.append(IniLine(line, sectname, "header"))
+            elif cursect is None:
+                # See _read_legacy for why this is not a MissingSectionHeaderError.
+                cursect = self._dict()
+                sectname = "TotallyFakeSectionHeader"
+                self._sections[sectname] = cursect
+                self._proxies[sectname] = configparser.SectionProxy(self, sectname)
+                optname = None
+                if records is not None:
+                    records.append(IniLine(line, sectname))
+            else:
+                if not option:
+                    e = self._handle_error(e, fpname, lineno, line)
+                optname = self.optionxform(option)
+                if records is not None:
+                    option_record = IniLine(line, sectname, "option", optname, owner=optname not in cursect)
+                    records.append(option_record)
+                # The first value of a duplicate option wins.
+                if optname not in cursect:
+                    cursect[optname] = None if optval is None else [optval.strip()]
+
+        self._join_multiline_values()  # type: ignore[reportAttributeAccessIssue]
+        # If any parsing errors occurred, raise an exception.
+        if e:
+            raise e
+
+    def _read_legacy(self, fp: TextIOWrapper, fpname: str) -> None:
         """Parse a sectioned configuration file.
 
         Each section in a configuration file contains a header, indicated by
@@ -44,6 +219,8 @@ class customConfigParser(configparser.RawConfigParser):
         optname = None
         indent_level = 0
         e: configparser.Error | None = None
+        records = self._line_records
+        option_record: IniLine | None = None
         for lineno, line in enumerate(fp, start=1):
             comment_start: int | None = sys.maxsize
             # Strip inline comments
@@ -74,12 +251,16 @@ class customConfigParser(configparser.RawConfigParser):
                 else:
                     # Empty line marks end of value
                     indent_level = sys.maxsize
+                if records is not None:
+                    records.append(IniLine(line, sectname))
                 continue
             # Continuation line?
             first_nonspace = self.NONSPACECRE.search(line)
             cur_indent_level = first_nonspace.start() if first_nonspace else 0
             if cursect is not None and optname and cur_indent_level > indent_level:
                 cast("list[str | int]", cursect[optname]).append(value)
+                if records is not None and option_record is not None:
+                    option_record.add_continuation(line, records)
             # A section header or option header?
             else:
                 indent_level = cur_indent_level
@@ -101,6 +282,8 @@ class customConfigParser(configparser.RawConfigParser):
                         elements_added.add(sectname)
                     # So sections can't start with a continuation line
                     optname = None
+                    if records is not None:
+                        records.append(IniLine(line, sectname, "header"))
                 # No section header in the file?
                 elif cursect is None:
                     # Typically you raise a MissingSectionHeaderError when the input file is missing a section hearder
@@ -112,6 +295,8 @@ class customConfigParser(configparser.RawConfigParser):
                     self._proxies[sectname] = configparser.SectionProxy(self, sectname)
                     elements_added.add(sectname)
                     optname = None
+                    if records is not None:
+                        records.append(IniLine(line, sectname))
 
                 # An option line?
                 else:
@@ -125,6 +310,9 @@ class customConfigParser(configparser.RawConfigParser):
                         if self._strict and (sectname, optname) in elements_added:
                             raise configparser.DuplicateOptionError(sectname, optname, fpname, lineno)
                         elements_added.add((sectname, optname))
+                        if records is not None:
+                            option_record = IniLine(line, sectname, "option", optname, owner=optname not in cursect)
+                            records.append(option_record)
                         # This check is fine because the OPTCRE cannot
                         # match if it would set optval to None.
                         if optval is not None:
@@ -141,8 +329,308 @@ class customConfigParser(configparser.RawConfigParser):
                         # raised at the end of the file and will contain a
                         # list of all bogus lines.
                         e = self._handle_error(e, fpname, lineno, line)
+                        if records is not None:
+                            records.append(IniLine(line, sectname))
 
         self._join_multiline_values()  # type: ignore[reportAttributeAccessIssue]
         # If any parsing errors occurred, raise an exception.
         if e:
             raise e
+
+
+def detect_newline(text: str) -> str:
+    """Returns the line ending used by the first line of the text."""
+
+    first_newline = text.find("\n")
+    if first_newline == -1:
+        return os.linesep
+    return "\r\n" if text[first_newline - 1:first_newline] == "\r" else "\n"
+
+
+def format_option(option: str, value: str | None, newline: str = "\n") -> str:
+    """Formats an option line the same way RawConfigParser.write does without spaces around the delimiter."""
+
+    if value is None:
+        return f"{option}{newline}"
+    value = value.replace("\n", f"{newline}\t")
+    return f"{option}={value}{newline}"
+
+
+IniRecord: TypeAlias = tuple[str, str | None, Literal["header", "option"] | None, str | None, bool, str | None]
+"""The text, section, kind, option, owner and value of an IniLine."""
+
+
+class IniLine:
+    """A line of an INI file, along with any continuation lines belonging to it.
+
+    kind is "header" for section headers and "option" for option lines. Everything
+    else, such as blank lines, is None and is always written back as it was.
+    """
+
+    __slots__ = ("kind", "option", "owner", "section", "text", "value")
+
+    def __init__(
+        self,
+        text: str,
+        section: str | None,
+        kind: Literal["header", "option"] | None = None,
+        option: str | None = None,
+        *,
+        owner: bool = False,
+    ) -> None:
+        self.text = text
+        self.section = section
+        self.kind = kind
+        self.option = option
+        # The first occurrence of an option is the one that provides its value.
+        # Later duplicates are ignored by the parser.
+        self.owner = owner
+        self.value: str | None = None
+
+    @classmethod
+    def from_record(cls, record: IniRecord) -> "IniLine":
+        """Creates a line from a record of IniDocument.to_records()."""
+
+        text, section, kind, option, owner, value = record
+        line = cls(text, section, kind, option, owner=owner)
+        line.value = value
+        return line
+
+    def add_continuation(self, line: str, records: "list[IniLine]") -> None:
+        """Adds a continuation line, along with any blank lines before it, to this line."""
+
+        blank_lines: list[str] = []
+        while records and records[-1] is not self:
+            blank_lines.append(records.pop().text)
+        self.text += "".join(reversed(blank_lines)) + line
+
+    def ensure_newline(self, newline: str) -> None:
+        """Makes sure the text ends with a line ending, so more lines can follow it."""
+
+        if self.text and not self.text.endswith("\n"):
+            self.text += newline
+
+    def clear(self) -> None:
+        """Removes this line from the document."""
+
+        self.text = ""
+        self.kind = None
+        self.option = None
+        self.owner = False
+        self.value = None
+
+
+class IniDocument:
+    """The lines of an INI file as they were read.
+
+    Changes are tracked by section and option with touch() and touch_section().
+    When rendered, only the lines of touched options are rewritten, removed or
+    appended, and every other line is written back exactly as it was read.
+    The lines are indexed by section, so rendering only looks at the touched sections.
+    """
+
+    def __init__(
+        self,
+        lines: list[IniLine],
+        parser: customConfigParser | None,
+        newline: str = os.linesep,
+        *,
+        records: list[IniRecord] | None = None,
+    ) -> None:
+        # Documents restored from records only create their lines when they are first needed.
+        self._lines: list[IniLine] | None = None if records is not None else lines
+        self._records = records
+        self.newline = newline
+        # The lines of each option, by section and then option.
+        self._owners: dict[str, dict[str, IniLine]] = {}
+        self._duplicates: dict[str, dict[str, list[IniLine]]] = {}
+        self._section_lines: dict[str, list[IniLine]] = {}
+        # The last header or option line of each section, after which new options go.
+        self._section_tails: dict[str, IniLine] = {}
+        self._touched_options: dict[str, set[str]] = {}
+        self._touched_sections: set[str] = set()
+        # The text of the last render, which stays valid until something is touched.
+        self._text: str | None = None
+
+        if self._lines is None:
+            return
+        for line in lines:
+            if parser is not None and line.owner and line.section is not None and line.option is not None:
+                options = parser.get_options(line.section)
+                line.value = options.get(line.option) if options is not None else None
+        self._index_lines(lines)
+
+    @classmethod
+    def from_records(cls, records: list[IniRecord], newline: str) -> "IniDocument":
+        """Creates a document from the records of to_records()."""
+
+        return cls([], None, newline, records=records)
+
+    def to_records(self) -> list[IniRecord]:
+        """Returns the lines as plain tuples, which can be stored with marshal."""
+
+        if self._records is not None:
+            return self._records
+        return [(line.text, line.section, line.kind, line.option, line.owner, line.value) for line in self.lines]
+
+    @property
+    def lines(self) -> list[IniLine]:
+        """The lines of the document, created from the records if necessary."""
+
+        if self._lines is None:
+            self._lines = [
+                IniLine.from_record(record) for record in cast("list[IniRecord]", self._records)
+            ]
+            self._records = None
+            self._index_lines(self._lines)
+        return self._lines
+
+    def _index_lines(self, lines: list[IniLine]) -> None:
+        for line in lines:
+            if line.section is None:
+                continue
+            self._section_lines.setdefault(line.section, []).append(line)
+            if line.kind is None:
+                continue
+            self._section_tails[line.section] = line
+            if line.kind == "option" and line.option is not None:
+                if line.owner:
+                    self._owners.setdefault(line.section, {})[line.option] = line
+                else:
+                    self._duplicates.setdefault(line.section, {}).setdefault(line.option, []).append(line)
+
+    @classmethod
+    def from_parser(cls, parser: customConfigParser, newline: str = os.linesep) -> "IniDocument":
+        """Creates a document laid out the same way RawConfigParser.write would write the parser."""
+
+        lines: list[IniLine] = []
+        sections: list[tuple[str, dict[str, str | None]]] = []
+        if parser._defaults:  # noqa: SLF001
+            sections.append((parser.default_section, parser._defaults))  # noqa: SLF001
+        sections.extend(parser._sections.items())  # noqa: SLF001
+        for section, options in sections:
+            lines.append(IniLine(f"[{section}]{newline}", section, "header"))
+            for option, value in options.items():
+                lines.append(IniLine(format_option(option, value, newline), section, "option", option, owner=True))
+            lines.append(IniLine(newline, section))
+        return cls(lines, parser, newline)
+
+    def touch(self, section: str, option: str) -> None:
+        """Marks an option as changed, added or removed."""
+
+        self._touched_options.setdefault(section, set()).add(option)
+
+    def touch_section(self, section: str) -> None:
+        """Marks a section as added, removed or replaced."""
+
+        self._touched_sections.add(section)
+
+    def render(self, parser: customConfigParser) -> str:
+        """Patches the touched lines to match the parser and returns the text of the whole file."""
+
+        if not self._touched_options and not self._touched_sections:
+            if self._text is None:
+                if self._records is not None:
+                    self._text = "".join([record[0] for record in self._records])
+                else:
+                    self._text = "".join([line.text for line in self.lines])
+            return self._text
+
+        lines = self.lines
+        newline = self.newline
+        touched_options = self._touched_options
+        for section in self._touched_sections:
+            if parser.get_options(section) is None:
+                self._remove_section(section)
+            else:
+                touched_options.setdefault(section, set()).update(self._owners.get(section, ()))
+
+        # Sections that are not in the file yet get a header, even if they are empty.
+        # They are added in the order the parser has them, so the file does not depend on the order of the sets.
+        section_order = {section: index for index, section in enumerate(parser.sections())}
+        appended: dict[str, list[IniLine]] = {}
+        for section in sorted(self._touched_sections.union(touched_options), key=lambda section: section_order.get(section, -1)):
+            if section not in self._section_lines and parser.get_options(section) is not None:
+                appended[section] = []
+
+        for section, touched in touched_options.items():
+            options = parser.get_options(section)
+            owners = self._owners.get(section, {})
+            for option in touched:
+                owner = owners.get(option)
+                if options is None or option not in options:
+                    if owner is not None:
+                        del owners[option]
+                        owner.clear()
+                        self._remove_duplicates(section, option)
+                    continue
+
+                value = options[option]
+                if owner is None:
+                    new_line = IniLine(format_option(option, value, newline), section, "option", option, owner=True)
+                    new_line.value = value
+                    appended.setdefault(section, []).append(new_line)
+                    self._owners.setdefault(section, owners)[option] = new_line
+                    self._remove_duplicates(section, option)
+                elif owner.value != value:
+                    owner.text = format_option(option, value, newline)
+                    owner.value = value
+                    self._remove_duplicates(section, option)
+
+        # The new options of the sections already in the file, by the line they go after.
+        insertions: dict[IniLine, list[IniLine]] = {}
+        for section, new_lines in appended.items():
+            # Keep the order the parser has the options in.
+            order = {option: index for index, option in enumerate(parser.get_options(section) or ())}
+            new_lines.sort(key=lambda line: order.get(cast("str", line.option), 0))
+            self._append_to_section(section, new_lines, insertions)
+
+        if insertions:
+            # Inserted in a single pass, rather than searching the lines for each section.
+            merged: list[IniLine] = []
+            for line in lines:
+                merged.append(line)
+                inserted = insertions.get(line)
+                if inserted is not None:
+                    merged.extend(inserted)
+            lines[:] = merged
+
+        self._touched_options = {}
+        self._touched_sections = set()
+        self._text = "".join([line.text for line in lines])
+        return self._text
+
+    def _remove_duplicates(self, section: str, option: str) -> None:
+        duplicates = self._duplicates.get(section)
+        if duplicates is not None:
+            for duplicate in duplicates.pop(option, ()):
+                duplicate.clear()
+
+    def _remove_section(self, section: str) -> None:
+        for line in self._section_lines.pop(section, ()):
+            line.clear()
+        self._section_tails.pop(section, None)
+        self._owners.pop(section, None)
+        self._duplicates.pop(section, None)
+
+    def _append_to_section(self, section: str, new_lines: list[IniLine], insertions: dict[IniLine, list[IniLine]]) -> None:
+        newline = self.newline
+        tail = self._section_tails.get(section)
+        if tail is None:
+            # A new section goes at the end of the file, separated by a blank line.
+            header = IniLine(f"[{section}]{newline}", section, "header")
+            section_lines = [header, *new_lines]
+            if self.lines:
+                self.lines[-1].ensure_newline(newline)
+                if self.lines[-1].text.strip():
+                    section_lines.insert(0, IniLine(newline, section))
+            self.lines.extend(section_lines)
+            self._section_lines[section] = section_lines
+            self._section_tails[section] = header
+        else:
+            # New options go directly after the last option of the section.
+            tail.ensure_newline(newline)
+            insertions[tail] = new_lines
+            self._section_lines[section].extend(new_lines)
+        if new_lines:
+            self._section_tails[section] = new_lines[-1]
@@ -12,6 +12,7 @@ import sys
 import re
 from pathlib import Path
 from tkinter import filedialog, simpledialog
+from typing import TYPE_CHECKING
 
 if os.name == "nt":
     import winreg
@@ -24,6 +25,9 @@ from lib.app import AppName
 from lib.ModifyINI import ModifyINI
 from lib.type_helpers import *
 
+if TYPE_CHECKING:
+    import ttkbootstrap as ttk
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,7 +60,7 @@ def set_titlebar_style(window: tk.Misc) -> None:
             hwnd, DWMWA_MICA_EFFECT, byref(mica_effect), sizeof(mica_effect))
 
 
-def set_theme(style_object: ttk.Style, theme_name: str) -> None:
+def set_theme(style_object: "ttk.Style", theme_name: str) -> None:
     """Set the application theme."""
 
     style_object.theme_use(theme_name)
@@ -0,0 +1,139 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import logging
+import sys
+from collections.abc import Callable, Iterable
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, NamedTuple, cast
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+from lib.type_helpers import DependentSetting, SettingsLabelFrame, ValueList
+
+logger = logging.getLogger(__name__)
+
+operator_dictionary: dict[str, Callable[[Any, Any], bool]] = {
+    "greater-than": gt,
+    "greater-or-equal-than": ge,
+    "less-than": lt,
+    "less-or-equal-than": le,
+    "not-equal": ne,
+    "equal": eq,
+}
+
+
+class DependencyRule(NamedTuple):
+    """A rule from dependentSettings: the dependent setting is enabled while the rule holds."""
+
+    master: str
+    dependent: str
+    operator: Callable[[Any, Any], bool]
+    value: Any
+    as_float: bool
+    """If True, the value of the master is compared as a float."""
+    set_to_off: bool
+    off_value: ValueList | None
+
+    def holds(self, master_value: Any) -> bool:
+        if self.as_float:
+            master_value = float(master_value)
+        return self.operator(master_value, self.value)
+
+
+class DependencyGraph:
+    """The dependentSettings of every setting of a game, compiled once.
+
+    The settings are kept in topological order, so that a setting which is both
+    a dependent and a master is always evaluated before its own dependents.
+    """
+
+    def __init__(self, dependent_settings: dict[str, dict[str, DependentSetting]]) -> None:
+        self.rules: dict[str, list[DependencyRule]] = {}
+        self.dependents_of: dict[str, list[str]] = {}
+        for dependent, masters in dependent_settings.items():
+            for master, dependent_setting in masters.items():
+                operator_name = dependent_setting["operator"]
+                as_float = operator_name not in {"equal", "not-equal"}
+                value = dependent_setting.get("value")
+                self.rules.setdefault(dependent, []).append(DependencyRule(
+                    master=master,
+                    dependent=dependent,
+                    operator=operator_dictionary[operator_name],
+                    value=float(cast("str", value)) if as_float else value,
+                    as_float=as_float,
+                    set_to_off=bool(dependent_setting.get("setToOff", False)),
+                    off_value=dependent_setting.get("Offvalue"),
+                ))
+                self.dependents_of.setdefault(master, []).append(dependent)
+        self.order, self.cycles = self._sort()
+        self._position = {setting_name: position for position, setting_name in enumerate(self.order)}
+        if self.cycles:
+            logger.warning(f"dependentSettings contain a cycle between: {', '.join(self.cycles)}")
+
+    @classmethod
+    def from_display_tabs(cls, display_tabs: dict[str, dict[str, SettingsLabelFrame]]) -> "DependencyGraph":
+        """Compiles the dependentSettings of every setting in the displayTabs of Bethini.json."""
+
+        dependent_settings: dict[str, dict[str, DependentSetting]] = {}
+        for label_frames in display_tabs.values():
+            for label_frame in label_frames.values():
+                for setting_name, setting in label_frame.get("Settings", {}).items():
+                    rules = setting.get("dependentSettings")
+                    if rules:
+                        dependent_settings[setting_name] = rules
+        return cls(dependent_settings)
+
+    def _sort(self) -> tuple[list[str], list[str]]:
+        """Returns every dependent in topological order, with those in a cycle last, and the ones in a cycle."""
+
+        # Masters that are not dependents themselves do not hold anything up.
+        masters_left = {
+            dependent: len({rule.master for rule in rules if rule.master in self.rules})
+            for dependent, rules in self.rules.items()
+        }
+        ready = [dependent for dependent, count in masters_left.items() if count == 0]
+        order: list[str] = []
+        while ready:
+            setting_name = ready.pop(0)
+            order.append(setting_name)
+            for dependent in dict.fromkeys(self.dependents_of.get(setting_name, ())):
+                masters_left[dependent] -= 1
+                if masters_left[dependent] == 0:
+                    ready.append(dependent)
+        # Settings in a cycle are still evaluated, after all the others.
+        cycles = [dependent for dependent, count in masters_left.items() if count > 0]
+        return order + cycles, cycles
+
+    def downstream(self, masters: Iterable[str]) -> list[str]:
+        """Returns every dependent that can be affected by the given masters, in topological order."""
+
+        found: set[str] = set()
+        pending = list(masters)
+        while pending:
+            for dependent in self.dependents_of.get(pending.pop(), ()):
+                if dependent not in found:
+                    found.add(dependent)
+                    pending.append(dependent)
+        return sorted(found, key=self._position.__getitem__)
+
+    def in_order(self, setting_names: Iterable[str]) -> list[str]:
+        """Returns the dependents among the given settings, in topological order."""
+
+        return sorted(
+            {setting_name for setting_name in setting_names if setting_name in self._position},
+            key=self._position.__getitem__,
+        )
+
+    def evaluate(self, dependent: str, read_master: Callable[[str], Any]) -> DependencyRule | None:
+        """Returns the first rule of the dependent that does not hold, or None if it should be enabled."""
+
+        for rule in self.rules[dependent]:
+            if not rule.holds(read_master(rule.master)):
+                return rule
+        return None
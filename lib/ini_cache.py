@@ -0,0 +1,155 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import hashlib
+import logging
+import marshal
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, TypedDict
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+if TYPE_CHECKING:
+    from lib.customConfigParser import IniRecord
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+"""Increase this whenever the parser or the layout of the cached data changes."""
+
+
+class CachedINI(TypedDict):
+    """The result of parsing an INI file, as stored in the cache."""
+
+    version: tuple[int, int, int]
+    path: str
+    size: int
+    mtime: int
+    hash: str
+    sections: dict[str, dict[str, str | None]]
+    defaults: dict[str, str | None]
+    records: "list[IniRecord]"
+    newline: str
+
+
+class INICache:
+    """A cache of parsed INI files on disk.
+
+    Each file gets its own cache entry, which is only used if the size, modification
+    time and content hash of the file still match. The least recently used entries
+    are removed once there are more than max_entries.
+    """
+
+    def __init__(self, directory: Path, max_entries: int = 64) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+
+    @staticmethod
+    def _version() -> tuple[int, int, int]:
+        # marshal's format can change between Python versions.
+        return (CACHE_VERSION, sys.version_info.major, sys.version_info.minor)
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Returns the hash of the content of an INI file."""
+
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+    def _entry_path(self, ini_path: Path, *, preserve_case: bool) -> Path:
+        key = f"{ini_path.resolve()}|{preserve_case}"
+        return self.directory / f"{hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()}.bin"
+
+    def load(self, ini_path: Path, stat: os.stat_result, text: str, *, preserve_case: bool) -> CachedINI | None:
+        """Returns the cached parse of the file, if it is still fresh."""
+
+        entry_path = self._entry_path(ini_path, preserve_case=preserve_case)
+        try:
+            # marshal.loads is much faster than marshal.load on a file.
+            entry: CachedINI = marshal.loads(entry_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError):
+            logger.debug(f"Ignoring unreadable cache entry {entry_path.name} for {ini_path}")
+            return None
+
+        if (
+            not isinstance(entry, dict)
+            or entry.get("version") != self._version()
+            or entry.get("path") != str(ini_path.resolve())
+            or entry.get("size") != stat.st_size
+            or entry.get("mtime") != stat.st_mtime_ns
+            or entry.get("hash") != self.content_hash(text)
+        ):
+            logger.debug(f"Cache entry for {ini_path} is stale")
+            return None
+
+        # Mark the entry as recently used.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        logger.debug(f"Loaded {ini_path} from the cache")
+        return entry
+
+    def store(
+        self,
+        ini_path: Path,
+        stat: os.stat_result,
+        text: str,
+        *,
+        preserve_case: bool,
+        sections: dict[str, dict[str, str | None]],
+        defaults: dict[str, str | None],
+        records: "list[IniRecord]",
+        newline: str,
+    ) -> None:
+        """Stores the parse of a file that has just been read."""
+
+        entry: CachedINI = {
+            "version": self._version(),
+            "path": str(ini_path.resolve()),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": self.content_hash(text),
+            "sections": sections,
+            "defaults": defaults,
+            "records": records,
+            "newline": newline,
+        }
+        entry_path = self._entry_path(ini_path, preserve_case=preserve_case)
+        temporary_path = entry_path.with_suffix(".tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary_path.write_bytes(marshal.dumps(entry))
+            temporary_path.replace(entry_path)
+        except (OSError, ValueError):
+            logger.warning(f"Failed to cache {ini_path}", exc_info=True)
+            temporary_path.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries over max_entries."""
+
+        try:
+            entries = [(entry.stat().st_mtime_ns, entry) for entry in self.directory.glob("*.bin")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, entry in entries[: len(entries) - self.max_entries]:
+            try:
+                entry.unlink()
+            except OSError:
+                logger.debug(f"Failed to remove cache entry {entry.name}")
+            else:
+                logger.debug(f"Removed cache entry {entry.name}")
+
@@ -0,0 +1,434 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import logging
+import os
+import sys
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from shutil import copyfile
+from stat import S_IREAD, S_IWRITE
+from typing import TYPE_CHECKING, Literal, cast
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+from lib.ModifyINI import ModifyINI
+
+if TYPE_CHECKING:
+    from lib.app import AppName
+    from lib.type_helpers import GameSetting, ININame
+
+logger = logging.getLogger(__name__)
+
+# Applying presets, cleaning up and backing up the game INI files, shared by the window and the command line.
+
+
+def get_ini_location(app: "AppName", ini_name: "ININame") -> str | Literal[""]:
+    """Returns the directory of the INI file, as set in Bethini.ini."""
+
+    if ini_name == ModifyINI.app_config_name:
+        return str(app.exedir)
+    ini_setting_name = app.get_ini_setting_name(ini_name)
+    if not ini_setting_name:
+        msg = f"Unknown INI: {ini_name}"
+        raise NotImplementedError(msg)
+    return ModifyINI.app_config().get_value("Directories", ini_setting_name) or ""
+
+
+def get_target_ini(app: "AppName", ini_name: str, section: str, setting: str, *, winning_ini: str | None = None) -> ModifyINI:
+    """Return the target INI object for the given ini name, section, and setting.
+
+    winning_ini: The INI that provides the setting, if already looked up.
+    """
+
+    if winning_ini is None:
+        winning_ini = app.get_winning_ini_for_setting(ini_name, section, setting)
+    ini_location = get_ini_location(app, cast("ININame", winning_ini))
+
+    allow_sorting: bool = ini_name in app.bethini.get("Allow Sorted INIs", [])
+    if ModifyINI.app_config_name == ini_name:
+        allow_sorting = True
+
+    return ModifyINI.open(name=cast("ININame", winning_ini), location=Path(ini_location), sortable=allow_sorting)
+
+
+def open_ini_files(app: "AppName") -> list[ModifyINI]:
+    """Opens every INI file of the game that has a directory set, so that all of them are cleaned up before saving."""
+
+    ini_objects: list[ModifyINI] = []
+    for ini_name in app.what_ini_files_are_used():
+        ini_location = get_ini_location(app, ini_name)
+        if ini_location:
+            allow_sorting: bool = ini_name in app.bethini.get("Allow Sorted INIs", [])
+            ini_objects.append(ModifyINI.open(name=ini_name, location=Path(ini_location), sortable=allow_sorting))
+    return ini_objects
+
+
+def apply_ini_dict(app: "AppName", ini_dict: dict[str, "GameSetting"], *, only_if_missing: bool = False) -> None:
+    """Assigns the values of the settings in the INI files that provide them."""
+
+    # The values are grouped by the file they go to, so each file is updated in a single batch.
+    values_by_ini: dict[ModifyINI, list[tuple[str, str, str]]] = {}
+    for setting_and_section in ini_dict:
+        # Settings are in the format `setting:section`
+        # e.g. sAntiAliasing:Display
+
+        target_setting = setting_and_section.split(":")[0]
+        if not only_if_missing and target_setting in app.bethini["presetsIgnoreTheseSettings"]:
+            continue
+
+        target_ini = ini_dict[setting_and_section]["ini"]
+        target_section = ini_dict[setting_and_section]["section"]
+        this_value = str(ini_dict[setting_and_section]["value"])
+
+        if target_ini is None:
+            msg = f"{setting_and_section} has no INI set."
+            raise TypeError(msg)
+
+        target_ini_object = get_target_ini(app, target_ini, target_section, target_setting)
+        values_by_ini.setdefault(target_ini_object, []).append((target_section, target_setting, this_value))
+
+    with ModifyINI.journal.group():
+        for target_ini_object, values in values_by_ini.items():
+            changed = target_ini_object.assign_many(values, only_if_missing=only_if_missing)
+            logger.debug(f"{target_ini_object.ini_path.name}: {changed} of {len(values)} settings changed")
+
+
+def remove_ini_dict(app: "AppName", ini_dict: dict[str, "GameSetting"]) -> None:
+    """Removes the settings that are set to the given values."""
+
+    settings_by_ini: dict[ModifyINI, list[tuple[str, str]]] = {}
+    for setting_and_section in ini_dict:
+        target_setting = setting_and_section.split(":")[0]
+        target_ini = ini_dict[setting_and_section]["ini"]
+        target_section = ini_dict[setting_and_section]["section"]
+        this_value = str(ini_dict[setting_and_section]["value"])
+
+        if target_ini is None:
+            msg = f"{setting_and_section} has no INI set."
+            raise TypeError(msg)
+
+        winning_ini = app.get_winning_ini_for_setting(target_ini, target_section, target_setting)
+        if winning_ini not in app.valid_inis:
+            continue
+
+        target_ini_object = get_target_ini(app, target_ini, target_section, target_setting, winning_ini=winning_ini)
+        current_value = cast("str", target_ini_object.get_value(target_section, target_setting, this_value))
+
+        if current_value == this_value:
+            settings_by_ini.setdefault(target_ini_object, []).append((target_section, target_setting))
+            logger.debug(
+                f"{winning_ini} [{target_section}] {target_setting}={this_value}, which is the default value, and since it is not set to alwaysPrint, it will be removed")
+
+    with ModifyINI.journal.group():
+        for target_ini_object, settings in settings_by_ini.items():
+            removed = target_ini_object.remove_many(settings)
+            logger.debug(f"{target_ini_object.ini_path.name}: {removed} of {len(settings)} settings removed")
+
+
+def apply_preset(app: "AppName", preset: str) -> None:
+    """Applies a preset: Default, recommended, or one of the valueTypes of the game, such as Bethini High."""
+
+    with ModifyINI.journal.group():
+        if preset == "Default":
+            apply_ini_dict(app, app.preset_values_default)
+            remove_ini_dict(app, app.can_remove_dict)
+            apply_ini_dict(app, app.preset_values_fixedDefault)
+        elif preset == "recommended":
+            apply_ini_dict(app, app.preset_values_recommended)
+        else:
+            apply_ini_dict(app, app.preset_values(preset))
+
+
+def remove_invalid_settings(app: "AppName") -> None:
+    """Removes empty sections, and the settings settings.json does not know if RemoveUnknown is enabled for the game."""
+
+    remove_unknown_settings: str = ModifyINI.app_config().get_value("RemoveUnknown",
+                                                                    f"b{app.data['gameName']}RemoveUnknownSettings",
+                                                                    app.bethini.get("Remove Unknown Settings Default"))
+    for each_ini in ModifyINI.open_inis:
+        if each_ini == ModifyINI.app_config_name or not app.get_ini_setting_name(each_ini):
+            continue
+
+        for ini_object in ModifyINI.open_inis[each_ini].values():
+            sections = ini_object.get_sections()
+
+            for section in sections:
+                settings = ini_object.get_settings(section)
+                if not settings:
+                    ini_object.remove_section(section)
+                    logger.debug(f"{section} was removed because it was empty.")
+                    continue
+
+                for setting_name in app.unknown_settings(each_ini, section, settings):
+                    if ";" in setting_name or "#" in setting_name:
+                        logger.debug(f"{setting_name}:{section} will be preserved, as it is a comment.")
+
+                    else:
+                        if remove_unknown_settings == "1":
+                            ini_object.remove_setting(section, setting_name)
+
+                        logger.debug(f"{setting_name}:{section} {each_ini} appears to be invalid.")
+                        if not ini_object.get_settings(section):
+                            ini_object.remove_section(section)
+                            logger.debug(f"{section} was removed because it was empty.")
+
+
+def prepare_to_save(app: "AppName") -> None:
+    """The clean up done before saving: removes invalid settings and adds the missing fixedDefault ones, as a single undo step."""
+
+    with ModifyINI.journal.group():
+        remove_invalid_settings(app)
+        apply_ini_dict(app, app.preset_values_fixedDefault, only_if_missing=True)
+
+
+def group_inis_by_location(backups_directory_name: str) -> tuple[dict[Path, list[ModifyINI]], dict[Path, list[ModifyINI]], set[Path]]:
+    """Returns the open game INI files by directory, the modified ones by directory,
+    and the directories that do not have a first time backup yet.
+    """
+
+    inis_by_location: dict[Path, list[ModifyINI]] = {}
+    inis_by_location_modified: dict[Path, list[ModifyINI]] = {}
+    locations_without_first_backup: set[Path] = set()
+
+    for each_ini in ModifyINI.open_inis:
+        if each_ini == ModifyINI.app_config_name:
+            continue
+
+        for ini_path, ini_object in ModifyINI.open_inis[each_ini].items():
+            inis_by_location.setdefault(ini_path, []).append(ini_object)
+            if ini_object.has_been_modified:
+                inis_by_location_modified.setdefault(ini_path, []).append(ini_object)
+
+            first_time_backup_path = ini_path / backups_directory_name / "First-Time-Backup"
+            if not first_time_backup_path.exists():
+                locations_without_first_backup.add(ini_path)
+
+    return inis_by_location, inis_by_location_modified, locations_without_first_backup
+
+
+def create_first_time_backup(backups_path: Path, ini_objects: list[ModifyINI], log_file: Path | None = None) -> None:
+    """Copies the INI files, as they were before Bethini first saved them, to the First-Time-Backup directory."""
+
+    first_time_backup_path = backups_path / "First-Time-Backup"
+    first_time_backup_path.mkdir(parents=True)
+    for ini_file in ini_objects:
+        try:
+            copyfile(ini_file.ini_path, first_time_backup_path / ini_file.ini_path.name)
+        except FileNotFoundError:
+            logger.debug(
+                f"{ini_file.ini_path} does not exist, so it cannot be backed up. This is typically caused by a path not being set correctly.",
+            )
+    if log_file is not None:
+        copyfile(log_file, first_time_backup_path / log_file.name)
+
+
+def backup_ini_file(ini_object: ModifyINI, current_backup_path: Path) -> None:
+    """Copies the INI file to the backup directory, unless it was already backed up there."""
+
+    current_backup_path.mkdir(parents=True, exist_ok=True)
+    current_backup_file_path = current_backup_path / ini_object.ini_path.name
+    if current_backup_file_path.exists():
+        logger.warning(f"{current_backup_file_path} already exists, so it will not be overwritten.")
+        return
+    try:
+        copyfile(ini_object.ini_path, current_backup_file_path)
+    except FileNotFoundError:
+        logger.exception(
+            f"{ini_object.ini_path} does not exist, so it cannot be backed up. This is typically caused by a path not being set correctly."
+        )
+
+
+def remove_temporary_files(temporary_paths: Iterable[Path]) -> None:
+    for temporary_path in temporary_paths:
+        try:
+            temporary_path.unlink(missing_ok=True)
+        except OSError:
+            logger.warning(f"Failed to remove {temporary_path}", exc_info=True)
+
+
+def write_ini_files(ini_objects: dict[ModifyINI, bool], clear_read_only: Callable[[ModifyINI], bool]) -> bool:
+    """Saves the INI files of a directory all together, or none of them.
+
+    ini_objects: The INI files, and whether each one is sorted.
+    clear_read_only: Called for each read-only file. If it returns True, the read-only flag is
+        cleared while the file is saved and set again afterwards. Otherwise, nothing is saved.
+
+    Every file is written to a temporary file first, and those replace the files only once all of
+    them were written. If a file cannot be replaced, the files already replaced are restored.
+    """
+
+    read_only: set[ModifyINI] = set()
+    for ini_object in ini_objects:
+        if ini_object.ini_path.exists() and not os.access(ini_object.ini_path, os.W_OK):
+            logger.warning(f"{ini_object.ini_path} is read only.")
+            if not clear_read_only(ini_object):
+                logger.info(f"The read-only flag on {ini_object.ini_path} was not cleared, so no file in {ini_object.ini_path.parent} was saved.")
+                return False
+            read_only.add(ini_object)
+
+    temporary_paths: dict[ModifyINI, Path] = {}
+    try:
+        for ini_object, sort in ini_objects.items():
+            text = ini_object.render_ini_file(sort=sort)
+            temporary_path = ini_object.ini_path.with_name(f"{ini_object.ini_path.name}.tmp")
+            temporary_paths[ini_object] = temporary_path
+            with temporary_path.open("w", encoding="utf-8", newline="") as temporary_file:
+                temporary_file.write(text)
+    except OSError:
+        logger.exception(f"{ini_object.ini_path} was not able to be written, so no file in {ini_object.ini_path.parent} was saved.")
+        remove_temporary_files(temporary_paths.values())
+        return False
+
+    # The original content, or None if the file did not exist
+    replaced: dict[ModifyINI, bytes | None] = {}
+    cleared: list[ModifyINI] = []
+    try:
+        for ini_object, temporary_path in temporary_paths.items():
+            original = ini_object.ini_path.read_bytes() if ini_object.ini_path.exists() else None
+            if ini_object in read_only:
+                os.chmod(ini_object.ini_path, S_IWRITE)
+                cleared.append(ini_object)
+            os.replace(temporary_path, ini_object.ini_path)
+            replaced[ini_object] = original
+    except OSError:
+        logger.exception(f"{ini_object.ini_path} was not able to be saved, so the other files in {ini_object.ini_path.parent} are restored.")
+        for replaced_object, original in replaced.items():
+            try:
+                if original is None:
+                    replaced_object.ini_path.unlink(missing_ok=True)
+                else:
+                    replaced_object.ini_path.write_bytes(original)
+            except OSError:
+                logger.exception(f"{replaced_object.ini_path} could not be restored. It can be restored from the backups.")
+        remove_temporary_files(temporary_paths.values())
+        restore_read_only(cleared)
+        return False
+
+    restore_read_only(cleared)
+    for ini_object in ini_objects:
+        ini_object.mark_saved()
+        logger.info(f"{ini_object.ini_path} saved.")
+    return True
+
+
+def restore_read_only(ini_objects: list[ModifyINI]) -> None:
+    for ini_object in ini_objects:
+        try:
+            os.chmod(ini_object.ini_path, S_IREAD)
+        except OSError:
+            logger.exception(f"Failed to set the read-only flag on {ini_object.ini_path} again.")
+
+
+def save_ini_files(
+    backups_directory_name: str,
+    backup_name: str,
+    *,
+    make_backups: bool,
+    log_file: Path | None,
+    choose: Callable[[ModifyINI], bool | None],
+    clear_read_only: Callable[[ModifyINI], bool],
+) -> tuple[list[ModifyINI], list[ModifyINI]]:
+    """Backs up and saves the modified game INI files, used by both the Save button and the command line.
+
+    backups_directory_name: The directory the backups are kept in, next to the INI files.
+    backup_name: The directory of this backup in the backups directory.
+    log_file: Copied to the backups, if given.
+    choose: Called for each modified file. Returns whether to sort the file, or None to not save it.
+    clear_read_only: Called for each read-only file, see write_ini_files.
+
+    The files of each directory are saved all together, or none of them.
+    Returns the files that were saved and the files that could not be saved.
+    """
+
+    files_to_remove = [ini_name for ini_name in ModifyINI.open_inis if ini_name != ModifyINI.app_config_name]
+    if log_file is not None:
+        files_to_remove.append(log_file.name)
+    inis_by_location, inis_by_location_modified, locations_without_first_backup = group_inis_by_location(
+        backups_directory_name)
+    max_backups = int(cast("str", ModifyINI.app_config().get_value("General", "iMaxBackups", "5")))
+
+    saved: list[ModifyINI] = []
+    failed: list[ModifyINI] = []
+    for ini_location, inis in inis_by_location_modified.items():
+        chosen: dict[ModifyINI, bool] = {}
+        for ini_object in inis:
+            sort = choose(ini_object)
+            if sort is not None:
+                chosen[ini_object] = sort
+        if not chosen:
+            continue
+
+        backups_path = ini_location / backups_directory_name
+        current_backup_path = backups_path / backup_name
+        remove_excess_directory_files(backups_path, max_backups, files_to_remove)
+        if make_backups:
+            if ini_location in locations_without_first_backup:
+                create_first_time_backup(backups_path, inis_by_location[ini_location], log_file)
+            for ini_object in chosen:
+                backup_ini_file(ini_object, current_backup_path)
+
+        if not write_ini_files(chosen, clear_read_only):
+            failed.extend(chosen)
+            continue
+        saved.extend(chosen)
+
+        if make_backups and log_file is not None:
+            # Flushed, so the copy has everything logged so far.
+            for handler in logging.getLogger().handlers:
+                handler.flush()
+            copyfile(log_file, current_backup_path / log_file.name)
+    return saved, failed
+
+
+def remove_excess_directory_files(directory: Path, max_to_keep: int, files_to_remove: list[str]) -> None:
+    """Remove excess logs or backups.
+
+    directory: The directory to remove files from.
+    max_to_keep: The maximum amount of directories that will be excluded from removal.
+    files_to_remove: List of files that will be removed.
+    """
+
+    if max_to_keep <= -1:
+        return
+
+    try:
+        subdirectories = [d for d in directory.iterdir() if d.is_dir()]
+    except FileNotFoundError:
+        return
+
+    if subdirectories:
+        subdirectories = [d for d in subdirectories if d.name != "First-Time-Backup"]
+    if len(subdirectories) <= max_to_keep:
+        return
+
+    subdirectories.sort(key=os.path.getctime, reverse=True)
+    for index, dir_path in enumerate(subdirectories):
+        if index < max_to_keep:
+            logger.debug(f"{dir_path} will be kept.")
+            continue
+
+        file_delete_failed = False
+        for file in files_to_remove:
+            file_path = dir_path / file
+            try:
+                file_path.unlink(missing_ok=True)
+            except OSError:
+                logger.exception("Failed to delete file old.")
+                file_delete_failed = True
+
+        if file_delete_failed:
+            logger.error(f"Old folder cannot be deleted: {dir_path}")
+            continue
+
+        try:
+            dir_path.rmdir()
+        except OSError:
+            logger.exception(f"Failed to delete old folder: {dir_path}")
+        else:
+            logger.debug(f"Old folder was deleted: {dir_path}")
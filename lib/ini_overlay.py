@@ -0,0 +1,170 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import logging
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+from lib.ModifyINI import ModifyINI
+
+if TYPE_CHECKING:
+    from lib.app import AppName
+
+logger = logging.getLogger(__name__)
+
+
+class PeckingOrderOverlay:
+    """The winning INI of every setting that is overridden in the INI_pecking_order.
+
+    For each main INI, this maps (section, lowercase setting) to the INI further up
+    its pecking order that provides the value. Settings that are not overridden are
+    won by the main INI itself, so only the settings of the overriding INIs are stored.
+
+    The map is built on first use, kept up to date as settings are added and removed,
+    and rebuilt when the INI directories change. It gives the same results as
+    AppName.find_winning_ini_for_setting.
+    """
+
+    def __init__(self, app: "AppName") -> None:
+        self.app = app
+        # Main INI -> (section, lowercase setting) -> winning INI
+        self._winners: dict[str, dict[tuple[str, str], str]] | None = None
+        # Main INI -> the INIs checked before it, in the order they are checked
+        self._overriding: dict[str, list[tuple[str, ModifyINI]]] = {}
+        # INI object -> the main INIs it can override
+        self._overridden_by: dict[ModifyINI, list[str]] = {}
+        # Main INIs whose pecking order contains an unknown INI
+        self._incomplete: set[str] = set()
+        ModifyINI.listeners.append(self.on_change)
+
+    def close(self) -> None:
+        """Stops following changes to the INI files."""
+
+        if self.on_change in ModifyINI.listeners:
+            ModifyINI.listeners.remove(self.on_change)
+
+    def winning_ini(self, ini: str, section: str, setting: str) -> str:
+        """Returns the INI that is providing the value for the setting."""
+
+        winners_by_ini = self._winners if self._winners is not None else self._build()
+        winners = winners_by_ini.get(ini)
+        if winners is None:
+            # Bethini.ini, and INIs that are not a key in the INI_pecking_order.
+            return self.app.find_winning_ini_for_setting(ini, section, setting)
+        winning_ini = winners.get((section, setting.lower()))
+        if winning_ini is not None:
+            return winning_ini
+        if ini in self._incomplete:
+            # Not overridden by the known INIs, so this reaches the unknown one.
+            return self.app.find_winning_ini_for_setting(ini, section, setting)
+        return ini
+
+    def invalidate(self) -> None:
+        """Rebuilds the map the next time it is used."""
+
+        self._winners = None
+
+    def _overriding_inis(self, main_ini: str) -> tuple[list[tuple[str, ModifyINI]], bool]:
+        """Returns the INIs that are checked before the main INI, in the order they are checked.
+
+        The second value is False if the pecking order contains an unknown INI.
+        """
+
+        overriding: list[tuple[str, ModifyINI]] = []
+        for test_ini in reversed(self.app.bethini["INI_pecking_order"][main_ini]):
+            if test_ini == main_ini:
+                break
+            ini_location_setting = self.app.get_ini_setting_name(test_ini)
+            if not ini_location_setting:
+                return overriding, False
+            ini_location = ModifyINI.app_config().get_value("Directories", ini_location_setting)
+            # Without a location, this INI and everything after it is skipped.
+            if not ini_location:
+                break
+            allow_sorting: bool = test_ini in self.app.bethini.get("Allow Sorted INIs", [])
+            overriding.append(
+                (test_ini, ModifyINI.open(name=test_ini, location=Path(ini_location), sortable=allow_sorting)))
+        return overriding, True
+
+    @staticmethod
+    def _keys(ini_object: ModifyINI, section: str | None = None) -> Iterator[tuple[str, str]]:
+        """Yields every (section, setting) that has_option finds in the INI, optionally for one section only."""
+
+        config = ini_object.case_insensitive_config
+        defaults = config.get_options(config.default_section) or {}
+        sections = config._sections.items() if section is None else [(section, config.get_options(section))]  # noqa: SLF001
+        for section_name, options in sections:
+            if options is None:
+                continue
+            for setting in options:
+                yield (section_name, setting)
+            for setting in defaults:
+                yield (section_name, setting)
+        if section is None or section == config.default_section:
+            for setting in defaults:
+                yield (config.default_section, setting)
+
+    def _build(self) -> dict[str, dict[tuple[str, str], str]]:
+        self._winners = {}
+        self._overriding = {}
+        self._overridden_by = {}
+        self._incomplete = set()
+        for main_ini in self.app.bethini["INI_pecking_order"]:
+            overriding, complete = self._overriding_inis(main_ini)
+            if not complete:
+                self._incomplete.add(main_ini)
+            winners: dict[tuple[str, str], str] = {}
+            for test_ini, ini_object in overriding:
+                self._overridden_by.setdefault(ini_object, []).append(main_ini)
+                for key in self._keys(ini_object):
+                    winners.setdefault(key, test_ini)
+            self._winners[main_ini] = winners
+            self._overriding[main_ini] = overriding
+        logger.debug(f"Built the pecking order overlay with {sum(len(winners) for winners in self._winners.values())} overridden settings.")
+        return self._winners
+
+    def _update(self, main_ini: str, winners: dict[tuple[str, str], str], key: tuple[str, str]) -> None:
+        section, setting = key
+        for test_ini, ini_object in self._overriding[main_ini]:
+            if ini_object.case_insensitive_config.has_option(section, setting):
+                winners[key] = test_ini
+                return
+        winners.pop(key, None)
+
+    def on_change(self, ini_object: ModifyINI, section: str, setting: str | None) -> None:
+        """Updates the winners after a setting or section of an INI was changed."""
+
+        winners_by_ini = self._winners
+        if winners_by_ini is None:
+            return
+        if ini_object.ini_path.name == ModifyINI.app_config_name:
+            if section.lower() == "directories":
+                self.invalidate()
+            return
+        main_inis = self._overridden_by.get(ini_object)
+        if not main_inis:
+            return
+        if section == ini_object.case_insensitive_config.default_section:
+            # Default settings apply to every section.
+            self.invalidate()
+            return
+        for main_ini in main_inis:
+            winners = winners_by_ini[main_ini]
+            if setting is not None:
+                keys = {(section, setting.lower())}
+            else:
+                keys = {key for key in winners if key[0] == section}
+                for _, overriding_object in self._overriding[main_ini]:
+                    keys.update(self._keys(overriding_object, section))
+            for key in keys:
+                self._update(main_ini, winners, key)
+
@@ -36,7 +36,7 @@ class MenuBar(ttk.Frame):
 
         # Create the menus
         self.file_menu = tk.Menu(self, tearoff=False)
-        self.file_menu.add_command(label="Save", command=master.save_ini_files)
+        self.file_menu.add_command(label="Save", accelerator="Ctrl+S", command=master.save_ini_files)
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Restore Backup", command=lambda: RestoreBackupWindow(master))
         self.file_menu.add_separator()
@@ -45,6 +45,9 @@ class MenuBar(ttk.Frame):
         self.file_menu.add_command(label="Exit", command=master.on_closing)
 
         self.edit_menu = tk.Menu(self, tearoff=False)
+        self.edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=master.undo)
+        self.edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=master.redo)
+        self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Preferences", command=lambda: preferences(master))
         self.edit_menu.add_command(label="Setup", command=master.show_setup)
 
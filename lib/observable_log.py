@@ -0,0 +1,70 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import logging
+import sys
+import threading
+from collections import deque
+from itertools import islice
+from typing import cast
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+
+class log_list_handler(logging.Handler):
+    def __init__(self, log_list):
+        super().__init__()
+        self.log_list = log_list
+
+    def emit(self, record):
+        msg = self.format(record)
+        self.log_list.append(msg)
+
+class observable_log:
+    """The latest log messages, up to a fixed capacity, with observers that are told about new ones."""
+
+    def __init__(self, capacity: int = 2000) -> None:
+        self.messages: deque[str] = deque(maxlen=capacity)
+        self.total = 0
+        """The number of messages ever appended, including those no longer kept."""
+        self.observers = []
+
+    @property
+    def capacity(self) -> int:
+        return cast("int", self.messages.maxlen)
+
+    def set_capacity(self, capacity: int) -> None:
+        self.messages = deque(self.messages, maxlen=capacity)
+
+    def append(self, item: str) -> None:
+        self.messages.append(item)
+        self.total += 1
+        # The observers use Tk, which must only be used from the main thread.
+        # Messages from other threads are shown along with the next one from the main thread.
+        if threading.current_thread() is threading.main_thread():
+            self.notify_observers()
+
+    def since(self, total: int) -> tuple[list[str], bool]:
+        """Returns the messages appended after the first total ones.
+
+        The second value is True if some of those are no longer kept, in which case every kept message is returned.
+        """
+        new = self.total - total
+        if new > len(self.messages):
+            return list(self.messages), True
+        return list(islice(self.messages, len(self.messages) - new, None)), False
+
+    def notify_observers(self):
+        for observer in self.observers:
+            observer()
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
@@ -0,0 +1,141 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import gc
+import hashlib
+import logging
+import marshal
+import sys
+from pathlib import Path
+from typing import Any, TypeAlias, TypedDict
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+from lib.type_helpers import AppBethiniJSON, AppSettingsJSON
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_CACHE_VERSION = 1
+"""Increase this whenever the indexes of AppName or the layout of the cached data change."""
+
+SourceFingerprint: TypeAlias = tuple[str, int, int, str]
+"""The path, size, modification time and content hash of a plugin file."""
+
+
+class CachedPlugin(TypedDict):
+    """A plugin in the apps folder, parsed and indexed, as stored in the cache."""
+
+    version: tuple[int, int, int]
+    sources: list[SourceFingerprint]
+    data: AppSettingsJSON
+    bethini: AppBethiniJSON
+    index: dict[str, Any]
+
+
+class PluginCache:
+    """A cache of the parsed Bethini.json and settings.json of each plugin, with the indexes AppName builds from them.
+
+    Each plugin gets its own cache entry, which is only used if the size, modification
+    time and content hash of both files still match.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    @staticmethod
+    def _version() -> tuple[int, int, int]:
+        # marshal's format can change between Python versions.
+        return (PLUGIN_CACHE_VERSION, sys.version_info.major, sys.version_info.minor)
+
+    @staticmethod
+    def fingerprint(path: Path, content: bytes) -> SourceFingerprint:
+        """Returns the fingerprint of a plugin file that has just been read."""
+
+        stat = path.stat()
+        return (
+            str(path.resolve()),
+            stat.st_size,
+            stat.st_mtime_ns,
+            hashlib.blake2b(content, digest_size=16).hexdigest(),
+        )
+
+    def _entry_path(self, plugin_directory: Path) -> Path:
+        key = str(plugin_directory.resolve())
+        return self.directory / f"{hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()}.bin"
+
+    def load(self, plugin_directory: Path, sources: list[SourceFingerprint]) -> CachedPlugin | None:
+        """Returns the cached plugin, if it is still fresh."""
+
+        entry_path = self._entry_path(plugin_directory)
+        gc_was_enabled = gc.isenabled()
+        # Loading creates many containers at once, which would trigger the garbage collector again and again.
+        gc.disable()
+        try:
+            entry: CachedPlugin = marshal.loads(entry_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError):
+            logger.debug(f"Ignoring unreadable cache entry {entry_path.name} for {plugin_directory}")
+            return None
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        if (
+            not isinstance(entry, dict)
+            or entry.get("version") != self._version()
+            or entry.get("sources") != sources
+        ):
+            logger.debug(f"Cache entry for {plugin_directory} is stale")
+            return None
+
+        logger.debug(f"Loaded {plugin_directory} from the cache")
+        return entry
+
+    def store(
+        self,
+        plugin_directory: Path,
+        sources: list[SourceFingerprint],
+        *,
+        data: AppSettingsJSON,
+        bethini: AppBethiniJSON,
+        index: dict[str, Any],
+    ) -> None:
+        """Stores a plugin that has just been parsed and indexed."""
+
+        entry: CachedPlugin = {
+            "version": self._version(),
+            "sources": sources,
+            "data": data,
+            "bethini": bethini,
+            "index": index,
+        }
+        entry_path = self._entry_path(plugin_directory)
+        temporary_path = entry_path.with_suffix(".tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # The index shares its objects with data, and marshal keeps them shared.
+            temporary_path.write_bytes(marshal.dumps(entry))
+            temporary_path.replace(entry_path)
+        except (OSError, ValueError):
+            logger.warning(f"Failed to cache {plugin_directory}", exc_info=True)
+            temporary_path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Removes every entry, so that each plugin is parsed and cached again."""
+
+        try:
+            entries = list(self.directory.glob("*.bin"))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                entry.unlink()
+            except OSError:
+                logger.debug(f"Failed to remove cache entry {entry.name}")
+        logger.info(f"Cleared {len(entries)} cached plugin(s)")
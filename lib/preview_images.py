@@ -0,0 +1,184 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import hashlib
+import logging
+import os
+import queue
+import sys
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+from PIL import Image, ImageTk
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_MS = 30
+"""How often the main thread collects the images the worker thread has decoded."""
+
+
+class PreviewImages:
+    """The preview images of the settings, downscaled, decoded in the background and shared by every tooltip.
+
+    Downscaled copies of the images are cached on disk, keyed by the path and modification
+    time of the image and the size they were downscaled to. The least recently used entries
+    are removed once there are more than max_entries. The last images shown are kept
+    decoded in memory, up to capacity.
+
+    Tk must only be used from the main thread, so the worker thread only decodes with PIL and
+    does not log. The main thread turns what it decoded into PhotoImages.
+    """
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        cache_directory: Path | None,
+        max_size: tuple[int, int],
+        capacity: int = 10,
+        max_entries: int = 256,
+    ) -> None:
+        self.root = root
+        self.cache_directory = cache_directory
+        self.max_size = max_size
+        self.capacity = capacity
+        self.max_entries = max_entries
+        self._photo_images: OrderedDict[Path, ImageTk.PhotoImage] = OrderedDict()
+        # Image being decoded -> what to call once it is ready
+        self._waiting: dict[Path, list[Callable[[ImageTk.PhotoImage | None], None]]] = {}
+        self._requests: queue.SimpleQueue[Path] = queue.SimpleQueue()
+        self._results: queue.SimpleQueue[tuple[Path, Image.Image | Exception]] = queue.SimpleQueue()
+        self._worker: threading.Thread | None = None
+        self._poll_id: str | None = None
+
+    def get(self, path: Path, callback: Callable[[ImageTk.PhotoImage | None], None]) -> ImageTk.PhotoImage | None:
+        """Returns the preview image, if it is decoded already.
+
+        Otherwise, returns None and decodes it in the background. The callback is then called
+        on the main thread with the image, or None if it could not be read.
+        """
+
+        photo_image = self._photo_images.get(path)
+        if photo_image is not None:
+            self._photo_images.move_to_end(path)
+            return photo_image
+
+        if path in self._waiting:
+            self._waiting[path].append(callback)
+            return None
+        self._waiting[path] = [callback]
+        self._requests.put(path)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name="PreviewImages", daemon=True)
+            self._worker.start()
+        if self._poll_id is None:
+            self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+        return None
+
+    def clear(self) -> None:
+        """Forgets the images kept in memory."""
+
+        self._photo_images.clear()
+
+    def _poll(self) -> None:
+        """Hands the images the worker thread has decoded to those waiting for them."""
+
+        self._poll_id = None
+        while True:
+            try:
+                path, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            photo_image: ImageTk.PhotoImage | None = None
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to load the preview image {path}: {result}")
+            else:
+                photo_image = ImageTk.PhotoImage(result, master=self.root)
+                self._photo_images[path] = photo_image
+                while len(self._photo_images) > self.capacity:
+                    self._photo_images.popitem(last=False)
+
+            for callback in self._waiting.pop(path, ()):
+                callback(photo_image)
+
+        if self._waiting:
+            self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _work(self) -> None:
+        while True:
+            path = self._requests.get()
+            try:
+                result: Image.Image | Exception = self._decode(path)
+            except Exception as e:  # noqa: BLE001
+                result = e
+            self._results.put((path, result))
+
+    def _entry_path(self, path: Path, stat: os.stat_result) -> Path | None:
+        if self.cache_directory is None:
+            return None
+        key = f"{path.resolve()}|{stat.st_mtime_ns}|{self.max_size[0]}x{self.max_size[1]}"
+        return self.cache_directory / f"{hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()}.jpg"
+
+    def _decode(self, path: Path) -> Image.Image:
+        """Returns the downscaled image, from the disk cache if it is there. Runs on the worker thread."""
+
+        entry_path = self._entry_path(path, path.stat())
+        if entry_path is not None:
+            try:
+                image = Image.open(entry_path)
+                image.load()
+            except (OSError, ValueError):
+                pass
+            else:
+                # Mark the entry as recently used.
+                try:
+                    os.utime(entry_path)
+                except OSError:
+                    pass
+                return image
+
+        image = Image.open(path)
+        # JPEG images can be decoded at a fraction of their size, which is much faster.
+        image.draft("RGB", self.max_size)
+        image = image.convert("RGB")
+        image.thumbnail(self.max_size, Image.Resampling.LANCZOS)
+
+        if entry_path is not None:
+            temporary_path = entry_path.with_suffix(".tmp")
+            try:
+                entry_path.parent.mkdir(parents=True, exist_ok=True)
+                image.save(temporary_path, format="JPEG", quality=90)
+                temporary_path.replace(entry_path)
+            except (OSError, ValueError):
+                temporary_path.unlink(missing_ok=True)
+            else:
+                self._evict()
+        return image
+
+    def _evict(self) -> None:
+        """Removes the least recently used entries over max_entries. Runs on the worker thread."""
+
+        if self.cache_directory is None:
+            return
+        try:
+            entries = [(entry.stat().st_mtime_ns, entry) for entry in self.cache_directory.glob("*.jpg")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, entry in entries[: len(entries) - self.max_entries]:
+            try:
+                entry.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,118 @@
+#
+# This work is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International License.
+# To view a copy of this license, visit http://creativecommons.org/licenses/by-nc-sa/4.0/
+# or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
+#
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from typing import Any
+
+if __name__ == "__main__":
+    sys.exit(1)
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """Records a timeline of the phases of the startup, when enabled with --profile-startup.
+
+    The timeline is written in the Chrome trace event format, which can be opened
+    with chrome://tracing, https://ui.perfetto.dev or https://www.speedscope.app.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._start_ns = 0
+        self._events: list[dict[str, Any]] = []
+        self._depth = 0
+        self._disabled_span = nullcontext()
+
+    def enable(self) -> None:
+        """Starts recording. Time is measured from this call."""
+
+        self.enabled = True
+        self._start_ns = time.perf_counter_ns()
+        self._events.clear()
+
+    def span(self, name: str, category: str = "startup") -> AbstractContextManager[None]:
+        """Returns a context manager recording the time spent in it. Does nothing when disabled."""
+
+        if not self.enabled:
+            return self._disabled_span
+        return self._span(name, category)
+
+    @contextmanager
+    def _span(self, name: str, category: str) -> Iterator[None]:
+        start_ns = time.perf_counter_ns()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            end_ns = time.perf_counter_ns()
+            self._events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start_ns - self._start_ns) / 1000,
+                    "dur": (end_ns - start_ns) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": {"depth": self._depth},
+                },
+            )
+
+    def elapsed_ms(self) -> float:
+        """Returns the milliseconds since recording started."""
+
+        return (time.perf_counter_ns() - self._start_ns) / 1_000_000
+
+    def write(self, path: Path) -> None:
+        """Writes the timeline as a Chrome trace JSON file."""
+
+        # Parents end after their children, so sort to list them in the order they started.
+        events = sorted(self._events, key=lambda event: (event["ts"], -event["dur"]))
+        trace = {
+            "traceEvents": [
+                {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "Bethini Pie startup"}},
+                *events,
+            ],
+            "displayTimeUnit": "ms",
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as trace_file:
+            json.dump(trace, trace_file)
+        logger.info(f"Startup profile written to '{path}'")
+
+    def summary(self) -> str:
+        """Returns a table of the number of calls and the total time of every span, slowest first."""
+
+        totals: dict[tuple[str, str], list[float]] = {}
+        for event in self._events:
+            total = totals.setdefault((event["cat"], event["name"]), [0, 0.0])
+            total[0] += 1
+            total[1] += event["dur"] / 1000
+
+        name_width = max((len(f"{category}: {name}") for category, name in totals), default=4)
+        lines = [f"{'Span':<{name_width}}  {'Count':>7}  {'Total ms':>10}  {'Mean ms':>9}"]
+        for (category, name), (count, total_ms) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{f'{category}: {name}':<{name_width}}  {count:>7}  {total_ms:>10.2f}  {total_ms / count:>9.3f}")
+        lines.append(f"Startup took {self.elapsed_ms():.2f} ms.")
+        return "\n".join(lines)
+
+    def log_summary(self) -> None:
+        logger.info(f"Startup profile:\n{self.summary()}")
+
+
+startup_profiler = StartupProfiler()
+"""The profiler shared by the whole app. It only records once enabled."""
@@ -1,11 +1,58 @@
 import sys
+from tkinter import font
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.tableview import Tableview, TableCellRightClickMenu, TableHeaderRightClickMenu
+from ttkbootstrap.tableview import Tableview, TableRow, TableCellRightClickMenu, TableHeaderRightClickMenu
 
 if __name__ == "__main__":
     sys.exit(1)
 
+
+class VirtualTableRow(TableRow):
+    """A row of a virtual TableviewScrollable.
+
+    The row only has a Treeview item, and an iid, while it is scrolled into view.
+    """
+
+    def __init__(self, tableview, values):
+        super().__init__(tableview, values)
+        self.tags = ()
+
+    def configure(self, opt=None, **kwargs):
+        if opt is not None:
+            if opt == "tags":
+                return self.tags
+            if opt == "values":
+                return self.values
+            return self.view.item(self.iid, opt) if self._iid is not None else None
+        if "values" in kwargs:
+            self.values = kwargs.pop("values")
+        if "tags" in kwargs:
+            self.tags = tuple(kwargs.pop("tags"))
+            if self._iid is not None:
+                kwargs["tags"] = self._table._realized_tags(self)
+        if kwargs and self._iid is not None:
+            self.view.item(self.iid, **kwargs)
+
+    def show(self, striped=False):
+        """The table shows the row when it is scrolled into view."""
+
+    def hide(self):
+        """The table hides the row when it is scrolled out of view."""
+
+    def build(self):
+        """The row borrows a Treeview item from the table when it is scrolled into view."""
+
+    def delete(self):
+        """Delete the row from the dataset"""
+        table = self._table
+        table._tablerows.remove(self)
+        if self in table._tablerows_filtered:
+            table._tablerows_filtered.remove(self)
+        table._selected_rows.discard(self)
+        table.load_table_data()
+
+
 class TableviewScrollable(Tableview):
     def __init__(
         self,
@@ -22,6 +69,7 @@ class TableviewScrollable(Tableview):
         pagesize=10,
         height=10,
         delimiter=",",
+        virtual=False,
     ):
         """
         Parameters:
@@ -104,8 +152,27 @@ class TableviewScrollable(Tableview):
             delimiter (str):
                 The character to use as a delimiter when exporting data
                 to CSV.
+
+            virtual (bool):
+                If `True`, the rows are kept in memory and only the rows
+                scrolled into view are given Treeview items, so that tens
+                of thousands of rows stay fast to scroll, sort and filter.
+                A virtual table is never paginated.
         """
         self.yscrollbar = yscrollbar
+        self.virtual = virtual
+        # The Treeview items that the rows in view borrow, from top to bottom.
+        self._slots = []
+        # The rows in view, from top to bottom.
+        self._realized = []
+        # The index of the top row in view, among the rows of the current view.
+        self._first = 0
+        # The selected rows, including those that were scrolled out of view.
+        self._selected_rows = set()
+        self._row_top = None
+        self._row_height = None
+        if virtual:
+            paginated = False
         super().__init__(
             master,
             bootstyle,
@@ -141,10 +208,13 @@ class TableviewScrollable(Tableview):
 
         if self.yscrollbar:
             self.ybar = ttk.Scrollbar(
-                master=table_frame, command=self.view.yview, orient=VERTICAL
+                master=table_frame,
+                command=self._yview_virtual if self.virtual else self.view.yview,
+                orient=VERTICAL,
             )
             self.ybar.pack(fill=Y, side=RIGHT)
-            self.view.configure(yscrollcommand=self.ybar.set)
+            if not self.virtual:
+                self.view.configure(yscrollcommand=self.ybar.set)
 
         self.hbar = ttk.Scrollbar(
             master=self, command=self.view.xview, orient=HORIZONTAL
@@ -159,4 +229,204 @@ class TableviewScrollable(Tableview):
 
         self._rightclickmenu_cell = TableCellRightClickMenu(self)
         self._rightclickmenu_head = TableHeaderRightClickMenu(self)
-        self._set_widget_binding()
\ No newline at end of file
+        self._set_widget_binding()
+        if self.virtual:
+            self._set_virtual_binding()
+
+    def filter_rows(self, rows):
+        """Show only the given rows, in their current order, as a filter
+        that `reset_row_filters` removes.
+
+        Parameters:
+
+            rows (Collection[TableRow]):
+                The rows to show.
+        """
+        if self.virtual:
+            self.unload_table_data()
+        else:
+            # Hide every visible row at once, rather than one at a time.
+            if self._viewdata:
+                self.view.detach(*(row.iid for row in self._viewdata))
+            self._viewdata.clear()
+        self._filtered = True
+        self._tablerows_filtered = [row for row in self._tablerows if row in rows]
+        if self.virtual:
+            self.load_table_data()
+        else:
+            for row in self._tablerows_filtered:
+                self.view.reattach(row.iid, "", END)
+                self._viewdata.append(row)
+
+    # VIRTUAL ROWS
+
+    def insert_row(self, index=END, values=[]):
+        if not self.virtual:
+            return super().insert_row(index, values)
+        if len(values) == 0:
+            return None
+        record = VirtualTableRow(self, values)
+        if index == END or index > len(self._tablerows) - 1:
+            self._tablerows.append(record)
+        else:
+            self._tablerows.insert(index, record)
+        return record
+
+    def delete_rows(self, indices=None, iids=None, visible=True):
+        if self.virtual and indices is None and iids is None:
+            # The rows are about to go, and the Treeview items they borrow with them.
+            if self._slots:
+                self.view.delete(*self._slots)
+            self._slots.clear()
+            self._realized = []
+            self._selected_rows.clear()
+        super().delete_rows(indices, iids, visible)
+
+    def unload_table_data(self):
+        if not self.virtual:
+            super().unload_table_data()
+            return
+        for row in self._realized:
+            row._iid = None
+        self._realized = []
+        self._iidmap.clear()
+        self._viewdata = []
+        self._first = 0
+
+    def load_table_data(self, clear_filters=False):
+        if not self.virtual:
+            super().load_table_data(clear_filters)
+            return
+        if clear_filters:
+            self.reset_table()
+        # Every row of the current view; only those scrolled into view are realized.
+        self._viewdata = list(self._tablerows_filtered if self._filtered else self._tablerows)
+        self._realize_rows()
+
+    def autofit_columns(self):
+        if not self.virtual:
+            super().autofit_columns()
+            return
+        # Only measure the rows in view, rather than every row of the current view.
+        viewdata = self._viewdata
+        self._viewdata = self._realized
+        try:
+            super().autofit_columns()
+        finally:
+            self._viewdata = viewdata
+
+    def scroll_to(self, first):
+        """Scroll a virtual table so that the row at index `first` of the
+        current view is at the top.
+
+        Parameters:
+
+            first (int):
+                The index of the row among the rows of the current view.
+        """
+        first = max(0, min(first, len(self._viewdata) - self._visible_row_count()))
+        if first != self._first:
+            self._first = first
+            self._realize_rows()
+
+    def _visible_row_count(self):
+        """The number of rows that fit in the Treeview."""
+        height = self.view.winfo_height()
+        if height <= 1:
+            # Not drawn yet.
+            return self._height
+        if self._slots and self._realized:
+            bbox = self.view.bbox(self._slots[0])
+            if bbox:
+                self._row_top, self._row_height = bbox[1], bbox[3]
+        if self._row_height is None:
+            self._row_height = font.nametofont("TkDefaultFont").metrics("linespace") + 2
+            self._row_top = self._row_height
+        return max(1, (height - self._row_top) // self._row_height)
+
+    def _realized_tags(self, row):
+        tags = row.tags
+        if self._stripecolor is not None and (self._first + self._realized.index(row)) % 2 == 0:
+            tags = (*tags, "striped")
+        return tags
+
+    def _realize_rows(self):
+        """Give the rows scrolled into view the Treeview items, and update the scrollbar."""
+        count = self._visible_row_count()
+        total = len(self._viewdata)
+        self._first = max(0, min(self._first, total - count))
+        window = self._viewdata[self._first:self._first + count]
+
+        for row in self._realized:
+            row._iid = None
+        self._iidmap.clear()
+        while len(self._slots) < len(window):
+            self._slots.append(self.view.insert("", END, values=()))
+
+        self._realized = window
+        for position, (slot, row) in enumerate(zip(self._slots, window)):
+            row._iid = slot
+            self._iidmap[slot] = row
+            self.view.item(slot, values=row.values, tags=self._realized_tags(row))
+            self.view.move(slot, "", position)
+        unused = self._slots[len(window):]
+        if unused:
+            self.view.detach(*unused)
+
+        self.view.selection_set([row.iid for row in window if row in self._selected_rows])
+        if self.yscrollbar:
+            if total:
+                self.ybar.set(self._first / total, (self._first + len(window)) / total)
+            else:
+                self.ybar.set(0, 1)
+
+    def _yview_virtual(self, *args):
+        """Scrollbar command of a virtual table."""
+        count = self._visible_row_count()
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self._viewdata)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= count
+            self.scroll_to(self._first + amount)
+
+    def _set_virtual_binding(self):
+        """Setup the scrolling of a virtual table"""
+        self.view.bind("<Configure>", lambda _event: self._realize_rows(), add="+")
+        self.view.bind("<<TreeviewSelect>>", self._on_virtual_select, add="+")
+        self.view.bind("<MouseWheel>", self._on_virtual_mousewheel)
+        self.view.bind("<Button-4>", self._on_virtual_mousewheel)
+        self.view.bind("<Button-5>", self._on_virtual_mousewheel)
+        self.view.bind("<Up>", lambda _event: self._on_virtual_keynav(-1))
+        self.view.bind("<Down>", lambda _event: self._on_virtual_keynav(1))
+        self.view.bind("<Prior>", lambda _event: self._yview_virtual("scroll", -1, "pages") or "break")
+        self.view.bind("<Next>", lambda _event: self._yview_virtual("scroll", 1, "pages") or "break")
+
+    def _on_virtual_select(self, _event):
+        selected = {self._iidmap[iid] for iid in self.view.selection() if iid in self._iidmap}
+        self._selected_rows = (self._selected_rows - set(self._realized)) | selected
+
+    def _on_virtual_mousewheel(self, event):
+        if event.num == 4 or (event.num != 5 and event.delta > 0):
+            self.scroll_to(self._first - 3)
+        else:
+            self.scroll_to(self._first + 3)
+        return "break"
+
+    def _on_virtual_keynav(self, delta):
+        """Move the focus past the top or bottom row in view by scrolling."""
+        row = self._iidmap.get(self.view.focus())
+        if row is None:
+            return None
+        target = self._first + self._realized.index(row) + delta
+        if target < 0 or target >= len(self._viewdata):
+            return "break"
+        if self._first <= target < self._first + len(self._realized):
+            # Within the rows in view, the Treeview moves the focus itself.
+            return None
+        self.scroll_to(target if delta < 0 else target - len(self._realized) + 1)
+        iid = self._viewdata[target].iid
+        self.view.focus(iid)
+        self.view.selection_set(iid)
+        return "break"
\ No newline at end of file
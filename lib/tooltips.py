@@ -6,14 +6,18 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
 from pathlib import Path
-
-from PIL import Image, ImageTk
+from typing import TYPE_CHECKING
 
 if __name__ == "__main__":
     sys.exit(1)
 
 from lib.customFunctions import set_titlebar_style
 
+if TYPE_CHECKING:
+    from PIL import ImageTk
+
+    from lib.preview_images import PreviewImages
+
 
 class Hovertip(ToolTip):
     """A tooltip that pops up when a mouse hovers over an anchor widget."""
@@ -27,6 +31,7 @@ class Hovertip(ToolTip):
         preview_window: ttk.Toplevel,
         preview_frame: ttk.Frame,
         photo_for_setting: Path | None,
+        preview_images: "PreviewImages",
         bootstyle: str = None,
         wraplength: int = 250,
         delay: int = 500,
@@ -61,6 +66,9 @@ class Hovertip(ToolTip):
             photo_for_setting (Path):
                 The photo to be placed inside the preview window.
 
+            preview_images (PreviewImages):
+                Loads the photo, shared by every tooltip.
+
             bootstyle (str):
                 The style to apply to the tooltip label. You can use
                 any of the standard ttkbootstrap label styles.
@@ -89,7 +97,7 @@ class Hovertip(ToolTip):
         self.photo_for_setting = photo_for_setting
         self.widget = widget
         self.code = code
-        self.preview_image: ImageTk.PhotoImage | None = None
+        self.preview_images = preview_images
         self.widget.bind("<Button-3>", self.show_preview)
 
     def show_preview(self, _event: "tk.Event[tk.Widget] | None" = None) -> None:
@@ -100,14 +108,19 @@ class Hovertip(ToolTip):
         set_titlebar_style(self.preview_window)
 
         if self.photo_for_setting:
-            if self.preview_image is None:
-                self.preview_image = ImageTk.PhotoImage(
-                    Image.open(self.photo_for_setting))
-
-            ttk.Label(
-                self.preview_frame,
-                image=self.preview_image,
-            ).pack(anchor=NW)
+            image_label = ttk.Label(self.preview_frame)
+            image_label.pack(anchor=NW)
+
+            def show_image(preview_image: "ImageTk.PhotoImage | None") -> None:
+                # The preview may have been closed or replaced while the image was loading.
+                if preview_image is not None and image_label.winfo_exists():
+                    image_label.configure(image=preview_image)
+                    # The label does not keep the image alive by itself.
+                    image_label.image = preview_image  # type: ignore[attr-defined]
+
+            preview_image = self.preview_images.get(self.photo_for_setting, show_image)
+            if preview_image is not None:
+                show_image(preview_image)
 
         ttk.Label(
             self.preview_frame,
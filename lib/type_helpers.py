@@ -5,13 +5,14 @@
 # or send a letter to Creative Commons, PO Box 1866, Mountain View, CA 94042, USA.
 #
 
-import tkinter as tk
-from typing import TYPE_CHECKING, Any, Literal, NotRequired, TypeAlias, TypedDict
+from __future__ import annotations
 
-import ttkbootstrap as ttk
+import tkinter as tk
+from typing import TYPE_CHECKING, Literal, NotRequired, TypeAlias, TypedDict
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    # Only needed for the annotations, so the command line never imports ttkbootstrap.
+    import ttkbootstrap as ttk
 
     from lib.scalar import Scalar
 
@@ -121,12 +122,25 @@ class GameSettingInfo(TypedDict, total=False):
     value: dict[PresetName | str, int | float | str]
 
 
+class IndexedSetting(TypedDict):
+    """A setting from settings.json, as indexed by AppName."""
+
+    key: str
+    """The interned, lowercase `setting:section`."""
+    name: str
+    section: str
+    ini: ININame
+    type: ValueType | str
+    notes: str
+    alwaysPrint: bool
+    values: dict[PresetName | str, int | float | str]
+    info: GameSettingInfo
+    """The entry in settings.json."""
+
+
 class DependentSetting(TypedDict, total=False):
     operator: Literal["greater-than", "greater-or-equal-than", "less-than", "less-or-equal-than", "not-equal", "equal"]
-    operator_func: "Callable[[Any], Any] | None"
     value: str | list[list[str]] | float
-
-    var: Literal["string", "float"]
     setToOff: bool
 
     Offvalue: ValueList | None
@@ -242,6 +256,7 @@ class DisplayTab(TypedDict, total=False):
     TkFrameForTab: ttk.Frame
     TkPhotoImageForTab: tk.PhotoImage
     LabelFrames: dict[LabelFrameId, SettingsLabelFrame]
+    Realized: bool
     PreferencesWindow: ttk.Toplevel
     NoLabelFrame: SettingsLabelFrame
 
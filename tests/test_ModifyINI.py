@@ -0,0 +1,74 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from lib.change_journal import ChangeJournal
+from lib.ModifyINI import ModifyINI
+
+SECTIONS = ["A", "a", "B"]
+SETTINGS = ["k", "K", "x", "y"]
+
+
+@pytest.fixture(autouse=True)
+def journal(monkeypatch: pytest.MonkeyPatch) -> ChangeJournal:
+    journal = ChangeJournal()
+    monkeypatch.setattr(ModifyINI, "journal", journal)
+    monkeypatch.setattr(ModifyINI, "ini_cache", None)
+    monkeypatch.setattr(ModifyINI, "listeners", [])
+    return journal
+
+
+def snapshot(ini: ModifyINI) -> dict[str, tuple[dict[str, str | None], dict[str, str | None]]]:
+    return {
+        section: (dict(ini.config[section]), dict(ini.case_insensitive_config[section]))
+        for section in ini.config.sections()
+    }
+
+
+def open_ini(tmp_path: Path, text: str) -> ModifyINI:
+    (tmp_path / "Test.ini").write_text(text)
+    return ModifyINI("Test.ini", tmp_path, sortable=False)
+
+
+def test_undo_restores_settings_that_differ_by_case(tmp_path: Path, journal: ChangeJournal) -> None:
+    ini = open_ini(tmp_path, "[A]\nx=1\nk\nK=V2\ny=2\n")
+    before = snapshot(ini)
+
+    ini.remove_many([("A", "K")])
+    ini.remove_many([("A", "k")])
+    journal.undo()
+    journal.undo()
+
+    assert snapshot(ini) == before
+    assert ini.get_value("A", "K") is None
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_undo_and_redo_restore_both_views(tmp_path: Path, journal: ChangeJournal, seed: int) -> None:
+    rnd = random.Random(seed)
+    ini = open_ini(tmp_path, "[A]\nx=1\nk\nK=V2\ny=2\n[B]\nK=3\nk=4\n")
+    states = [snapshot(ini)]
+    for _ in range(12):
+        steps = len(journal._steps)  # noqa: SLF001
+        section, setting = rnd.choice(SECTIONS), rnd.choice(SETTINGS)
+        action = rnd.random()
+        if action < 0.4:
+            ini.assign_setting_value(section, setting, str(rnd.randint(0, 3)))
+        elif action < 0.6:
+            ini.assign_many([(section, setting, str(rnd.randint(0, 3))), (section, rnd.choice(SETTINGS), "5")])
+        elif action < 0.8:
+            ini.remove_many([(section, setting)])
+        elif action < 0.9:
+            ini.remove_setting(section, setting)
+        else:
+            ini.remove_section(section)
+        if len(journal._steps) > steps:  # noqa: SLF001
+            states.append(snapshot(ini))
+
+    for state in reversed(states[:-1]):
+        journal.undo()
+        assert snapshot(ini) == state
+    for state in states[1:]:
+        journal.redo()
+        assert snapshot(ini) == state
@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from lib.app import AppName
+from lib.ModifyINI import ModifyINI
+
+INI_VALUES = [
+    {"name": "iShadow", "section": "Display", "ini": "Test.ini", "type": "number",
+     "value": {"default": 1, "Bethini Low": 1, "Bethini High": 4}},
+    {"name": "fGamma", "section": "Display", "ini": "Test.ini", "type": "float",
+     "value": {"default": 1.0, "Bethini High": 1.2, "fixedDefault": "1.0"}},
+    {"name": "sLanguage", "section": "General", "ini": "TestPrefs.ini", "type": "string",
+     "value": {"default": "EN", "recommended": "FR"}, "alwaysPrint": True},
+    {"name": "bOnlyHigh", "section": "Interface", "ini": "TestPrefs.ini", "type": "boolean",
+     "value": {"Bethini High": 1}},
+    {"name": "SMixedCASE", "section": "interFACE", "ini": "TestPrefs.ini", "type": "string", "value": {"default": "x"}},
+]
+
+
+@pytest.fixture
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AppName:
+    monkeypatch.setattr(ModifyINI, "app_config_directory", tmp_path)
+    monkeypatch.setattr(ModifyINI, "open_inis", {})
+    monkeypatch.setattr(ModifyINI, "_open_app_config", None)
+    monkeypatch.setattr(ModifyINI, "ini_cache", None)
+    monkeypatch.setattr(AppName, "plugin_cache", None)
+
+    plugin_directory = tmp_path / "apps" / "Test"
+    plugin_directory.mkdir(parents=True)
+    (plugin_directory / "Bethini.json").write_text(json.dumps({
+        "INIs": {"Bethini.ini": "", "Test.ini": "sTestPath", "TestPrefs.ini": "sTestPath", "TestCustom.ini": "sTestPath"},
+        "INI_pecking_order": {
+            "Test.ini": ["Test.ini", "TestCustom.ini"],
+            "TestPrefs.ini": ["TestPrefs.ini", "TestCustom.ini"],
+        },
+        "valueTypes": ["default", "recommended", "fixedDefault", "Bethini Low", "Bethini High"],
+        "displayTabs": {},
+        "presetsIgnoreTheseSettings": [],
+    }))
+    (plugin_directory / "settings.json").write_text(json.dumps({
+        "gameId": "", "gameName": "Test", "iniPaths": [], "presetPaths": [], "iniValues": INI_VALUES,
+    }))
+    app = AppName(appname="Test", exedir=tmp_path)
+    yield app
+    app.overlay.close()
+
+
+class CountingList(list):
+    """A list that counts how many times it is scanned."""
+
+    scans = 0
+
+    def __iter__(self):
+        self.scans += 1
+        return super().__iter__()
+
+
+def test_preset_values_are_built_once_and_only_when_used(app: AppName) -> None:
+    assert app._preset_values == {}  # noqa: SLF001
+    app.settings_index = CountingList(app.settings_index)
+
+    high = app.preset_values("Bethini High")
+    assert high == {
+        "iShadow:Display": {"ini": "Test.ini", "section": "Display", "value": "4"},
+        "fGamma:Display": {"ini": "Test.ini", "section": "Display", "value": "1.2"},
+        "bOnlyHigh:Interface": {"ini": "TestPrefs.ini", "section": "Interface", "value": "1"},
+    }
+    assert app.settings_index.scans == 1
+    assert app.preset_values("Bethini High") is high
+    assert app.settings_index.scans == 1
+
+
+def test_preset_diff_is_cached(app: AppName) -> None:
+    app.settings_index = CountingList(app.settings_index)
+
+    diff = app.preset_diff("Bethini High")
+    assert set(diff) == {"iShadow:Display", "fGamma:Display", "bOnlyHigh:Interface"}
+    assert app.preset_diff("Bethini Low") == {}
+    scans = app.settings_index.scans
+    assert app.preset_diff("Bethini High") is diff
+    assert app.settings_index.scans == scans
+
+
+def test_save_data_invalidates_the_presets(app: AppName) -> None:
+    high = app.preset_values("Bethini High")
+    diff = app.preset_diff("Bethini High")
+
+    app.save_data()
+
+    assert app.preset_values("Bethini High") is not high
+    assert app.preset_values("Bethini High") == high
+    assert app.preset_diff("Bethini High") is not diff
+
+
+def test_notes_do_not_invalidate_the_presets(app: AppName) -> None:
+    high = app.preset_values("Bethini High")
+
+    assert app.update_setting_notes("ishadow", "display", "Shadow quality")
+
+    assert app.preset_values("Bethini High") is high
+    assert app.get_setting_notes("iShadow", "Display") == "Shadow quality"
+
+
+def baseline_does_setting_exist(app: AppName, ini: str, section: str, setting: str) -> bool:
+    """does_setting_exist as it was before valid_settings, without its KeyError for a main INI with no settings."""
+
+    setting_exists_list: list[bool] = []
+    for valid_ini in app.valid_inis:
+        if ini in app.bethini["INI_pecking_order"].get(valid_ini):
+            setting_exists_list.append(
+                setting.lower() in app.ini_section_setting_dict.get(valid_ini, {}).get(section.lower(), ()))
+    return True in setting_exists_list
+
+
+def test_valid_settings_match_the_pecking_order_scan(app: AppName) -> None:
+    inis = ["Test.ini", "TestPrefs.ini", "TestCustom.ini", "Bethini.ini", "Unknown.ini"]
+    sections = ["Display", "DISPLAY", "display", "General", "general", "Interface", "INTERface", "Missing"]
+    settings = [
+        "iShadow", "ISHADOW", "ishadow", "fGamma", "FGamma", "sLanguage", "SLANGUAGE",
+        "bOnlyHigh", "bonlyhigh", "SMixedCASE", "smixedcase", "sMixedCase", "bMissing",
+    ]
+
+    found = 0
+    for ini in inis:
+        for section in sections:
+            for setting in settings:
+                exists = baseline_does_setting_exist(app, ini, section, setting)
+                assert app.does_setting_exist(ini, section, setting) == exists, (ini, section, setting)
+                found += exists
+            expected_unknown = [setting for setting in settings if not baseline_does_setting_exist(app, ini, section, setting)]
+            assert app.unknown_settings(ini, section, settings) == expected_unknown, (ini, section)
+    assert found
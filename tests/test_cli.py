@@ -0,0 +1,105 @@
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from lib import cli
+from lib.app import AppName
+from lib.change_journal import ChangeJournal
+from lib.ModifyINI import ModifyINI
+
+
+@pytest.fixture
+def exedir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A Bethini Pie folder with a small fake game."""
+
+    exedir = tmp_path / "Bethini Pie"
+    plugin_directory = exedir / "apps" / "Test Game"
+    plugin_directory.mkdir(parents=True)
+    (plugin_directory / "Bethini.json").write_text(json.dumps({
+        "INIs": {"Bethini.ini": "", "Test.ini": "sTestINIPath", "TestPrefs.ini": "sTestINIPath"},
+        "INI_pecking_order": {"Test.ini": ["Test.ini"], "TestPrefs.ini": ["TestPrefs.ini"]},
+        "valueTypes": ["default", "recommended", "fixedDefault", "Bethini Low", "Bethini High"],
+        "displayTabs": {},
+        "presetsIgnoreTheseSettings": ["sIgnored"],
+        "Remove Unknown Settings Default": "1",
+    }))
+    (plugin_directory / "settings.json").write_text(json.dumps({
+        "gameId": "", "gameName": "TestGame", "iniPaths": [], "presetPaths": [], "iniValues": [
+            {"name": "iShadow", "section": "Display", "ini": "TestPrefs.ini", "type": "number",
+             "value": {"default": 1, "Bethini Low": 2, "Bethini High": 4}},
+            {"name": "fFixed", "section": "General", "ini": "Test.ini", "type": "float",
+             "value": {"default": 1.0, "fixedDefault": "0.5"}},
+            {"name": "sIgnored", "section": "General", "ini": "Test.ini", "type": "string",
+             "value": {"default": "a", "Bethini High": "b"}},
+        ],
+    }))
+    (exedir / "Bethini.ini").write_text("[General]\nsAppName=Test Game\nbPluginCache=0\nbINICache=0\n")
+
+    monkeypatch.setattr(ModifyINI, "app_config_directory", exedir)
+    monkeypatch.setattr(ModifyINI, "open_inis", {})
+    monkeypatch.setattr(ModifyINI, "_open_app_config", None)
+    monkeypatch.setattr(ModifyINI, "ini_cache", None)
+    monkeypatch.setattr(ModifyINI, "listeners", [])
+    monkeypatch.setattr(ModifyINI, "journal", ChangeJournal())
+    monkeypatch.setattr(AppName, "plugin_cache", None)
+    return exedir
+
+
+def batch_args(directories: list[Path], **options: object) -> argparse.Namespace:
+    return argparse.Namespace(**{
+        "directories": [str(directory) for directory in directories],
+        "game": "Test Game",
+        "preset": "Bethini High",
+        "workers": 2,
+        "noBackups": False,
+        "clear_read_only": False,
+        "sort": False,
+        **options,
+    })
+
+
+def test_batch_applies_the_preset_to_every_directory(exedir: Path, tmp_path: Path) -> None:
+    directories = []
+    for number in range(3):
+        directory = tmp_path / "profiles" / f"P{number}"
+        directory.mkdir(parents=True)
+        (directory / "Test.ini").write_text(f"[General]\nsIgnored=a\nbUnknown={number}\n")
+        (directory / "TestPrefs.ini").write_text("[Display]\niShadow=1\n")
+        directories.append(directory)
+
+    assert cli.batch_command(batch_args(directories), exedir, "backup") == 0
+
+    for number, directory in enumerate(directories):
+        assert (directory / "Test.ini").read_text() == "[General]\nsIgnored=a\nfFixed=0.5\n"
+        assert (directory / "TestPrefs.ini").read_text() == "[Display]\niShadow=4\n"
+        first_time_backup = directory / cli.BACKUPS_DIRECTORY_NAME / "First-Time-Backup"
+        assert (first_time_backup / "Test.ini").read_text() == f"[General]\nsIgnored=a\nbUnknown={number}\n"
+        assert (directory / cli.BACKUPS_DIRECTORY_NAME / "backup" / "TestPrefs.ini").read_text() == "[Display]\niShadow=1\n"
+        assert not list(directory.glob("*.tmp"))
+
+    # Applying it again changes nothing.
+    assert cli.batch_command(batch_args(directories, noBackups=True), exedir, "again") == 0
+    assert not (directories[0] / cli.BACKUPS_DIRECTORY_NAME / "again").exists()
+
+
+def test_batch_leaves_a_directory_that_cannot_be_saved_as_it_was(
+    exedir: Path, tmp_path: Path, caplog: pytest.LogCaptureFixture,
+) -> None:
+    saved = tmp_path / "profiles" / "saved"
+    saved.mkdir(parents=True)
+    (saved / "TestPrefs.ini").write_text("[Display]\niShadow=1\n")
+    # TestPrefs.ini cannot be replaced, so Test.ini must be restored.
+    broken = tmp_path / "profiles" / "broken"
+    (broken / "TestPrefs.ini").mkdir(parents=True)
+    (broken / "Test.ini").write_bytes(b"[General]\r\nbUnknown=1\r\n")
+
+    with caplog.at_level(logging.INFO):
+        assert cli.batch_command(batch_args([saved, broken], noBackups=True), exedir, "backup") == 1
+
+    assert (saved / "TestPrefs.ini").read_text() == "[Display]\niShadow=4\n"
+    assert (broken / "Test.ini").read_bytes() == b"[General]\r\nbUnknown=1\r\n"
+    assert not list(broken.glob("*.tmp"))
+    assert "Preset Bethini High applied to 1 of 2 directories" in caplog.text
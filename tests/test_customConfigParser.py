@@ -0,0 +1,103 @@
+import configparser
+import random
+
+import pytest
+
+from lib.customConfigParser import customConfigParser
+
+LINE_POOL = [
+    "[Display]",
+    "[display]",
+    "[General]",
+    "[DEFAULT]",
+    "[Odd] trailing text",
+    "iSize H=1080",
+    "iSize H=720",
+    "iSize h=2",
+    "fGamma = 1.5 ",
+    "bNoValue",
+    "  bIndentedNoValue",
+    "sPath=C:\\Games\\Skyrim",
+    "sEmpty=",
+    "=orphan value",
+    "   =indented orphan",
+    "\tcontinued value",
+    "        deeper continuation",
+    "; a comment",
+    "# another comment",
+    "",
+    "   ",
+    "sEquals=a=b=c",
+]
+
+
+def generate_ini(seed: int) -> str:
+    rng = random.Random(seed)
+    lines = [rng.choice(LINE_POOL) for _ in range(rng.randint(0, 40))]
+    newline = rng.choice(("\n", "\r\n"))
+    text = newline.join(lines)
+    if rng.random() < 0.5:
+        text += newline
+    return text
+
+
+def parse(text: str, *, fast: bool) -> tuple:
+    customConfigParser.use_fast_parser = fast
+    parser = customConfigParser()
+    parser.optionxform = lambda optionstr: optionstr
+    parser._line_records = []
+    errors = None
+    try:
+        parser.read_string(text)
+    except configparser.ParsingError as e:
+        errors = e.errors
+    except AttributeError as e:
+        # A continuation of an option without a value, which the legacy parser does not handle either.
+        errors = repr(e)
+    finally:
+        customConfigParser.use_fast_parser = True
+    records = [(line.text, line.section, line.kind, line.option, line.owner) for line in parser._line_records]
+    return parser._sections, parser._defaults, errors, records
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "bBeforeHeader=1\n[A]\nx=1\n",
+        "[A]\nx=1\nx=2\nX=3\n",
+        "[A]\r\nx=1\r\n\tmore\r\n\r\n  evenmore\r\ny\r\n",
+        "[A]\n=broken\nx=1\n=also broken\n",
+        "[DEFAULT]\nd=1\n[A]\nd=2\n",
+        "",
+    ],
+)
+def test_fast_parser_matches_legacy_parser(text: str) -> None:
+    assert parse(text, fast=True) == parse(text, fast=False)
+
+
+@pytest.mark.parametrize("seed", range(500))
+def test_fast_parser_matches_legacy_parser_on_generated_files(seed: int) -> None:
+    text = generate_ini(seed)
+    assert parse(text, fast=True) == parse(text, fast=False), text
+
+
+def test_render_patches_only_touched_lines() -> None:
+    parser = customConfigParser()
+    document = parser.read_document("; top\n[A]\nx = 1\n\n[B]\ny=2\n; end of B\n")
+
+    parser.set("A", "new", "3")
+    document.touch("A", "new")
+    parser.set("B", "y", "5")
+    document.touch("B", "y")
+    for section in ("D", "C"):
+        parser.add_section(section)
+        parser.set(section, "z", "0")
+        document.touch(section, "z")
+
+    text = document.render(parser)
+    assert text == "; top\n[A]\nx = 1\nnew=3\n\n[B]\ny=5\n; end of B\n\n[D]\nz=0\n\n[C]\nz=0\n"
+    assert document.render(parser) is text
+
+    parser.remove_section("A")
+    document.touch_section("A")
+    assert document.render(parser) == "; top\n[B]\ny=5\n; end of B\n\n[D]\nz=0\n\n[C]\nz=0\n"
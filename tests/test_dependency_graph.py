@@ -0,0 +1,95 @@
+from lib.dependency_graph import DependencyGraph
+
+
+def rule(operator: str = "equal", value: object = "1", **extra: object) -> dict[str, object]:
+    return {"operator": operator, "value": value, **extra}
+
+
+def test_chain_is_ordered_from_master_to_dependent() -> None:
+    graph = DependencyGraph({
+        "c": {"b": rule()},
+        "b": {"a": rule()},
+        "d": {"c": rule()},
+    })
+
+    assert graph.order == ["b", "c", "d"]
+    assert graph.cycles == []
+
+
+def test_diamond_evaluates_the_join_after_both_sides() -> None:
+    graph = DependencyGraph({
+        "join": {"left": rule(), "right": rule()},
+        "left": {"top": rule()},
+        "right": {"top": rule()},
+        "top": {"root": rule()},
+    })
+
+    order = graph.order
+    assert order.index("top") < order.index("left") < order.index("join")
+    assert order.index("top") < order.index("right") < order.index("join")
+    assert graph.downstream(["top"]) == [setting for setting in order if setting != "top"]
+
+
+def test_cycles_are_returned_last() -> None:
+    graph = DependencyGraph({
+        "x": {"y": rule()},
+        "y": {"x": rule()},
+        "free": {"master": rule()},
+        "after": {"free": rule()},
+    })
+
+    assert graph.order[:2] == ["free", "after"]
+    assert sorted(graph.order[2:]) == ["x", "y"]
+    assert sorted(graph.cycles) == ["x", "y"]
+    assert sorted(graph.downstream(["x"])) == ["x", "y"]
+
+
+def test_downstream_only_reaches_reachable_dependents() -> None:
+    graph = DependencyGraph({
+        "b": {"a": rule()},
+        "c": {"b": rule()},
+        "other": {"unrelated": rule()},
+    })
+
+    assert graph.downstream(["b"]) == ["c"]
+    assert graph.downstream(["a"]) == ["b", "c"]
+    assert graph.downstream(["unrelated"]) == ["other"]
+    assert graph.downstream(["missing"]) == []
+    assert graph.in_order(["c", "unrelated", "b"]) == ["b", "c"]
+
+
+def test_evaluate_requires_every_rule_and_returns_the_first_failure() -> None:
+    graph = DependencyGraph({
+        "dependent": {
+            "first": rule("equal", "1"),
+            "second": rule("greater-than", "5", setToOff=True, Offvalue=[["0"]]),
+            "third": rule("not-equal", "x"),
+        },
+    })
+    values = {"first": "1", "second": "6", "third": "y"}
+
+    assert graph.evaluate("dependent", values.__getitem__) is None
+
+    values["second"] = "5"
+    failed = graph.evaluate("dependent", values.__getitem__)
+    assert failed is not None
+    assert failed.master == "second"
+    assert failed.set_to_off
+    assert failed.off_value == [["0"]]
+
+    values["first"] = "0"
+    failed = graph.evaluate("dependent", values.__getitem__)
+    assert failed is not None
+    assert failed.master == "first"
+
+
+def test_numeric_rule_value_of_zero() -> None:
+    graph = DependencyGraph({
+        "above": {"master": rule("greater-than", 0)},
+        "at_least": {"master": rule("greater-or-equal-than", "0")},
+    })
+
+    assert graph.evaluate("above", lambda _master: "0") is not None
+    assert graph.evaluate("above", lambda _master: "0.5") is None
+    assert graph.evaluate("at_least", lambda _master: "0") is None
+    assert graph.evaluate("at_least", lambda _master: "-1") is not None
@@ -0,0 +1,152 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from lib import ini_cache
+from lib.change_journal import ChangeJournal
+from lib.customConfigParser import customConfigParser
+from lib.ini_cache import INICache
+from lib.ModifyINI import ModifyINI
+
+
+def read(ini_path: Path) -> tuple[os.stat_result, str]:
+    with ini_path.open(encoding="utf-8", newline="") as ini_file:
+        return os.fstat(ini_file.fileno()), ini_file.read()
+
+
+def store(cache: INICache, ini_path: Path) -> None:
+    stat, text = read(ini_path)
+    parser = customConfigParser()
+    parser.optionxform = lambda optionstr: optionstr  # type: ignore[method-assign]
+    document = parser.read_document(text)
+    cache.store(
+        ini_path,
+        stat,
+        text,
+        preserve_case=True,
+        sections=parser._sections,  # noqa: SLF001
+        defaults=parser._defaults,  # noqa: SLF001
+        records=document.to_records(),
+        newline=document.newline,
+    )
+
+
+def load(cache: INICache, ini_path: Path) -> ini_cache.CachedINI | None:
+    stat, text = read(ini_path)
+    return cache.load(ini_path, stat, text, preserve_case=True)
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> INICache:
+    return INICache(tmp_path / "cache")
+
+
+@pytest.fixture
+def ini_path(tmp_path: Path) -> Path:
+    ini_path = tmp_path / "Test.ini"
+    ini_path.write_text("[Display]\niSize=1\n")
+    return ini_path
+
+
+def test_fresh_entry_is_loaded(cache: INICache, ini_path: Path) -> None:
+    assert load(cache, ini_path) is None
+    store(cache, ini_path)
+
+    entry = load(cache, ini_path)
+    assert entry is not None
+    assert entry["sections"] == {"Display": {"iSize": "1"}}
+    assert load(cache, ini_path) is not None
+    assert cache.load(ini_path, read(ini_path)[0], read(ini_path)[1], preserve_case=False) is None
+
+
+def test_edit_with_the_same_size_and_mtime_is_a_miss(cache: INICache, ini_path: Path) -> None:
+    store(cache, ini_path)
+    stat = ini_path.stat()
+
+    ini_path.write_text("[Display]\niSize=2\n")
+    os.utime(ini_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert ini_path.stat().st_size == stat.st_size
+    assert ini_path.stat().st_mtime_ns == stat.st_mtime_ns
+
+    assert load(cache, ini_path) is None
+
+
+def test_edit_with_the_same_size_and_mtime_is_read_again_by_modifyini(
+    cache: INICache, ini_path: Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(ModifyINI, "ini_cache", cache)
+    monkeypatch.setattr(ModifyINI, "journal", ChangeJournal())
+    assert ModifyINI("Test.ini", ini_path.parent, sortable=False).get_value("Display", "iSize") == "1"
+    stat = ini_path.stat()
+
+    ini_path.write_text("[Display]\niSize=2\n")
+    os.utime(ini_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert ModifyINI("Test.ini", ini_path.parent, sortable=False).get_value("Display", "iSize") == "2"
+
+
+def test_other_size_or_mtime_is_a_miss(cache: INICache, ini_path: Path) -> None:
+    store(cache, ini_path)
+    stat = ini_path.stat()
+
+    os.utime(ini_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load(cache, ini_path) is None
+
+    store(cache, ini_path)
+    ini_path.write_text("[Display]\niSize=1\n\n")
+    assert load(cache, ini_path) is None
+
+
+def test_entry_of_another_path_is_a_miss(cache: INICache, ini_path: Path) -> None:
+    other_path = ini_path.with_name("Other.ini")
+    other_path.write_bytes(ini_path.read_bytes())
+    stat = ini_path.stat()
+    os.utime(other_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    store(cache, ini_path)
+
+    # The entry of Test.ini, found under the name of the entry of Other.ini.
+    cache._entry_path(ini_path, preserve_case=True).replace(cache._entry_path(other_path, preserve_case=True))  # noqa: SLF001
+
+    assert load(cache, other_path) is None
+
+
+def test_version_change_is_a_miss(cache: INICache, ini_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store(cache, ini_path)
+
+    monkeypatch.setattr(ini_cache, "CACHE_VERSION", ini_cache.CACHE_VERSION + 1)
+    assert load(cache, ini_path) is None
+
+    store(cache, ini_path)
+    assert load(cache, ini_path) is not None
+
+
+def test_unreadable_entry_is_a_miss(cache: INICache, ini_path: Path) -> None:
+    store(cache, ini_path)
+    entry_path = cache._entry_path(ini_path, preserve_case=True)  # noqa: SLF001
+
+    entry_path.write_bytes(entry_path.read_bytes()[:20])
+    assert load(cache, ini_path) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = INICache(tmp_path / "cache", max_entries=2)
+    paths = []
+    for number in range(3):
+        ini_path = tmp_path / f"{number}.ini"
+        ini_path.write_text(f"[S]\nx={number}\n")
+        paths.append(ini_path)
+
+    store(cache, paths[0])
+    os.utime(cache._entry_path(paths[0], preserve_case=True), ns=(1_000_000_000, 1_000_000_000))  # noqa: SLF001
+    store(cache, paths[1])
+    os.utime(cache._entry_path(paths[1], preserve_case=True), ns=(2_000_000_000, 2_000_000_000))  # noqa: SLF001
+
+    # Loading 0 makes 1 the least recently used.
+    assert load(cache, paths[0]) is not None
+    store(cache, paths[2])
+
+    assert load(cache, paths[0]) is not None
+    assert load(cache, paths[1]) is None
+    assert load(cache, paths[2]) is not None
+    assert len(list((tmp_path / "cache").glob("*.bin"))) == 2
@@ -0,0 +1,151 @@
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from lib import ini_files
+from lib.change_journal import ChangeJournal
+from lib.ModifyINI import ModifyINI
+
+ORIGINALS = {"A.ini": b"[S]\r\na = 1\r\n", "B.ini": b"[S]\nb=1\n; kept\n"}
+
+
+@pytest.fixture
+def inis(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict[ModifyINI, bool]:
+    """Two modified INI files in the same directory."""
+
+    monkeypatch.setattr(ModifyINI, "journal", ChangeJournal())
+    monkeypatch.setattr(ModifyINI, "ini_cache", None)
+    monkeypatch.setattr(ModifyINI, "listeners", [])
+    ini_objects: dict[ModifyINI, bool] = {}
+    for name, original in ORIGINALS.items():
+        (tmp_path / name).write_bytes(original)
+        ini_object = ModifyINI(name, tmp_path, sortable=False)
+        ini_object.assign_setting_value("S", "changed", "2")
+        ini_objects[ini_object] = False
+    return ini_objects
+
+
+def assert_untouched(directory: Path, inis: dict[ModifyINI, bool]) -> None:
+    for name, original in ORIGINALS.items():
+        assert (directory / name).read_bytes() == original
+    assert not list(directory.glob("*.tmp"))
+    assert all(ini_object.has_been_modified for ini_object in inis)
+
+
+def test_write_saves_every_file(tmp_path: Path, inis: dict[ModifyINI, bool]) -> None:
+    assert ini_files.write_ini_files(inis, lambda _ini_object: False)
+
+    assert (tmp_path / "A.ini").read_bytes() == b"[S]\r\na = 1\r\nchanged=2\r\n"
+    assert (tmp_path / "B.ini").read_bytes() == b"[S]\nb=1\n; kept\nchanged=2\n"
+    assert not list(tmp_path.glob("*.tmp"))
+    assert not any(ini_object.has_been_modified for ini_object in inis)
+
+
+def test_failed_replace_restores_the_files_already_replaced(
+    tmp_path: Path, inis: dict[ModifyINI, bool], monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    real_replace = os.replace
+
+    def replace(source: Path, target: Path) -> None:
+        if Path(target).name == "B.ini":
+            raise PermissionError(target)
+        real_replace(source, target)
+
+    monkeypatch.setattr(ini_files.os, "replace", replace)
+    assert not ini_files.write_ini_files(inis, lambda _ini_object: False)
+    assert_untouched(tmp_path, inis)
+
+
+def test_failed_replace_removes_a_new_file(tmp_path: Path, inis: dict[ModifyINI, bool], monkeypatch: pytest.MonkeyPatch) -> None:
+    new_ini = ModifyINI("New.ini", tmp_path, sortable=False)
+    new_ini.assign_setting_value("S", "new", "1")
+    inis = {new_ini: False, **inis}
+    real_replace = os.replace
+
+    def replace(source: Path, target: Path) -> None:
+        if Path(target).name == "B.ini":
+            raise PermissionError(target)
+        real_replace(source, target)
+
+    monkeypatch.setattr(ini_files.os, "replace", replace)
+    assert not ini_files.write_ini_files(inis, lambda _ini_object: False)
+    assert not (tmp_path / "New.ini").exists()
+    assert_untouched(tmp_path, inis)
+
+
+def test_failed_temporary_write_leaves_no_temporary_files(
+    tmp_path: Path, inis: dict[ModifyINI, bool], monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    second = list(inis)[1]
+
+    def render_ini_file(*, sort: bool = False) -> str:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(second, "render_ini_file", render_ini_file)
+    assert not ini_files.write_ini_files(inis, lambda _ini_object: False)
+    assert_untouched(tmp_path, inis)
+
+
+def test_read_only_file_is_not_saved_unless_cleared(
+    tmp_path: Path, inis: dict[ModifyINI, bool], monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Checked with os.access, so that the test also works when run as root.
+    real_access = os.access
+    monkeypatch.setattr(
+        ini_files.os, "access",
+        lambda path, mode: False if Path(path).name == "B.ini" and mode == os.W_OK else real_access(path, mode),
+    )
+    asked: list[str] = []
+
+    assert not ini_files.write_ini_files(inis, lambda ini_object: asked.append(ini_object.ini_path.name) or False)
+    assert asked == ["B.ini"]
+    assert_untouched(tmp_path, inis)
+
+    modes: list[tuple[str, int]] = []
+    real_chmod = os.chmod
+
+    def chmod(path: Path, mode: int) -> None:
+        modes.append((Path(path).name, mode))
+        real_chmod(path, mode)
+
+    monkeypatch.setattr(ini_files.os, "chmod", chmod)
+    try:
+        assert ini_files.write_ini_files(inis, lambda _ini_object: True)
+    finally:
+        real_chmod(tmp_path / "B.ini", stat.S_IREAD | stat.S_IWRITE)
+    assert modes == [("B.ini", stat.S_IWRITE), ("B.ini", stat.S_IREAD)]
+    assert b"changed=2" in (tmp_path / "B.ini").read_bytes()
+
+
+def test_read_only_flag_is_set_again_after_a_rollback(
+    tmp_path: Path, inis: dict[ModifyINI, bool], monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    real_access = os.access
+    monkeypatch.setattr(
+        ini_files.os, "access",
+        lambda path, mode: False if Path(path).name == "A.ini" and mode == os.W_OK else real_access(path, mode),
+    )
+    real_replace = os.replace
+
+    def replace(source: Path, target: Path) -> None:
+        if Path(target).name == "B.ini":
+            raise PermissionError(target)
+        real_replace(source, target)
+
+    modes: list[tuple[str, int]] = []
+    real_chmod = os.chmod
+
+    def chmod(path: Path, mode: int) -> None:
+        modes.append((Path(path).name, mode))
+        real_chmod(path, mode)
+
+    monkeypatch.setattr(ini_files.os, "replace", replace)
+    monkeypatch.setattr(ini_files.os, "chmod", chmod)
+    try:
+        assert not ini_files.write_ini_files(inis, lambda _ini_object: True)
+        assert modes == [("A.ini", stat.S_IWRITE), ("A.ini", stat.S_IREAD)]
+        assert_untouched(tmp_path, inis)
+    finally:
+        real_chmod(tmp_path / "A.ini", stat.S_IREAD | stat.S_IWRITE)
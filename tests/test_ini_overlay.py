@@ -0,0 +1,123 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from lib.app import AppName
+from lib.ModifyINI import ModifyINI
+
+SECTIONS = ["Display", "General", "Interface", "DEFAULT"]
+SETTINGS = ["fGamma", "FGAMMA", "iSize", "bCustomOnly", "bPrefsOnly", "sFromDefault", "bMissing"]
+
+
+@pytest.fixture
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """A game whose Main.ini and Prefs.ini are both overridden by Custom.ini."""
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ModifyINI, "open_inis", {})
+    monkeypatch.setattr(ModifyINI, "_open_app_config", None)
+    monkeypatch.setattr(ModifyINI, "ini_cache", None)
+    monkeypatch.setattr(ModifyINI, "listeners", [])
+    monkeypatch.setattr(AppName, "plugin_cache", None)
+    ModifyINI.journal.clear()
+
+    plugin_directory = tmp_path / "apps" / "Test"
+    plugin_directory.mkdir(parents=True)
+    (plugin_directory / "Bethini.json").write_text(json.dumps({
+        "INIs": {"Bethini.ini": "", "Main.ini": "sMainPath", "Prefs.ini": "sPrefsPath", "Custom.ini": "sCustomPath"},
+        "INI_pecking_order": {
+            "Main.ini": ["Main.ini", "Custom.ini"],
+            "Prefs.ini": ["Prefs.ini", "Custom.ini"],
+        },
+        "valueTypes": ["default"],
+        "displayTabs": {},
+        "presetsIgnoreTheseSettings": [],
+    }))
+    (plugin_directory / "settings.json").write_text(json.dumps({"gameId": "", "gameName": "Test", "iniPaths": [], "presetPaths": [], "iniValues": []}))
+
+    inis = tmp_path / "inis"
+    inis.mkdir()
+    (inis / "Main.ini").write_text("[Display]\nfGamma=1\niSize=1\n[General]\nbCustomOnly=0\n")
+    (inis / "Prefs.ini").write_text("[Display]\nbPrefsOnly=1\n[Interface]\nfGamma=2\n")
+    (inis / "Custom.ini").write_text("[Display]\nFGAMMA=3\n[General]\nbCustomOnly=1\n")
+    (tmp_path / "Bethini.ini").write_text(
+        f"[Directories]\nsMainPath={inis}\nsPrefsPath={inis}\nsCustomPath={inis}\n")
+
+    app = AppName(appname="Test", exedir=tmp_path)
+    yield app
+    app.overlay.close()
+    ModifyINI.journal.clear()
+
+
+def custom_ini(app: AppName, directory: Path | None = None) -> ModifyINI:
+    return ModifyINI.open(name="Custom.ini", location=directory or Path(app.exedir, "inis"), sortable=False)
+
+
+def assert_same_winners(app: AppName) -> None:
+    for main_ini in ("Main.ini", "Prefs.ini", "Custom.ini", "Bethini.ini"):
+        for section in SECTIONS:
+            for setting in SETTINGS:
+                assert app.get_winning_ini_for_setting(main_ini, section, setting) == app.find_winning_ini_for_setting(
+                    main_ini, section, setting), (main_ini, section, setting)
+
+
+def test_overlay_matches_pecking_order_after_edits(app: AppName) -> None:
+    assert_same_winners(app)
+    custom = custom_ini(app)
+
+    custom.assign_setting_value("Display", "iSize", "2")
+    assert app.get_winning_ini_for_setting("Main.ini", "Display", "isize") == "Custom.ini"
+    assert_same_winners(app)
+
+    custom.assign_setting_value("Interface", "fGamma", "4")
+    assert_same_winners(app)
+
+    custom.remove_setting("Display", "fgamma")
+    assert app.get_winning_ini_for_setting("Main.ini", "Display", "fGamma") == "Main.ini"
+    assert_same_winners(app)
+
+    custom.remove_section("General")
+    assert_same_winners(app)
+
+    ModifyINI.journal.undo()
+    assert app.get_winning_ini_for_setting("Main.ini", "General", "bCustomOnly") == "Custom.ini"
+    assert_same_winners(app)
+
+    ModifyINI.journal.redo()
+    assert_same_winners(app)
+
+
+def test_overlay_matches_pecking_order_after_directories_change(app: AppName, tmp_path: Path) -> None:
+    assert_same_winners(app)
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "Custom.ini").write_text("[Display]\nbPrefsOnly=0\n[Interface]\nfGamma=5\n")
+    ModifyINI.app_config().assign_setting_value("Directories", "sCustomPath", str(other))
+    assert app.get_winning_ini_for_setting("Prefs.ini", "Display", "bPrefsOnly") == "Custom.ini"
+    assert_same_winners(app)
+
+    custom_ini(app, other).remove_setting("Interface", "fGamma")
+    assert_same_winners(app)
+
+    ModifyINI.app_config().assign_setting_value("Directories", "sCustomPath", "")
+    assert app.get_winning_ini_for_setting("Prefs.ini", "Display", "bPrefsOnly") == "Prefs.ini"
+    assert_same_winners(app)
+
+
+def test_overlay_matches_pecking_order_with_default_section(app: AppName) -> None:
+    (Path(app.exedir, "inis") / "Custom.ini").write_text("[DEFAULT]\nsFromDefault=1\n[Display]\nFGAMMA=3\n")
+    assert app.get_winning_ini_for_setting("Main.ini", "Display", "sFromDefault") == "Custom.ini"
+    assert_same_winners(app)
+    custom = custom_ini(app)
+
+    custom.assign_setting_value("Display", "bCustomOnly", "1")
+    assert_same_winners(app)
+
+    custom.remove_setting("DEFAULT", "sFromDefault")
+    assert app.get_winning_ini_for_setting("Main.ini", "Display", "sFromDefault") == "Main.ini"
+    assert_same_winners(app)
+
+    ModifyINI.journal.undo()
+    assert_same_winners(app)
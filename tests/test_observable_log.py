@@ -0,0 +1,58 @@
+import pytest
+
+from lib.observable_log import observable_log
+
+
+def append(log: observable_log, count: int) -> None:
+    for _ in range(count):
+        log.append(f"message {log.total}")
+
+
+def test_since_returns_only_new_messages() -> None:
+    log = observable_log(capacity=5)
+    append(log, 3)
+
+    assert log.since(0) == (["message 0", "message 1", "message 2"], False)
+    assert log.since(2) == (["message 2"], False)
+    assert log.since(3) == ([], False)
+
+
+@pytest.mark.parametrize("cursor", range(0, 13))
+def test_reader_that_fell_out_of_the_ring_gets_the_retained_tail(cursor: int) -> None:
+    log = observable_log(capacity=5)
+    append(log, 12)
+
+    messages, some_dropped = log.since(cursor)
+
+    expected = [f"message {number}" for number in range(max(cursor, 12 - 5), 12)]
+    assert messages == expected
+    assert some_dropped == (cursor < 12 - 5)
+
+
+def test_incremental_reader_sees_every_kept_message_once() -> None:
+    log = observable_log(capacity=4)
+    shown: list[str] = []
+    cursor = 0
+    for count in (1, 3, 0, 4, 9, 2, 5):
+        append(log, count)
+        messages, some_dropped = log.since(cursor)
+        if some_dropped:
+            # Like the Log tab, a reader that fell behind starts again from the kept messages.
+            shown = []
+        shown.extend(messages)
+        cursor = log.total
+
+        assert len(shown) == len(set(shown))
+        assert shown[-len(log.messages):] == list(log.messages)
+    assert log.total == 24
+
+
+def test_smaller_capacity_keeps_the_latest_messages() -> None:
+    log = observable_log(capacity=6)
+    append(log, 6)
+
+    log.set_capacity(3)
+    assert log.capacity == 3
+    assert log.since(0) == (["message 3", "message 4", "message 5"], True)
+    append(log, 1)
+    assert log.since(6) == (["message 6"], False)
@@ -0,0 +1,135 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from lib.app import AppName
+from lib.ModifyINI import ModifyINI
+from lib.plugin_cache import PluginCache
+
+SETTINGS = {
+    "gameId": "", "gameName": "Test", "iniPaths": [], "presetPaths": [], "iniValues": [
+        {"name": "iShadow", "section": "Display", "ini": "Test.ini", "type": "number",
+         "value": {"default": 1, "Bethini High": 4}, "notes": "Shadows"},
+        {"name": "fGamma", "section": "Display", "ini": "Test.ini", "type": "float", "value": {"default": 1.0}},
+    ],
+}
+BETHINI = {
+    "INIs": {"Bethini.ini": "", "Test.ini": "sTestPath"},
+    "INI_pecking_order": {"Test.ini": ["Test.ini"]},
+    "valueTypes": ["default", "Bethini High"],
+    "displayTabs": {},
+    "presetsIgnoreTheseSettings": [],
+}
+
+
+@pytest.fixture
+def exedir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(ModifyINI, "app_config_directory", tmp_path)
+    monkeypatch.setattr(ModifyINI, "open_inis", {})
+    monkeypatch.setattr(ModifyINI, "_open_app_config", None)
+    monkeypatch.setattr(ModifyINI, "ini_cache", None)
+    monkeypatch.setattr(AppName, "plugin_cache", PluginCache(tmp_path / "cache" / "plugins"))
+
+    plugin_directory = tmp_path / "apps" / "Test"
+    plugin_directory.mkdir(parents=True)
+    (plugin_directory / "settings.json").write_text(json.dumps(SETTINGS))
+    (plugin_directory / "Bethini.json").write_text(json.dumps(BETHINI))
+    return tmp_path
+
+
+@pytest.fixture
+def indexed(monkeypatch: pytest.MonkeyPatch) -> list[AppName]:
+    """The apps that were indexed, rather than loaded from the cache."""
+
+    indexed: list[AppName] = []
+    index_settings = AppName.index_settings
+
+    def counting_index_settings(self: AppName) -> None:
+        indexed.append(self)
+        index_settings(self)
+
+    monkeypatch.setattr(AppName, "index_settings", counting_index_settings)
+    return indexed
+
+
+def open_app(exedir: Path) -> AppName:
+    app = AppName(appname="Test", exedir=exedir)
+    app.overlay.close()
+    return app
+
+
+def test_second_load_is_a_hit(exedir: Path, indexed: list[AppName]) -> None:
+    first = open_app(exedir)
+    second = open_app(exedir)
+
+    assert indexed == [first]
+    assert second.data == first.data
+    assert second.valid_settings == first.valid_settings
+    assert second.get_setting_notes("ishadow", "display") == "Shadows"
+    assert second.preset_values("Bethini High") == first.preset_values("Bethini High")
+
+
+def test_restored_index_is_aliased_to_data(exedir: Path, indexed: list[AppName]) -> None:
+    open_app(exedir)
+    app = open_app(exedir)
+    assert len(indexed) == 1
+
+    for entry, ini_setting in zip(app.settings_index, app.data["iniValues"], strict=True):
+        assert entry["info"] is ini_setting
+        assert app._settings_by_key[entry["key"]] is entry  # noqa: SLF001
+
+    # update_setting_notes writes through the index into the data saved to settings.json.
+    assert app.update_setting_notes("iShadow", "Display", "Shadow quality")
+    assert app.data["iniValues"][0]["notes"] == "Shadow quality"
+    app.save_data()
+    assert json.loads((exedir / "apps" / "Test" / "settings.json").read_text())["iniValues"][0]["notes"] == "Shadow quality"
+
+
+@pytest.mark.parametrize("file_name", ["settings.json", "Bethini.json"])
+def test_changed_plugin_file_is_a_miss(exedir: Path, indexed: list[AppName], file_name: str) -> None:
+    open_app(exedir)
+    plugin_file = exedir / "apps" / "Test" / file_name
+    content = plugin_file.read_text()
+    stat = plugin_file.stat()
+
+    # The same size and modification time, so only the content hash differs.
+    plugin_file.write_text(content.replace('"Test', '"Tset', 1))
+    os.utime(plugin_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    app = open_app(exedir)
+
+    assert len(indexed) == 2
+    assert app is indexed[1]
+    open_app(exedir)
+    assert len(indexed) == 2
+
+
+def test_notes_saved_to_settings_json_are_a_miss(exedir: Path, indexed: list[AppName]) -> None:
+    app = open_app(exedir)
+    app.update_setting_notes("iShadow", "Display", "Shadow quality")
+    app.save_data()
+
+    assert open_app(exedir).get_setting_notes("iShadow", "Display") == "Shadow quality"
+    assert len(indexed) == 2
+
+
+@pytest.mark.parametrize("damage", ["truncate", "garbage", "empty"])
+def test_corrupt_entry_is_a_miss(exedir: Path, indexed: list[AppName], damage: str) -> None:
+    open_app(exedir)
+    cache = AppName.plugin_cache
+    assert cache is not None
+    [entry_path] = list(cache.directory.glob("*.bin"))
+    content = entry_path.read_bytes()
+    entry_path.write_bytes({"truncate": content[: len(content) // 2], "garbage": b"\xff\x00garbage", "empty": b""}[damage])
+
+    plugin_directory = exedir / "apps" / "Test"
+    sources = [
+        cache.fingerprint(plugin_directory / "settings.json", (plugin_directory / "settings.json").read_bytes()),
+        cache.fingerprint(plugin_directory / "Bethini.json", (plugin_directory / "Bethini.json").read_bytes()),
+    ]
+    assert cache.load(plugin_directory, sources) is None
+
+    app = open_app(exedir)
+    assert len(indexed) == 2
+    assert app.get_setting_notes("iShadow", "Display") == "Shadows"
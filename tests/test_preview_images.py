@@ -0,0 +1,111 @@
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from lib import preview_images
+from lib.preview_images import PreviewImages
+
+
+class FakeRoot:
+    """Stands in for the Tk root, which needs a display. Scheduled calls are run by poll()."""
+
+    def __init__(self) -> None:
+        self.scheduled: list[Callable[[], None]] = []
+
+    def after(self, _ms: int, callback: Callable[[], None]) -> str:
+        self.scheduled.append(callback)
+        return str(len(self.scheduled))
+
+
+class FakePhotoImage:
+    def __init__(self, image: Image.Image, master: object = None) -> None:
+        self.image = image
+
+
+@pytest.fixture(autouse=True)
+def no_tk(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(preview_images.ImageTk, "PhotoImage", FakePhotoImage)
+
+
+def write_image(path: Path, color: tuple[int, int, int]) -> Path:
+    Image.new("RGB", (200, 100), color).save(path, format="JPEG")
+    return path
+
+
+def load(previews: PreviewImages, root: FakeRoot, path: Path) -> FakePhotoImage | None:
+    """Returns the image kept in memory, or decodes it and waits for the callback."""
+
+    loaded: list[FakePhotoImage | None] = []
+    photo_image = previews.get(path, loaded.append)
+    if photo_image is not None:
+        return photo_image
+    deadline = time.monotonic() + 10
+    while not loaded:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+        if root.scheduled:
+            root.scheduled.pop(0)()
+    return loaded[0]
+
+
+def test_images_in_memory_are_bounded_by_capacity(tmp_path: Path) -> None:
+    root = FakeRoot()
+    previews = PreviewImages(root, None, (50, 50), capacity=2)
+    paths = [write_image(tmp_path / f"{number}.jpg", (number * 100, 0, 0)) for number in range(3)]
+
+    first = load(previews, root, paths[0])
+    second = load(previews, root, paths[1])
+    assert first is not None and second is not None
+    assert first.image.size == (50, 25)
+    assert previews.get(paths[0], lambda _image: None) is first
+
+    # 0 was used last, so 1 is dropped.
+    load(previews, root, paths[2])
+    assert list(previews._photo_images) == [paths[0], paths[2]]  # noqa: SLF001
+    assert previews.get(paths[0], lambda _image: None) is first
+    assert load(previews, root, paths[1]) is not second
+    assert len(previews._photo_images) == 2  # noqa: SLF001
+
+
+def test_unreadable_image_calls_back_with_none(tmp_path: Path) -> None:
+    root = FakeRoot()
+    previews = PreviewImages(root, None, (50, 50))
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+
+    assert load(previews, root, broken) is None
+    assert not previews._photo_images  # noqa: SLF001
+
+
+def test_thumbnail_cache_follows_the_source_image(tmp_path: Path) -> None:
+    cache_directory = tmp_path / "cache"
+    previews = PreviewImages(FakeRoot(), cache_directory, (50, 50))
+    path = write_image(tmp_path / "setting.jpg", (255, 0, 0))
+
+    red = previews._decode(path)  # noqa: SLF001
+    assert red.size == (50, 25)
+    [entry] = list(cache_directory.glob("*.jpg"))
+    assert previews._decode(path).getpixel((25, 12))[0] > 200  # noqa: SLF001
+    assert list(cache_directory.glob("*.jpg")) == [entry]
+
+    stat = path.stat()
+    write_image(path, (0, 0, 255))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    blue = previews._decode(path)  # noqa: SLF001
+    red_channel, _green, blue_channel = blue.getpixel((25, 12))
+    assert blue_channel > 200 and red_channel < 50
+    assert len(list(cache_directory.glob("*.jpg"))) == 2
+
+
+def test_thumbnail_cache_keeps_max_entries(tmp_path: Path) -> None:
+    cache_directory = tmp_path / "cache"
+    previews = PreviewImages(FakeRoot(), cache_directory, (50, 50), max_entries=2)
+    for number in range(4):
+        previews._decode(write_image(tmp_path / f"{number}.jpg", (0, number * 60, 0)))  # noqa: SLF001
+
+    assert len(list(cache_directory.glob("*.jpg"))) == 2